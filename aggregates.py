@@ -0,0 +1,228 @@
+import os
+
+import pandas as pd
+
+import query_engine
+from data_index import VersionedCache, as_indexed, dataset_version, frame_of
+from instrument import timed
+
+STATUS = "Graduation_rate_status_in_cohort"
+
+# Key and code columns of the graduation dataset; every other numeric column is a measure
+GRAD_DIMENSIONS = ["unitid", "year", "Cohort_type", STATUS, "Cohort"]
+
+
+class GraduationCube:
+    """
+    Graduation totals pre-aggregated by unitid × year × CHRTSTAT code.
+
+    Every numeric measure (Total, Total_men/women and the race/ethnicity
+    breakdowns) is summed across cohort types. `Total_first` keeps the
+    first row's Total per cell, which is what the share pies report for
+    the selected school. Lookups go through a sorted MultiIndex, so chart
+    reruns no longer scan the raw graduation rows.
+    """
+
+    def __init__(self, data):
+        indexed = as_indexed(data)
+        frame = indexed.frame
+        self.measures = [
+            col for col in frame.columns
+            if col not in GRAD_DIMENSIONS and pd.api.types.is_numeric_dtype(frame[col])
+        ]
+
+        grouped = frame.groupby(["unitid", "year", STATUS], sort=True)
+        cube = grouped[self.measures].sum()
+        cube["Total_first"] = grouped["Total"].first()
+        self.cube = cube
+        self.by_year = cube.groupby(level=["year", STATUS]).sum()
+        self.version = dataset_version(data)
+
+        self._unitid_by_name = {name: indexed.unitid_for(name) for name in indexed.school_names}
+        self._name_by_unitid = {unitid: name for name, unitid in self._unitid_by_name.items()}
+
+    @property
+    def columns(self):
+        return list(self.cube.columns)
+
+    def unitid_for(self, name):
+        return self._unitid_by_name.get(name)
+
+    def name_for(self, unitid):
+        return self._name_by_unitid.get(unitid)
+
+    @timed("aggregate")
+    def status_totals(self, unitid=None, year=None, columns=("Total",)):
+        """
+        Sum of `columns` per status code for an institution and/or year.
+        A criterion left as None covers all institutions / years.
+        """
+        columns = list(columns)
+        try:
+            if unitid is not None and year is not None:
+                return self.cube.loc[(unitid, year), columns]
+            if unitid is not None:
+                return self.cube.loc[unitid, columns].groupby(level=STATUS).sum()
+            if year is not None:
+                return self.by_year.loc[year, columns]
+        except KeyError:
+            return pd.DataFrame(columns=columns, index=pd.Index([], name=STATUS))
+        return self.by_year[columns].groupby(level=STATUS).sum()
+
+    @timed("aggregate")
+    def yearly(self, unitid=None, column="Total"):
+        """year × status code table of `column` for an institution, or statewide when unitid is None."""
+        if unitid is None:
+            return self.by_year[column].unstack(STATUS)
+        try:
+            return self.cube.loc[unitid, column].unstack(STATUS)
+        except KeyError:
+            return pd.DataFrame(index=pd.Index([], name="year"))
+
+    @timed("aggregate")
+    def value(self, unitid, year, status, column="Total_first"):
+        """A single cell of the cube, or None when that institution/year/status has no rows."""
+        try:
+            return self.cube.at[(unitid, year, status), column]
+        except KeyError:
+            return None
+
+    @timed("aggregate")
+    def year_total(self, year, status, column="Total"):
+        """Statewide total of `column` for a year and status code (0 when there are no rows)."""
+        try:
+            return self.by_year.at[(year, status), column]
+        except KeyError:
+            return 0
+
+
+# A few states' worth of each table
+_CUBES = VersionedCache(maxsize=int(os.environ.get("AGGREGATE_CACHE_SIZE", 8)))
+_SHARES = VersionedCache(maxsize=int(os.environ.get("AGGREGATE_CACHE_SIZE", 8)))
+
+
+@timed("aggregate")
+def graduation_cube(data):
+    """
+    The GraduationCube for a graduation dataset, built once per data version.
+    Only the dataset data_loader loaded is cached; any other frame, including
+    one filtered or derived from it (which inherits its attrs), gets a fresh
+    cube on every call.
+    """
+    return _CUBES.get(GraduationCube, data)
+
+
+class EnrollmentShares:
+    """
+    Every institution's share of statewide enrollment, for every year.
+
+    Enrollment is summed per institution name and year into one
+    name × year matrix (missing years count as 0); state totals, shares
+    and year-over-year share changes are whole-matrix operations, so any
+    school's position is a row lookup. The input frame is never modified.
+    """
+
+    def __init__(self, data, column="Enrolled_total", name_column="university_name"):
+        frame = frame_of(data)
+        totals = (
+            frame[[name_column, "year", column]]
+            .groupby([name_column, "year"], observed=True, sort=True)[column]
+            .sum()
+            .astype("float64")
+        )
+        self.enrollment = totals.unstack("year", fill_value=0.0)
+        self.enrollment.index = self.enrollment.index.astype(object)
+        self.state_total = self.enrollment.sum(axis=0)
+        self.share = self.enrollment.div(self.state_total, axis=1) * 100
+        self.share_change = self.share.diff(axis=1)
+        self.version = dataset_version(data)
+
+    @property
+    def years(self):
+        return list(self.enrollment.columns)
+
+    @property
+    def school_names(self):
+        return list(self.enrollment.index)
+
+    @timed("aggregate")
+    def for_school(self, name):
+        """
+        Per-year table for one school: its enrollment, everyone else's,
+        its share (%) and the change in share from the previous year.
+        A school without rows gets zero enrollment every year.
+        """
+        if name in self.enrollment.index:
+            school = self.enrollment.loc[name]
+            share = self.share.loc[name]
+            change = self.share_change.loc[name]
+        else:
+            school = pd.Series(0.0, index=self.enrollment.columns)
+            share = school.copy()
+            change = share.diff()
+        return pd.DataFrame({
+            "school": school,
+            "others": self.state_total - school,
+            "total": self.state_total,
+            "share": share,
+            "share_change": change,
+        })
+
+    @timed("aggregate")
+    def totals(self, name, years):
+        """(school, all others) enrollment summed over `years`."""
+        years = [y for y in years if y in self.enrollment.columns]
+        state = float(self.state_total[years].sum())
+        school = float(self.enrollment.loc[name, years].sum()) if name in self.enrollment.index else 0.0
+        return school, state - school
+
+
+@timed("aggregate")
+def enrollment_shares(data):
+    """
+    The EnrollmentShares for an admission dataset, built once per data version.
+    Each state selection has its own version, so each state keeps its own shares.
+    A frame filtered by year or school, or otherwise derived from the loaded
+    dataset, is not cached and gets its own shares.
+    """
+    return _SHARES.get(EnrollmentShares, data)
+
+
+# 🔹 Aggregations with an optional DuckDB backend
+# With IPEDS_QUERY_ENGINE=duckdb these run as SQL in query_engine; otherwise
+# they read the pandas tables above. Both paths return the same values.
+def school_shares(data, name):
+    """Per-year enrollment and statewide share for one school (see EnrollmentShares.for_school)."""
+    engine = query_engine.active(data)
+    if engine is not None:
+        return engine.school_shares(data, name)
+    return enrollment_shares(data).for_school(name)
+
+
+def school_totals(data, name, years):
+    """(school, all others) enrollment over `years`, or None when none of the years has data."""
+    engine = query_engine.active(data)
+    if engine is not None:
+        return engine.school_totals(data, name, years)
+    shares = enrollment_shares(data)
+    if not any(year in shares.years for year in years):
+        return None
+    return shares.totals(name, years)
+
+
+def graduation_yearly(data, unitid=None, column="Total"):
+    """year × status code table of `column` for an institution, or statewide (see GraduationCube.yearly)."""
+    engine = query_engine.active(data)
+    if engine is not None:
+        return engine.graduation_yearly(data, unitid, column)
+    return graduation_cube(data).yearly(unitid, column)
+
+
+@timed("aggregate")
+def top_rows(data, order_column, columns, n=20):
+    """`columns` of the `n` rows with the largest `order_column`, largest first."""
+    engine = query_engine.active(data)
+    if engine is not None:
+        return engine.top_rows(data, order_column, columns, n)
+    frame = frame_of(data)
+    return frame.loc[frame[order_column].nlargest(n).index, columns]
@@ -1,7 +1,18 @@
+import functools
+import logging
+import os
+import time
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+import data_partitions
+import instrument
+from data_index import IndexedDataset
+from data_registry import DatasetRegistry
+from school_search import school_index
+import warmup
 from charts_enrollment import (
     create_total_enrollment_bar_chart,
     create_gender_enrollment_bar_chart,
@@ -28,6 +39,8 @@ from charts_finaid import (
     plot_aid_type_breakdown_percent
 )
 
+logger = logging.getLogger(__name__)
+
 # ---- Set Page Config ----
 st.set_page_config(
     page_title="University Insights",
@@ -46,9 +59,186 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ---- Load Data with Caching ----
+@st.cache_resource
+def load_dataset(name, state=data_partitions.DEFAULT_STATE, version=None):
+    # Only the selected state's partitions are read, so memory follows the selection;
+    # `version` (data_partitions.partitions_version) only keys the cache, so a new mart export
+    # or institution directory reloads.
+    # One frozen (read-only) copy is shared by every session and rerun: no pickling, no per-session copies
+    return IndexedDataset(data_partitions.load_partitions(name, states=[state])).freeze()
+
+
 @st.cache_data
-def load_data(file_path):
-    return pd.read_csv(file_path)
+def available_states(version):
+    # `version` (data_partitions.partitions_version) only keys the cache, so newly partitioned states show up
+    return data_partitions.available("admission")[0]
+
+
+@st.cache_resource(show_spinner="Warming up the default views…")
+def warm_start(state, pages, versions):
+    # Once per server process and data version: the pages' default datasets and figures go into the caches
+    report = warmup.warm_up(lambda name: load_dataset(name, state, data_partitions.partitions_version(name)), pages)
+    logger.info(warmup.summary(report))
+    return report
+
+
+def default_index(options, name):
+    """Position of `name` in a selectbox's options, or the first option when the state has no such school."""
+    return options.index(name) if name in options else 0
+
+
+def resolve_school(choice, index, options):
+    """
+    `choice` itself when it is one of `options`, else the best option the
+    search index finds for it (a partial name or an alias like "NJIT"), or None.
+    """
+    if choice is None or choice in options:
+        return choice
+    for name in index.search(choice, limit=20):
+        if name in options:
+            return name
+    st.warning(f"No school matches '{choice}'.")
+    return None
+
+
+def pick_school(label, index, options, default, key=None):
+    """A school selectbox that also takes a typed partial name or alias (press Enter) and resolves it."""
+    position = default_index(options, default)
+    choice = st.selectbox(label, options, index=position, key=key,
+                          accept_new_options=True, placeholder="Name or alias, e.g. NJIT")
+    return resolve_school(choice, index, options) or (options[position] if options else None)
+
+# ---- Render a chart; with debug timings on, st.plotly_chart time counts as serialize ----
+def show_chart(fig, container=st):
+    with instrument.rendering(fig):
+        container.plotly_chart(fig, use_container_width=True)
+
+
+# ---- Panels: a change to a panel's own widgets reruns only that panel (st.fragment) ----
+def panel(func):
+    """
+    Run a page panel as a Streamlit fragment. Its inputs are its arguments;
+    a widget inside it reruns just this function with the arguments of the
+    last full run, so charts outside the panel are not rebuilt.
+    """
+    @st.fragment
+    @functools.wraps(func)
+    def fragment(*args, **kwargs):
+        if not st.session_state.get("profile_timings") or instrument.current_rerun() is not None:
+            return func(*args, **kwargs)
+
+        # A rerun of this panel alone: profile it on its own and show its time in the panel
+        instrument.start_rerun(f"{st.session_state.active_page}/{func.__name__}")
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile = instrument.end_rerun()
+            st.caption(f"⏱ Panel rerun: {(time.perf_counter() - started) * 1000:,.0f} ms")
+            if os.environ.get("IPEDS_PROFILE_LOG"):
+                instrument.dump_json_lines(profile, os.environ["IPEDS_PROFILE_LOG"])
+    return fragment
+
+
+@panel
+def share_pie_panel(adms_data, share_school):
+    # First, render the chart first with a placeholder year
+    chart_placeholder = st.empty()
+    st.button("𝒾", help="This donut chart visualizes the proportion of **total undergraduate enrollment** of the selected institution compared to the rest of the selected state's higher education institutions. It provides a quick snapshot of how the selected school contributes to the overall state enrollment for the chosen year.")
+
+    # Then render dropdown below the chart
+    available_years = adms_data.years
+    selected_year = st.selectbox("Select a Year", available_years, index=len(available_years) - 1, key="year_selector_pie")
+
+    # Now render chart based on actual user-selected year
+    show_chart(create_njit_vs_others_pie(adms_data, [selected_year], school_name=share_school), chart_placeholder)
+
+
+@panel
+def admission_funnel_panel(adms_data, trend_school):
+    available_years = adms_data.years
+    selected_year = st.selectbox("Select a Year", available_years, index=len(available_years) - 1)
+    show_chart(plot_admission_funnel(adms_data, trend_school, selected_year=selected_year))
+    st.button("𝒾", help="This funnel chart illustrates the admissions pipeline for a selected institution and year. It breaks down the total number of applicants, how many were admitted, and how many ultimately enrolled, providing a clear view of conversion at each stage of the enrollment process.")
+
+
+@panel
+def comparison_panel(adms_data):
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        available_years = adms_data.years
+        selected_years = st.multiselect(
+            "Select Years", available_years, default=available_years[-1:])
+
+    with col2:
+        filtered_adms = adms_data.select(years=selected_years)
+        schools = school_index(adms_data)
+        all_schools = schools.names_for(filtered_adms["unitid"].unique())
+        default_schools = warmup.default_schools(all_schools)
+        # Typed names and aliases ("Rutgers Newark") resolve through the search index
+        picked = st.multiselect(
+            "Select Schools", all_schools, default=default_schools, accept_new_options=True)
+        selected_schools = list(dict.fromkeys(
+            school for school in (resolve_school(choice, schools, all_schools) for choice in picked) if school))
+
+    if selected_years and selected_schools:
+        col1, col2 = st.columns(2)
+        with col1:
+            show_chart(create_total_enrollment_bar_chart(adms_data, selected_schools, selected_years))
+            st.button("𝒾", help="Total undergraduate enrollment by institution.")
+        with col2:
+            show_chart(create_gender_enrollment_bar_chart(adms_data, selected_schools, selected_years))
+            st.button("𝒾", help="Enrollment by gender for selected institutions.")
+        show_chart(create_admission_yield_rate_chart(adms_data, selected_schools, selected_years))
+        st.button("𝒾", help="This grouped bar chart compares the admission rate and yield rate across selected institutions for a specific year. Admission rate represents the percentage of applicants who were admitted, while yield rate indicates the percentage of admitted students who chose to enroll. This visualization helps assess the selectivity and enrollment effectiveness of different institutions.")
+        show_chart(create_full_vs_part_time_trend_multiple(adms_data, selected_schools))
+    else:
+        st.warning("Please select at least one school and one year to view the charts.")
+
+
+@panel
+def graduation_share_panel(grad_data, schools, all_schools, default_school, selected_years):
+    available_years = grad_data.years
+    col3, col4 = st.columns(2)
+    with col3:
+        selected_year = st.selectbox("Select a Year", available_years, index=len(available_years) - 1, key="grad_year_for_pie")
+    with col4:
+        selected_school = pick_school("Select a School", schools, all_schools, default_school, key="grad_school_for_pie")
+        selected_unitid = grad_data.unitid_for(selected_school)
+
+    col5, col6 = st.columns(2)
+    with col5:
+        fig = plot_school_graduation_share_pie(grad_data, selected_school=selected_school, selected_year=selected_year)
+        if fig:
+            show_chart(fig)
+        else:
+            st.warning("⚠️ No data available to render graduation share pie chart for the selected school and year.")
+
+    with col6:
+        fig = plot_school_graduation_share_pie_by_unitid(grad_data, selected_unitid=selected_unitid, selected_year=selected_year)
+        if fig:
+            show_chart(fig)
+        else:
+            st.warning("⚠️ No valid graduation data found for the selected school and year.")
+
+    fig = plot_graduation_by_race_treemap(grad_data, selected_unitid=selected_unitid, selected_year=selected_years[-1])
+    show_chart(fig)
+
+
+@panel
+def aid_school_panel(sfa_data, schools, default_school):
+    # School selection dropdown
+    selected_school = pick_school("Select an Institution", schools, schools.names, default_school)
+
+    # Create and display the net price chart
+    fig = plot_net_price_by_income(sfa_data, selected_school)
+    show_chart(fig)
+    st.button("𝒾", help="This chart shows the average net price paid by students in different family income brackets after accounting for all forms of financial aid. Net price represents the actual out-of-pocket cost for students and families.")
+
+    # Create and display the aid type breakdown chart
+    fig = plot_aid_type_breakdown_percent(sfa_data, selected_school)
+    show_chart(fig)
+    st.button("𝒾", help="This chart shows the percentage breakdown of total aid (grants, Pell, loans) per institution.")
 
 # ---- Sidebar Navigation ----
 st.sidebar.markdown("## 📚 Navigation")
@@ -58,6 +248,8 @@ if "active_page" not in st.session_state:
     st.session_state.active_page = "Enrollment"
 if "enrollment_section" not in st.session_state:
     st.session_state.enrollment_section = None
+if "datasets_touched" not in st.session_state:
+    st.session_state.datasets_touched = {}
 
 # ---- High-level Navigation Buttons ----
 with st.sidebar:
@@ -83,6 +275,30 @@ if st.session_state.active_page == "Enrollment":
             st.session_state.enrollment_section = "section3"
         st.markdown('</div>', unsafe_allow_html=True)
 
+# ---- State ----
+states = available_states(data_partitions.partitions_version("admission"))
+selected_state = st.sidebar.selectbox(
+    "🗺 State", states,
+    index=default_index(states, data_partitions.DEFAULT_STATE), key="selected_state")
+
+# ---- Warm-up of the default state's default views, for the pages in IPEDS_WARMUP (the first run pays for it) ----
+warm_pages = tuple(warmup.warmup_pages())
+warm_report = None
+if warm_pages:
+    warm_versions = tuple(data_partitions.partitions_version(warmup.PAGE_DATASETS[page]) for page in warm_pages)
+    warm_report = warm_start(data_partitions.DEFAULT_STATE, warm_pages, warm_versions)
+
+# ---- Debug Timings (opt-in) ----
+profiling = st.sidebar.checkbox("⏱ Debug timings", value=os.environ.get("IPEDS_PROFILE") == "1", key="profile_timings")
+if profiling:
+    rerun_started = time.perf_counter()
+    page = st.session_state.active_page
+    if page == "Enrollment" and st.session_state.enrollment_section:
+        page = f"{page}/{st.session_state.enrollment_section}"
+    instrument.start_rerun(page)
+else:
+    instrument.end_rerun()
+
 # 🔹 Page Config
 # ---- Main Title ----
 st.title("Institutional Analytics")
@@ -105,32 +321,27 @@ if (
         Start by choosing a section from the sidebar.
     """)
 
-# 🔹 Load datasets
-adms_fpath = "data/NJ_admission_data.csv"
-effy_fpath = "data/NJ_enrollment_data.csv"
-sfa_fpath = "data/NJ_sfa_data.csv"
-adms_data = load_data(adms_fpath)
-effy_data = load_data(effy_fpath)
-sfa_data = load_data(sfa_fpath)
+# 🔹 Datasets are loaded lazily: each page asks the registry only for what it uses
+timed_load = instrument.timed_loader(load_dataset)
+registry = DatasetRegistry(loader=lambda name: timed_load(name, selected_state, data_partitions.partitions_version(name)), touched=st.session_state.datasets_touched)
+registry.page = st.session_state.active_page
 
 # 🔸🔸 Enrollment Page 🔸🔸
 if st.session_state.active_page == "Enrollment":
+    if st.session_state.enrollment_section is not None:
+        registry.page = f"Enrollment/{st.session_state.enrollment_section}"
+        adms_data = registry.get("admission")
+
     if st.session_state.enrollment_section == "section1":
         st.markdown("""### :orange[NJIT’s Position in Statewide Enrollment Trends]""")
+        schools = school_index(adms_data)
+        share_school = pick_school("Select a School", schools, schools.names, warmup.DEFAULT_SCHOOL, key="share_school")
         col1, col2 = st.columns(2)
         with col1:
-            # First, render the chart first with a placeholder year
-            chart_placeholder = st.empty()
-            st.button("𝒾", help="This donut chart visualizes the proportion of **total undergraduate enrollment** of the selected institution compared to the rest of New Jersey's higher education institutions. It provides a quick snapshot of how the selected school contributes to the overall state enrollment for the chosen year.")
-
-            # Then render dropdown below the chart
-            available_years = sorted(adms_data["year"].dropna().unique())
-            selected_year = st.selectbox("Select a Year", available_years, index=len(available_years) - 1, key="year_selector_pie")
-
-            # Now render chart based on actual user-selected year
-            chart_placeholder.plotly_chart(create_njit_vs_others_pie(adms_data, [selected_year]), use_container_width=True)
+            # The year only changes the pie, so it reruns on its own
+            share_pie_panel(adms_data, share_school)
         with col2:
-            st.plotly_chart(plot_njit_share_change(adms_data), use_container_width=True)
+            show_chart(plot_njit_share_change(adms_data, njit_name=share_school))
             st.button("𝒾", help="This bar chart illustrates undergraduate enrollment trends over time, comparing the selected institution's enrollment to that of all other NJ schools. It also shows the annual change in the selected institution’s share of total enrollment compared to the year before it to evaluate relative growth or decline over multiple years.")
 
     elif st.session_state.enrollment_section == "section2":
@@ -140,112 +351,55 @@ if st.session_state.active_page == "Enrollment":
         
         col1, col2 = st.columns(2)
         with col1:
-            default_school = "New Jersey Institute of Technology"
-            all_schools = sorted(adms_data["university_name"].dropna().unique())
-            trend_school = st.selectbox("Select a School for Enrollment Trend",
-                                        all_schools, index=all_schools.index(default_school))
-        with col2:
-            available_years = sorted(adms_data["year"].dropna().unique())
-            selected_year = st.selectbox("Select a Year", available_years, index=len(available_years) - 1)
-
-        col3, col4 = st.columns(2)
-        with col3:
-            st.plotly_chart(create_full_vs_part_time_trend(adms_data, trend_school), use_container_width=True)
+            default_school = warmup.DEFAULT_SCHOOL
+            schools = school_index(adms_data)
+            trend_school = pick_school("Select a School for Enrollment Trend", schools, schools.names, default_school)
+            show_chart(create_full_vs_part_time_trend(adms_data, trend_school))
             st.button("𝒾", help="This line chart visualizes the yearly trend of first-time, degree/certificate-seeking students enrollment categorized by full-time and part-time status to help identifying shifts in institutional attendance patterns.")
 
-        with col4:
-            st.plotly_chart(plot_admission_funnel(adms_data, trend_school, selected_year=selected_year), use_container_width=True)
-            st.button("𝒾", help="This funnel chart illustrates the admissions pipeline for a selected institution and year. It breaks down the total number of applicants, how many were admitted, and how many ultimately enrolled, providing a clear view of conversion at each stage of the enrollment process.")
+        with col2:
+            # The year only changes the funnel, so it reruns on its own
+            admission_funnel_panel(adms_data, trend_school)
 
     elif st.session_state.enrollment_section == "section3":
         st.markdown("<br>", unsafe_allow_html=True)
         st.markdown("""### :orange[Undergraduate Enrollment Comparison Across Institutions]""")
 
-        col1, col2 = st.columns([1, 3])
-        with col1:
-            available_years = sorted(adms_data["year"].dropna().unique())
-            selected_years = st.multiselect(
-                "Select Years", available_years, default=available_years[-1:])
-
-        with col2:
-            filtered_adms = adms_data[adms_data["year"].isin(selected_years)]
-            all_schools = sorted(filtered_adms["university_name"].dropna().unique())
-            default_schools = [
-                school for school in all_schools if "New Jersey Institute of Technology" in school or "Rutgers University-Newark" in school
-            ]
-            selected_schools = st.multiselect(
-                "Select Schools", all_schools, default=default_schools)
-
-        if selected_years and selected_schools:
-            col1, col2 = st.columns(2)
-            with col1:
-                st.plotly_chart(create_total_enrollment_bar_chart(adms_data, selected_schools, selected_years), use_container_width=True)
-                st.button("𝒾", help="Total undergraduate enrollment by institution.")
-            with col2:
-                st.plotly_chart(create_gender_enrollment_bar_chart(adms_data, selected_schools, selected_years), use_container_width=True)
-                st.button("𝒾", help="Enrollment by gender for selected institutions.")
-            st.plotly_chart(create_admission_yield_rate_chart(adms_data, selected_schools, selected_years), use_container_width=True)
-            st.button("𝒾", help="This grouped bar chart compares the admission rate and yield rate across selected institutions for a specific year. Admission rate represents the percentage of applicants who were admitted, while yield rate indicates the percentage of admitted students who chose to enroll. This visualization helps assess the selectivity and enrollment effectiveness of different institutions.")
-            st.plotly_chart(create_full_vs_part_time_trend_multiple(adms_data, selected_schools), use_container_width=True)
-        else:
-            st.warning("Please select at least one school and one year to view the charts.")
+        # Years and schools feed every chart here; the section reruns without the rest of the page
+        comparison_panel(adms_data)
 
 
 # 🔸🔸 Graduation Page 🔸🔸
 elif st.session_state.active_page == "Graduation":
 
     st.markdown("""### :orange[Graduation]""")
-    grad_fpath = "data/NJ_graduation_data.csv"
-    grad_data = load_data(grad_fpath)
+    grad_data = registry.get("graduation")
 
-    available_years = sorted(grad_data["year"].dropna().unique())
+    available_years = grad_data.years
     selected_years = st.multiselect(
         "Select Years", available_years, default=available_years[-1:])
 
     if selected_years:
-        filtered_df = grad_data[grad_data["year"].isin(selected_years)]
-        all_schools = sorted(filtered_df["university_name"].dropna().unique())
+        # Only the unitid column of the selected years, not a copy of every column
+        year_unitids = grad_data.query(["unitid"], years=selected_years)["unitid"].unique()
+        schools = school_index(grad_data)
+        all_schools = schools.names_for(year_unitids)
 
         if all_schools:
-            default_schools = [
-                school for school in all_schools if "New Jersey Institute of Technology" in school or "Rutgers University-Newark" in school
-            ]
-            selected_school = st.selectbox("Select a School", all_schools, index=all_schools.index(default_schools[0]))
-            selected_unitid = filtered_df[filtered_df["university_name"] == selected_school]["unitid"].iloc[0]
+            default_schools = warmup.default_schools(all_schools)
+            default_school = default_schools[0] if default_schools else all_schools[0]
+            selected_school = pick_school("Select a School", schools, all_schools, default_school)
+            selected_unitid = grad_data.unitid_for(selected_school)
 
             col1, col2 = st.columns(2)
             with col1:
-                fig = graduation_funnel_chart(grad_data, selected_unitid=selected_unitid, selected_year=selected_years[-1])
-                st.plotly_chart(fig, use_container_width=True)
+                show_chart(graduation_funnel_chart(grad_data, selected_unitid=selected_unitid, selected_year=selected_years[-1]))
 
             with col2:
-                fig = plot_graduation_rate_trend(grad_data, selected_unitid=selected_unitid)
-                st.plotly_chart(fig, use_container_width=True)
-
-            col3, col4 = st.columns(2)
-            with col3:
-                selected_year = st.selectbox("Select a Year", available_years, index=len(available_years) - 1, key="grad_year_for_pie")
-            with col4:
-                selected_school = st.selectbox("Select a School", all_schools, index=all_schools.index(default_schools[0]), key="grad_school_for_pie")
-                selected_unitid = filtered_df[filtered_df["university_name"] == selected_school]["unitid"].iloc[0]
-
-            col5, col6 = st.columns(2)
-            with col5:
-                fig = plot_school_graduation_share_pie(grad_data, selected_school=selected_school, selected_year=selected_year)
-                if fig:
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.warning("⚠️ No data available to render graduation share pie chart for the selected school and year.")
-
-            with col6:
-                fig = plot_school_graduation_share_pie_by_unitid(grad_data, selected_unitid=selected_unitid, selected_year=selected_year)
-                if fig:
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.warning("⚠️ No valid graduation data found for the selected school and year.")
-
-            fig = plot_graduation_by_race_treemap(grad_data, selected_unitid=selected_unitid, selected_year=selected_years[-1])
-            st.plotly_chart(fig, use_container_width=True)
+                show_chart(plot_graduation_rate_trend(grad_data, selected_unitid=selected_unitid))
+
+            # The year and school below only change the share pies and the treemap
+            graduation_share_panel(grad_data, schools, all_schools, default_school, selected_years)
 
         else:
             st.warning("⚠️ No schools found for the selected year(s).")
@@ -259,33 +413,31 @@ elif st.session_state.active_page == "Graduation":
 # 🔸🔸 Financial Aid Page 🔸🔸
 elif st.session_state.active_page == "Financial Aid":
     st.markdown("""### :orange[Financial Aid]""")
-    sfa_data = load_data(sfa_fpath)
+    sfa_data = registry.get("sfa")
     
-    # Get sorted list of all institution names
-    all_schools = sorted(sfa_data["university_name"].dropna().unique())
-    default_school = "New Jersey Institute of Technology"
+    # Sorted institution names, prebuilt with the search index
+    schools = school_index(sfa_data)
+    default_school = warmup.DEFAULT_SCHOOL
 
     # Create and display the top 20 institutions by total aid chart
-    fig = plot_top20_institutions_by_total_aid(sfa_data)
-    st.plotly_chart(fig, use_container_width=True)
-    st.button("𝒾", help="This chart displays the top 20 institutions by total aid disbursed (grants + Pell + loans) in New Jersey. It helps identify the institutions that provide the highest financial assistance to students.")
-
-    # School selection dropdown
-    selected_school = st.selectbox(
-        "Select an Institution",
-        all_schools,
-        index=all_schools.index(default_school) if default_school in all_schools else 0
-    )
-
-    # Get UNITID for selected school
-    selected_unitid = sfa_data[sfa_data["university_name"] == selected_school]["unitid"].iloc[0]
-
-    # Create and display the net price chart
-    fig = plot_net_price_by_income(sfa_data, selected_school)
-    st.plotly_chart(fig, use_container_width=True)
-    st.button("𝒾", help="This chart shows the average net price paid by students in different family income brackets after accounting for all forms of financial aid. Net price represents the actual out-of-pocket cost for students and families.")
-
-    # Create and display the aid type breakdown chart
-    fig = plot_aid_type_breakdown_percent(sfa_data, selected_school)
-    st.plotly_chart(fig, use_container_width=True)
-    st.button("𝒾", help="This chart shows the percentage breakdown of total aid (grants, Pell, loans) per institution.")
+    show_chart(plot_top20_institutions_by_total_aid(sfa_data))
+    st.button("𝒾", help="This chart displays the top 20 institutions by total aid disbursed (grants + Pell + loans) in the selected state. It helps identify the institutions that provide the highest financial assistance to students.")
+
+    # The institution picker only changes the two charts below it
+    aid_school_panel(sfa_data, schools, default_school)
+
+# ---- Debug Timings Panel ----
+if profiling:
+    profile = instrument.end_rerun()
+    rerun_ms = (time.perf_counter() - rerun_started) * 1000
+    if os.environ.get("IPEDS_PROFILE_LOG"):
+        instrument.dump_json_lines(profile, os.environ["IPEDS_PROFILE_LOG"])
+
+    with st.sidebar.expander(f"⏱ Rerun: {rerun_ms:,.0f} ms", expanded=False):
+        if warm_report is not None:
+            st.caption(warmup.summary(warm_report))
+        timings = pd.DataFrame(profile.records, columns=["name"] + instrument.PHASES + ["total"]).fillna(0)
+        timings = timings.set_index("name") * 1000
+        timings.loc["all phases"] = timings.sum()
+        st.dataframe(timings.round(1), use_container_width=True)
+        st.download_button("Download JSON lines", profile.to_json_lines(), file_name="timings.jsonl", mime="application/json")
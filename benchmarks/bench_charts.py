@@ -0,0 +1,176 @@
+"""
+Time every chart builder in charts_*.py, per phase, at NJ and national scale.
+
+Each chart runs headless (no Streamlit server) with representative
+arguments, bypassing the figure cache. Phases come from instrument.recording():
+filter (index selection/query), aggregate (precomputed tables and reshaping),
+build (the rest of the builder, mostly Plotly) and serialize (Figure.to_json,
+what st.plotly_chart sends to the browser). Precomputed table builds are
+reported separately since they run once per dataset version.
+
+    python benchmarks/bench_charts.py [--institutions 7000] [--repeat 5]
+    python benchmarks/bench_charts.py --save results.json
+    python benchmarks/bench_charts.py --compare results.json [--threshold 1.25]
+
+--compare exits non-zero when a chart's total time grows past the threshold.
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+
+from common import scale_frame, uncached
+
+import data_loader  # noqa: E402  (common puts the repo root on sys.path)
+import charts_enrollment as ce  # noqa: E402
+import charts_finaid as cf  # noqa: E402
+import charts_graduation as cg  # noqa: E402
+from aggregates import EnrollmentShares, GraduationCube  # noqa: E402
+from data_index import IndexedDataset  # noqa: E402
+from instrument import recording  # noqa: E402
+
+NJIT = "New Jersey Institute of Technology"
+RUTGERS_NEWARK = "Rutgers University-Newark"
+NJIT_UNITID = 185828
+PHASES = ["filter", "aggregate", "build", "serialize"]
+
+
+def chart_calls(adms, grad, sfa):
+    """(name, builder, args, kwargs) for every chart, with the dashboard's default selections."""
+    years = adms.years
+    latest, previous = years[-1], years[-2]
+    grad_year = grad.years[-1]
+    return [
+        ("create_total_enrollment_bar_chart", ce.create_total_enrollment_bar_chart, (adms, [NJIT, RUTGERS_NEWARK], [previous, latest]), {}),
+        ("create_gender_enrollment_bar_chart", ce.create_gender_enrollment_bar_chart, (adms, [NJIT, RUTGERS_NEWARK], [previous, latest]), {}),
+        ("create_full_vs_part_time_trend", ce.create_full_vs_part_time_trend, (adms, NJIT), {}),
+        ("create_full_vs_part_time_trend_multiple", ce.create_full_vs_part_time_trend_multiple, (adms, [NJIT, RUTGERS_NEWARK]), {}),
+        ("create_admission_yield_rate_chart", ce.create_admission_yield_rate_chart, (adms, [NJIT, RUTGERS_NEWARK], [previous, latest]), {}),
+        ("plot_admission_funnel", ce.plot_admission_funnel, (adms, NJIT, latest), {}),
+        ("create_njit_vs_others_pie", ce.create_njit_vs_others_pie, (adms, [latest]), {}),
+        ("plot_njit_share_change", ce.plot_njit_share_change, (adms,), {}),
+        ("graduation_funnel_chart", cg.graduation_funnel_chart, (grad,), {"selected_unitid": NJIT_UNITID, "selected_year": grad_year}),
+        ("plot_graduation_rate_trend", cg.plot_graduation_rate_trend, (grad,), {"selected_unitid": NJIT_UNITID}),
+        ("plot_graduation_by_race_treemap", cg.plot_graduation_by_race_treemap, (grad,), {"selected_unitid": NJIT_UNITID, "selected_year": grad_year}),
+        ("plot_graduation_by_gender_bar", cg.plot_graduation_by_gender_bar, (grad,), {"selected_unitid": NJIT_UNITID, "selected_year": grad_year}),
+        ("plot_school_graduation_share_pie", cg.plot_school_graduation_share_pie, (grad,), {"selected_school": NJIT, "selected_year": grad_year}),
+        ("plot_school_graduation_share_pie_by_unitid", cg.plot_school_graduation_share_pie_by_unitid, (grad,), {"selected_unitid": NJIT_UNITID, "selected_year": grad_year}),
+        ("plot_net_price_by_income", cf.plot_net_price_by_income, (sfa, NJIT), {}),
+        ("plot_top20_institutions_by_total_aid", cf.plot_top20_institutions_by_total_aid, (sfa,), {}),
+        ("plot_aid_type_breakdown_percent", cf.plot_aid_type_breakdown_percent, (sfa, NJIT), {}),
+    ]
+
+
+def load_scale(institutions):
+    """Versioned, indexed datasets: the shipped NJ data, or NJ replicated to `institutions` schools."""
+    datasets = {}
+    for name in ("admission", "graduation", "sfa"):
+        df = data_loader.load_dataset(name)
+        if institutions:
+            # In memory only, so no source files: DuckDB scans the frame
+            df = data_loader.stamp(scale_frame(df, institutions), name, f"{df.attrs['version']}-x{institutions}")
+        datasets[name] = df
+    return datasets
+
+
+def time_tables(datasets):
+    """Build time of the per-version tables the charts read from (seconds)."""
+    timings = {}
+    for label, build in [
+        ("IndexedDataset(admission)", lambda: IndexedDataset(datasets["admission"])),
+        ("IndexedDataset(graduation)", lambda: IndexedDataset(datasets["graduation"])),
+        ("IndexedDataset(sfa)", lambda: IndexedDataset(datasets["sfa"])),
+        ("GraduationCube", lambda: GraduationCube(datasets["graduation"])),
+        ("EnrollmentShares", lambda: EnrollmentShares(datasets["admission"])),
+    ]:
+        start = time.perf_counter()
+        build()
+        timings[label] = time.perf_counter() - start
+    return timings
+
+
+def time_chart(builder, args, kwargs, repeat):
+    """Median seconds per phase over `repeat` uncached runs (after one warm-up run)."""
+    runs = {phase: [] for phase in PHASES + ["total"]}
+    for i in range(repeat + 1):
+        with recording() as timings:
+            start = time.perf_counter()
+            fig = uncached(builder)(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        if hasattr(fig, "to_json"):
+            fig.to_json()
+        serialize = time.perf_counter() - start
+        if i == 0:
+            continue
+        runs["filter"].append(timings.get("filter", 0.0))
+        runs["aggregate"].append(timings.get("aggregate", 0.0))
+        runs["build"].append(elapsed - timings.get("filter", 0.0) - timings.get("aggregate", 0.0))
+        runs["serialize"].append(serialize)
+        runs["total"].append(elapsed + serialize)
+    return {phase: statistics.median(values) for phase, values in runs.items()}
+
+
+def run_scale(label, institutions, repeat):
+    datasets = load_scale(institutions)
+    tables = time_tables(datasets)
+    adms, grad, sfa = (IndexedDataset(datasets[name]) for name in ("admission", "graduation", "sfa"))
+
+    print(f"\n== {label}: {len(adms):,} admission / {len(grad):,} graduation / {len(sfa):,} sfa rows")
+    print(f"{'chart':<44}" + "".join(f"{phase:>11}" for phase in PHASES) + f"{'total ms':>11}")
+    charts = {}
+    for name, builder, args, kwargs in chart_calls(adms, grad, sfa):
+        result = time_chart(builder, args, kwargs, repeat)
+        charts[name] = result
+        print(f"{name:<44}" + "".join(f"{result[phase] * 1e3:>11.2f}" for phase in PHASES + ["total"]))
+
+    print(f"{'table (once per dataset version)':<44}{'build ms':>11}")
+    for name, seconds in tables.items():
+        print(f"{name:<44}{seconds * 1e3:>11.2f}")
+    return {"charts": charts, "tables": tables}
+
+
+def compare(results, baseline, threshold):
+    """Charts whose total time grew by more than `threshold` x against a saved run."""
+    regressions = []
+    for scale, result in results.items():
+        for name, timings in result["charts"].items():
+            before = baseline.get(scale, {}).get("charts", {}).get(name)
+            if before and timings["total"] > before["total"] * threshold:
+                regressions.append(f"{scale} {name}: {before['total'] * 1e3:.2f} -> {timings['total'] * 1e3:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--institutions", type=int, default=7000, help="national scale; 0 runs NJ only")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier --save run")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    # st.warning() outside `streamlit run` only logs; keep the output to the tables
+    logging.disable(logging.WARNING)
+
+    results = {"nj": run_scale("NJ", 0, args.repeat)}
+    if args.institutions:
+        results[f"x{args.institutions}"] = run_scale(f"{args.institutions:,} institutions", args.institutions, args.repeat)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nRegressions (> {args.threshold}x):\n" + "\n".join(regressions))
+            sys.exit(1)
+        print(f"\nNo chart slower than {args.threshold}x the saved run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Time incremental vs full-rebuild dbt runs of the staging and mart models on a local DuckDB warehouse.
+
+The ipeds_dbt project is copied to a temporary folder and pointed at a DuckDB
+file standing in for Snowflake: IPEDS.RAW.GRAD2020-2023 / EFFY2019-2023 hold
+synthetic survey rows for --institutions schools, the code seeds are
+generated to match, and `number` is declared as a type alias so the models
+run unchanged. Then:
+
+  full build   dbt run --full-refresh (every year, every staging model)
+  incremental  dbt run after the newest year's raw rows are revised
+               (refresh_years reloads 2023; older years are skipped)
+
+Both builds must give the same marts, so institutions dropped from the
+revised year must not keep their old rows; a year deleted from the
+graduation mart is restored by the next incremental run. Needs dbt-core and dbt-duckdb
+(pip install "dbt-core==1.10.9" dbt-duckdb) and the dbt_utils package; the
+script runs `dbt deps` when it is missing and is skipped (exit 0) when that
+is not possible (e.g. no network).
+
+    python benchmarks/bench_dbt_incremental.py [--institutions 7000] [--repeat 1]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from common import REPO_ROOT
+
+import duckdb
+
+PROJECT_DIR = os.path.join(REPO_ROOT, "dbt-preprocessing", "ipeds_dbt")
+GRAD_YEARS = [2020, 2021, 2022, 2023]
+EFFY_YEARS = [2019, 2020, 2021, 2022, 2023]
+MARTS = ["graduation", "enrollment"]
+
+GRAD_COUNTS = [
+    f"GR{group}{sex}" for group in ("TOTL", "AIAN", "ASIA", "BKAA", "HISP", "NHPI", "WHIT", "2MOR", "UNKN", "NRAL")
+    for sex in ("T", "M", "W")
+]
+EFFY_COUNTS = ["EFYTOTLT", "EFYTOTLM", "EFYTOTLW", "EFYAIANT", "EFYASIAT", "EFYBKAAT", "EFYHISPT",
+               "EFYNHPIT", "EFYWHITT", "EFY2MORT", "EFYUNKNT", "EFYNRALT"]
+
+# code seed -> codes the synthetic rows use
+SEEDS = {
+    "graduation": {"grtype": range(1, 13), "chrtstat": range(10, 40), "section": range(1, 4),
+                   "cohort": range(1, 5), "line": [f"{n}A" for n in range(10, 40)]},
+    "enrollment": {"effyalev": range(1, 20), "effylev": range(1, 5), "lstudy": range(1, 5)},
+}
+
+
+def build_warehouse(path, institutions):
+    """
+    IPEDS.duckdb with RAW.GRADyyyy / RAW.EFFYyyyy of synthetic rows
+    (30 per school per grad year, 19 for enrollment).
+    """
+    con = duckdb.connect(path)
+    con.execute("create type if not exists number as decimal(38, 0)")
+    con.execute("create schema if not exists RAW")
+    for year in GRAD_YEARS:
+        counts = ", ".join(f"(hash(i, k, {year}, '{col}') % 500)::integer as {col}" for col in GRAD_COUNTS)
+        con.execute(f"""
+            create or replace table RAW.GRAD{year} as
+            select 100000 + i as UNITID, k % 12 + 1 as GRTYPE, 10 + k as CHRTSTAT, k % 3 + 1 as SECTION,
+                   k % 4 + 1 as COHORT, (10 + k)::varchar || 'A' as LINE, {counts}
+            from range({institutions}) t(i), range(30) c(k)
+        """)
+    for year in EFFY_YEARS:
+        counts = ", ".join(f"(hash(i, k, {year}, '{col}') % 5000)::integer as {col}" for col in EFFY_COUNTS)
+        con.execute(f"""
+            create or replace table RAW.EFFY{year} as
+            select 100000 + i as UNITID, k + 1 as EFFYALEV, k % 4 + 1 as EFFYLEV, k % 4 + 1 as LSTUDY, {counts}
+            from range({institutions}) t(i), range(19) c(k)
+        """)
+    con.close()
+
+
+def revise_newest_year(path):
+    """
+    What a revised IPEDS release looks like: some counts in the newest year
+    change and a few institutions are no longer reported.
+    """
+    con = duckdb.connect(path)
+    con.execute(f"update RAW.GRAD{GRAD_YEARS[-1]} set GRTOTLT = GRTOTLT + 1 where UNITID % 10 = 0")
+    con.execute(f"update RAW.EFFY{EFFY_YEARS[-1]} set EFYTOTLT = EFYTOTLT + 1 where UNITID % 10 = 0")
+    con.execute(f"delete from RAW.GRAD{GRAD_YEARS[-1]} where UNITID % 97 = 0")
+    con.execute(f"delete from RAW.EFFY{EFFY_YEARS[-1]} where UNITID % 97 = 0")
+    con.close()
+
+
+def write_project(work_dir, warehouse):
+    project = os.path.join(work_dir, "ipeds_dbt")
+    shutil.copytree(PROJECT_DIR, project, ignore=shutil.ignore_patterns("target", "logs"))
+    for folder, seeds in SEEDS.items():
+        os.makedirs(os.path.join(project, "seeds", folder), exist_ok=True)
+        for name, codes in seeds.items():
+            with open(os.path.join(project, "seeds", folder, f"{name}_code.csv"), "w") as f:
+                f.write("code,label\n" + "".join(f"{code},{name} {code}\n" for code in codes))
+    with open(os.path.join(project, "profiles.yml"), "w") as f:
+        f.write(f"ipeds_dbt:\n  target: bench\n  outputs:\n    bench:\n      type: duckdb\n"
+                f"      path: '{warehouse}'\n      threads: 1\n")
+    return project
+
+
+def run_dbt(project, *args):
+    """Seconds and result of one in-process dbt command; exits on failure."""
+    from dbt.cli.main import dbtRunner
+
+    start = time.perf_counter()
+    result = dbtRunner().invoke(list(args) + ["--project-dir", project, "--profiles-dir", project, "--quiet"])
+    elapsed = time.perf_counter() - start
+    if not result.success:
+        raise SystemExit(f"dbt {' '.join(args)} failed: {result.exception or result.result}")
+    return elapsed, result
+
+
+def require_dbt():
+    """
+    Make sure dbt and the project's packages (dbt_utils) are installed, running
+    `dbt deps` when the packages are missing. When that is not possible (no dbt,
+    or no network to fetch the packages), print why and exit 0: the check is
+    skipped, not failed.
+    """
+    try:
+        from dbt.cli.main import dbtRunner
+    except ImportError:
+        print('SKIPPED: dbt is not installed (pip install "dbt-core==1.10.9" dbt-duckdb)')
+        sys.exit(0)
+    if os.path.isdir(os.path.join(PROJECT_DIR, "dbt_packages", "dbt_utils")):
+        return
+    print(f"dbt_utils is not installed; running `dbt deps` in {PROJECT_DIR}")
+    # --log-level none: a failure is reported by the SKIPPED line below, not a dbt traceback
+    result = dbtRunner().invoke(["deps", "--project-dir", PROJECT_DIR, "--profiles-dir", PROJECT_DIR,
+                                 "--quiet", "--log-level", "none"])
+    if not result.success or not os.path.isdir(os.path.join(PROJECT_DIR, "dbt_packages", "dbt_utils")):
+        reason = type(result.exception).__name__ if result.exception else "no network?"
+        print(f"SKIPPED: `dbt deps` could not install dbt_utils ({reason}). "
+              f"Run it in {PROJECT_DIR} with network access, then re-run this script.")
+        sys.exit(0)
+
+
+def model_seconds(result):
+    return sum(r.execution_time for r in result.result.results)
+
+
+def mart_checksums(path):
+    """(rows, content hash) per mart table."""
+    con = duckdb.connect(path)
+    out = {}
+    for name in MARTS:
+        schema = con.execute(
+            "select table_schema from information_schema.tables where table_name = ?", [name]).fetchone()[0]
+        out[name] = con.execute(f'select count(*), sum(hash(t)) from "{schema}"."{name}" t').fetchone()
+    con.close()
+    return out
+
+
+def dropped_rows(path):
+    """Rows of the newest year the marts still hold for institutions the revision dropped."""
+    con = duckdb.connect(path)
+    rows = 0
+    for name in MARTS:
+        schema = con.execute("select table_schema from information_schema.tables where table_name = ?", [name]).fetchone()[0]
+        rows += con.execute(f'select count(*) from "{schema}"."{name}" '
+                            f'where survey_year = {GRAD_YEARS[-1]} and institution_id::integer % 97 = 0').fetchone()[0]
+    con.close()
+    return rows
+
+
+def delete_mart_year(path, name, year):
+    con = duckdb.connect(path)
+    schema = con.execute("select table_schema from information_schema.tables where table_name = ?", [name]).fetchone()[0]
+    con.execute(f'delete from "{schema}"."{name}" where survey_year = {year}')
+    con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--institutions", type=int, default=7000)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    require_dbt()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        warehouse = os.path.join(work_dir, "IPEDS.duckdb")
+        build_warehouse(warehouse, args.institutions)
+        project = write_project(work_dir, warehouse)
+        selection = ["--select", "staging", "marts"]
+        run_dbt(project, "seed")
+        run_dbt(project, "run", "--exclude", "staging", "marts")  # dimensions
+        print(f"{args.institutions:,} institutions, {len(GRAD_YEARS)} graduation / {len(EFFY_YEARS)} enrollment years")
+
+        full, incremental = [], []
+        failures = []
+        for _ in range(args.repeat):
+            full.append(run_dbt(project, "run", "--full-refresh", *selection))
+            expected = mart_checksums(warehouse)
+            revise_newest_year(warehouse)
+            incremental.append(run_dbt(project, "run", *selection))
+            revised = mart_checksums(warehouse)
+            if dropped_rows(warehouse):
+                failures.append("institutions dropped from the revised year kept their rows in the marts")
+            run_dbt(project, "run", "--full-refresh", *selection)
+            if mart_checksums(warehouse) != revised:
+                failures.append("incremental marts differ from a full rebuild after the newest year was revised")
+            if revised == expected:
+                failures.append("the revision of the newest year did not reach the marts")
+
+        delete_mart_year(warehouse, "graduation", GRAD_YEARS[1])
+        run_dbt(project, "run", *selection)
+        if mart_checksums(warehouse) != revised:
+            failures.append(f"incremental run did not restore the deleted {GRAD_YEARS[1]} graduation rows")
+
+    for label, runs in (("full rebuild", full), ("incremental", incremental)):
+        wall = min(seconds for seconds, _ in runs)
+        models = min(model_seconds(result) for _, result in runs)
+        print(f"{label:<14}{wall:>8.2f} s wall {models:>8.2f} s in models")
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(dict.fromkeys(failures)))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Time reading IPEDS dictionary workbooks with pd.read_excel vs the compiled cache.
+
+For each workbook: the notebooks' way (read the varlist sheet, build the
+mapping with iterrows; then the Frequencies sheet), a first load_dictionary
+(parse + compile) and a cached load in a fresh process state (hash check +
+JSON read). The compiled files go to a temporary folder.
+
+    python benchmarks/bench_dictionary.py raw/adm/adm2023_dict.xlsx raw/sfa/sfa_dict.xlsx
+"""
+import argparse
+import tempfile
+import time
+
+import pandas as pd
+
+import common  # noqa: F401  (puts the repo root on sys.path)
+
+import data_dictionary  # noqa: E402
+import data_loader  # noqa: E402
+
+
+def read_excel_mappings(path):
+    varlist = pd.read_excel(path, sheet_name="varlist")
+    mapping = {row["varname"]: str(row["varTitle"]).replace(" ", "_") for _, row in varlist.iterrows()}
+    freq = pd.read_excel(path, sheet_name="Frequencies")
+    return mapping, freq
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="dictionary workbooks (*dict.xlsx)")
+    args = parser.parse_args()
+
+    print(f"{'workbook':<40}{'read_excel':>12}{'compile':>12}{'cached':>12}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for path in args.paths:
+            excel, _ = timed(lambda: read_excel_mappings(path))
+            first, compiled = timed(lambda: data_dictionary.load_dictionary(path, cache_dir))
+            # Forget in-process state so the cached load re-hashes the workbook and reads the JSON
+            data_dictionary._LOADED.clear()
+            data_loader._SOURCE_HASHES.clear()
+            cached, reloaded = timed(lambda: data_dictionary.load_dictionary(path, cache_dir))
+            if reloaded.column_names() != compiled.column_names():
+                raise SystemExit(f"{path}: cached mapping differs from the compiled one")
+            print(f"{path:<40}" + "".join(f"{seconds * 1e3:>9.1f} ms" for seconds in (excel, first, cached)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Time the engine-backed aggregations under pandas and DuckDB at national scale.
+
+For each aggregation behind plot_njit_share_change, create_njit_vs_others_pie,
+plot_graduation_rate_trend and plot_top20_institutions_by_total_aid:
+
+  cold  first call on a new data version (pandas builds its per-version
+        table, DuckDB registers the view)
+  warm  best-of repeat calls once that is done
+
+The datasets are the configured extracts (their Parquet cache, which DuckDB
+reads directly) replicated to --institutions schools in memory, which DuckDB
+scans as a frame. Use --institutions 0 to time the Parquet path alone, e.g. on
+a synthetic national extract:
+
+    python benchmarks/bench_engine.py [--institutions 7000] [--repeat 5]
+    IPEDS_DATA_DIR=data/synthetic IPEDS_DATA_PREFIX=SYN python benchmarks/bench_engine.py --institutions 0
+"""
+import argparse
+import itertools
+import time
+
+from common import best_of, scale_frame
+
+import aggregates  # noqa: E402  (common puts the repo root on sys.path)
+import data_loader  # noqa: E402
+import query_engine  # noqa: E402
+from data_index import IndexedDataset  # noqa: E402
+
+GRANT_COLUMN = "total_amount_of_federal_state_local_institutional_or_other_sources_of_grant_aid_awarded_to_undergraduate_students"
+NJIT = "New Jersey Institute of Technology"
+NJIT_UNITID = 185828
+ENGINES = ["pandas", "duckdb"]
+
+_fresh = itertools.count()
+
+
+def load(institutions):
+    datasets = {}
+    for name in ("admission", "graduation", "sfa"):
+        df = data_loader.load_dataset(name)
+        if institutions:
+            # In memory only, so no source files: DuckDB scans the frame
+            df = data_loader.stamp(scale_frame(df, institutions), name, f"{df.attrs['version']}-x{institutions}")
+        datasets[name] = df
+    return datasets
+
+
+def restamped(df):
+    """An IndexedDataset of `df` under a never-seen version, so per-version tables and views are rebuilt."""
+    version = f"{df.attrs['version']}-run{next(_fresh)}"
+    source = df.attrs.get("source")
+    frame = data_loader.stamp(df.copy(deep=False), df.attrs["dataset"], version, source and source["files"])
+    return IndexedDataset(frame)
+
+
+def aggregations(datasets):
+    """(label, dataset name, fn(data)) per engine-backed aggregation, with the dashboard's defaults."""
+    years = sorted(datasets["admission"]["year"].unique())
+    return [
+        ("school_shares (share change)", "admission", lambda data: aggregates.school_shares(data, NJIT)),
+        ("school_totals (pie)", "admission", lambda data: aggregates.school_totals(data, NJIT, years[-1:])),
+        ("graduation_yearly (trend, NJIT)", "graduation", lambda data: aggregates.graduation_yearly(data, NJIT_UNITID)),
+        ("graduation_yearly (trend, all)", "graduation", lambda data: aggregates.graduation_yearly(data)),
+        ("top_rows (top 20 aid)", "sfa", lambda data: aggregates.top_rows(
+            data, GRANT_COLUMN, ["university_name", GRANT_COLUMN], n=20)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--institutions", type=int, default=7000, help="replicate to this many schools; 0 keeps the extract")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if query_engine.duckdb is None:
+        raise SystemExit("duckdb is not installed: pip install duckdb")
+
+    datasets = load(args.institutions)
+    print(f"{len(datasets['admission']):,} admission / {len(datasets['graduation']):,} graduation / "
+          f"{len(datasets['sfa']):,} sfa rows")
+    print(f"{'aggregation':<34}" + "".join(f"{engine + ' ' + kind:>14}" for engine in ENGINES for kind in ("cold", "warm")))
+
+    for label, name, fn in aggregations(datasets):
+        row = []
+        for engine in ENGINES:
+            query_engine.use(engine)
+            data = restamped(datasets[name])
+            start = time.perf_counter()
+            fn(data)
+            row.append(time.perf_counter() - start)
+            row.append(best_of(lambda: fn(data), args.repeat))
+        print(f"{label:<34}" + "".join(f"{seconds * 1e3:>11.2f} ms" for seconds in row))
+    query_engine.use("pandas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Per-interaction latency of app.py: what one widget change costs, in Streamlit's AppTest.
+
+For each interaction the page is opened with its default selections (so the
+charts that do not depend on the widget are in the figure cache, as for a
+user), then the widget is changed and the rerun timed. When the widget sits
+in a panel (an st.fragment in app.py) the rerun is scoped to that fragment,
+as the browser requests it; otherwise the whole script reruns. "charts" is
+the number of chart builder calls in the rerun (figure cache hits included).
+
+Compare the app before and after a change by pointing --app at a copy:
+
+    git show HEAD~1:app.py > /tmp/app_before.py
+    python benchmarks/bench_interactions.py --app /tmp/app_before.py
+    python benchmarks/bench_interactions.py
+"""
+import argparse
+import functools
+import logging
+import os
+import statistics
+import time
+
+from common import REPO_ROOT
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1 import local_script_runner  # noqa: E402
+
+from figure_cache import FIGURE_CACHE  # noqa: E402
+
+# (label, page, section, panel the widget is in, how to find the widget, option index to pick)
+INTERACTIONS = [
+    ("share pie year", "Enrollment", "section1", "share_pie_panel", ("selectbox", {"key": "year_selector_pie"}), 0),
+    ("admission funnel year", "Enrollment", "section2", "admission_funnel_panel", ("selectbox", {"label": "Select a Year"}), 0),
+    ("comparison years", "Enrollment", "section3", "comparison_panel", ("multiselect", {"label": "Select Years"}), 0),
+    ("graduation pie year", "Graduation", None, "graduation_share_panel", ("selectbox", {"key": "grad_year_for_pie"}), 0),
+    ("graduation pie school", "Graduation", None, "graduation_share_panel", ("selectbox", {"key": "grad_school_for_pie"}), 1),
+    ("financial aid school", "Financial Aid", None, "aid_school_panel", ("selectbox", {"label": "Select an Institution"}), 1),
+    ("graduation years (page)", "Graduation", None, None, ("multiselect", {"label": "Select Years"}), 0),
+]
+
+
+def open_page(app, page, section):
+    at = AppTest.from_file(app, default_timeout=120)
+    at.session_state["active_page"] = page
+    at.session_state["enrollment_section"] = section
+    at.run()
+    return at
+
+
+def find_widget(at, kind, match):
+    widgets = getattr(at, kind)
+    if "key" in match:
+        return widgets(key=match["key"]) if callable(widgets) else next(w for w in widgets if w.key == match["key"])
+    return next(w for w in widgets if w.label == match["label"])
+
+
+def fragment_id(at, panel):
+    """The id AppTest registered for the fragment wrapping `panel`, or None (no such fragment)."""
+    if panel is None:
+        return None
+    for fid, fragment in at._fragment_storage._fragments.items():
+        cells = [cell.cell_contents for cell in fragment.__closure__ or ()]
+        if any(getattr(cell, "__name__", None) == panel for cell in cells):
+            return fid
+    return None
+
+
+def rerun(at, fid):
+    """at.run(), scoped to fragment `fid` as the browser would request it (full rerun when None)."""
+    if fid is None:
+        return at.run()
+    rerun_data = local_script_runner.RerunData
+    local_script_runner.RerunData = functools.partial(rerun_data, fragment_id_queue=[fid])
+    try:
+        return at.run()
+    finally:
+        local_script_runner.RerunData = rerun_data
+
+
+def measure(app, interaction):
+    label, page, section, panel, (kind, match), option = interaction
+    FIGURE_CACHE.clear()
+    at = open_page(app, page, section)
+    widget = find_widget(at, kind, match)
+    if kind == "multiselect":
+        widget.select(widget.options[option])
+    else:
+        widget.set_value(widget.options[option])
+
+    before = FIGURE_CACHE.info()
+    fid = fragment_id(at, panel)
+    start = time.perf_counter()
+    rerun(at, fid)
+    elapsed = time.perf_counter() - start
+    after = FIGURE_CACHE.info()
+    if at.exception:
+        raise SystemExit(f"{label}: {at.exception[0].value}")
+    charts = after["hits"] + after["misses"] - before["hits"] - before["misses"]
+    return elapsed, charts, fid is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--app", default=os.path.join(REPO_ROOT, "app.py"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # AppTest's bare-mode and deprecation warnings
+    os.chdir(REPO_ROOT)
+    open_page(os.path.abspath(args.app), "Enrollment", None)  # imports and the warm-up, off the clock
+
+    print(f"{'interaction':<26}{'rerun':>10}{'median ms':>11}{'charts':>8}")
+    for interaction in INTERACTIONS:
+        runs = [measure(os.path.abspath(args.app), interaction) for _ in range(args.repeat)]
+        median = statistics.median(seconds for seconds, _, _ in runs) * 1000
+        scope = "panel" if runs[0][2] else "page"
+        print(f"{interaction[0]:<26}{scope:>10}{median:>11.0f}{runs[0][1]:>8}")
+
+
+if __name__ == "__main__":
+    main()
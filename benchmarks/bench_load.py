@@ -0,0 +1,54 @@
+"""
+Compare raw CSV parsing against the typed Parquet cache in data_loader.
+
+The NJ extracts are replicated with shifted unitids until each dataset covers
+roughly as many institutions as the national IPEDS universe (~7,000).
+
+    python benchmarks/bench_load.py [--institutions 7000] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from common import best_of, scale_frame
+
+import data_loader  # noqa: E402  (common puts the repo root on sys.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--institutions", type=int, default=7000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'dataset':<12}{'rows':>10}{'csv MB':>9}{'pq MB':>8}"
+          f"{'read_csv s':>12}{'convert s':>11}{'parquet s':>11}{'speedup':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, spec in data_loader.DATASETS.items():
+            csv_path = os.path.join(tmp, f"{name}.csv")
+            scale_frame(pd.read_csv(spec["path"], low_memory=False), args.institutions).to_csv(csv_path, index=False)
+
+            csv_time = best_of(lambda: pd.read_csv(csv_path, low_memory=False), args.repeat)
+
+            start = time.perf_counter()
+            data_loader.build_cache(name, cache_dir=tmp, csv_path=csv_path)
+            convert_time = time.perf_counter() - start
+
+            parquet_time = best_of(
+                lambda: data_loader.load_dataset(name, cache_dir=tmp, csv_path=csv_path), args.repeat
+            )
+
+            rows = len(data_loader.load_dataset(name, cache_dir=tmp, csv_path=csv_path))
+            csv_mb = os.path.getsize(csv_path) / 1e6
+            pq_mb = os.path.getsize(data_loader.cache_path(name, tmp)) / 1e6
+            print(f"{name:<12}{rows:>10,}{csv_mb:>9.1f}{pq_mb:>8.1f}"
+                  f"{csv_time:>12.3f}{convert_time:>11.3f}{parquet_time:>11.3f}"
+                  f"{csv_time / parquet_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Compare loading a whole dataset against loading one state's partitions.
+
+Rows, in-memory MB and best-of load time for the full compacted cache and for
+data_partitions.load_partitions() with one state (and one state + latest
+year). Partitions are built first if missing or stale. Point it at a
+national-scale extract from benchmarks/synthetic.py to see the difference:
+
+    IPEDS_DATA_DIR=data/synthetic IPEDS_DATA_PREFIX=SYN python benchmarks/bench_partitions.py --state NJ
+"""
+import argparse
+
+from common import best_of
+
+import data_loader  # noqa: E402  (common puts the repo root on sys.path)
+import data_partitions  # noqa: E402
+
+
+def measure(label, load, repeat):
+    df = load()
+    seconds = best_of(load, repeat)
+    mb = df.memory_usage(deep=True).sum() / 1e6
+    print(f"  {label:<24}{len(df):>10,}{mb:>10.1f}{seconds * 1e3:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--state", default=data_partitions.DEFAULT_STATE)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--datasets", nargs="+", default=["admission", "graduation", "sfa"])
+    args = parser.parse_args()
+
+    for name in args.datasets:
+        states, years = data_partitions.available(name)
+        print(f"\n== {name}: {len(states)} states, {len(years)} years")
+        print(f"  {'load':<24}{'rows':>10}{'MB':>10}{'ms':>10}")
+        measure("all states", lambda: data_loader.load_dataset(name), args.repeat)
+        measure(f"state={args.state}", lambda: data_partitions.load_partitions(name, states=[args.state]), args.repeat)
+        measure(
+            f"state={args.state} year={years[-1]}",
+            lambda: data_partitions.load_partitions(name, states=[args.state], years=[years[-1]]),
+            args.repeat,
+        )
+
+
+if __name__ == "__main__":
+    main()
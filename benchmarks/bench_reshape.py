@@ -0,0 +1,86 @@
+"""
+Scaling of the gender enrollment and graduation funnel charts with the number of institutions.
+
+The gender chart is built for N selected institutions over two years; its
+long-form step is also timed against the old per-row iterrows loop. The funnel
+is built statewide over a graduation dataset of N institutions, including the
+status cube it reads from. Figure caching is bypassed.
+
+    python benchmarks/bench_reshape.py [--institutions 50 100 200 400 800] [--repeat 3]
+"""
+import argparse
+
+import pandas as pd
+
+from common import best_of, scale_frame, uncached
+
+import data_loader  # noqa: E402  (common puts the repo root on sys.path)
+from charts_enrollment import create_gender_enrollment_bar_chart  # noqa: E402
+from charts_graduation import graduation_funnel_chart  # noqa: E402
+from data_index import IndexedDataset  # noqa: E402
+from reshape import to_long  # noqa: E402
+
+
+def iterrows_long(filtered_data):
+    """The per-row reshaping the gender chart used before reshape.to_long."""
+    rows = []
+    for _, row in filtered_data.iterrows():
+        try:
+            men = float(row["Enrolled__men"])
+        except (TypeError, ValueError):
+            men = 0
+        try:
+            women = float(row["Enrolled__women"])
+        except (TypeError, ValueError):
+            women = 0
+        rows.append({"university_name": row["university_name"], "year": row["year"], "Gender": "Men", "Headcount": men})
+        rows.append({"university_name": row["university_name"], "year": row["year"], "Gender": "Women", "Headcount": women})
+    return pd.DataFrame(rows)
+
+
+def melt_long(filtered_data):
+    return to_long(
+        filtered_data,
+        id_vars=["university_name", "year"],
+        value_vars=["Enrolled__men", "Enrolled__women"],
+        var_name="Gender",
+        value_name="Headcount",
+        labels={"Enrolled__men": "Men", "Enrolled__women": "Women"},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--institutions", type=int, nargs="+", default=[50, 100, 200, 400, 800])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    admission = data_loader.load_dataset("admission")
+    graduation = data_loader.load_dataset("graduation")
+    years = sorted(admission["year"].unique())[-2:]
+
+    print(f"{'institutions':>12}{'iterrows ms':>13}{'melt ms':>9}{'gender ms':>11}"
+          f"{'per inst':>10}{'grad rows':>11}{'funnel ms':>11}{'per inst':>10}")
+
+    for n in args.institutions:
+        adms = IndexedDataset(scale_frame(admission, n))
+        schools = adms.school_names[:n]
+        selected = adms.select(names=schools, years=years)
+
+        old_time = best_of(lambda: iterrows_long(selected), args.repeat)
+        new_time = best_of(lambda: melt_long(selected), args.repeat)
+        gender_time = best_of(
+            lambda: uncached(create_gender_enrollment_bar_chart)(adms, schools, years), args.repeat
+        )
+
+        grad = scale_frame(graduation, n)
+        # An unversioned frame gets a fresh status cube on every call, so the build is included
+        funnel_time = best_of(lambda: uncached(graduation_funnel_chart)(grad), args.repeat)
+
+        print(f"{n:>12}{old_time * 1e3:>13.1f}{new_time * 1e3:>9.1f}{gender_time * 1e3:>11.1f}"
+              f"{gender_time * 1e6 / n:>8.0f}µs{len(grad):>11,}{funnel_time * 1e3:>11.1f}"
+              f"{funnel_time * 1e6 / n:>8.0f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Per-query latency of the notebooks' str.contains search vs the prebuilt SchoolIndex.
+
+The admission extract's institutions are replicated to --institutions schools
+(names stay unique). The scan is the old search_school: a case-insensitive
+substring match over every name. The index answers word prefixes, acronyms
+and aliases as well; its one-off build time is shown separately. Queries that
+the scan cannot answer ("NJIT", "Rutgers Newark") show up as 0 matches.
+
+    python benchmarks/bench_search.py [--institutions 9600] [--repeat 200]
+"""
+import argparse
+import time
+
+from common import scale_frame
+
+import data_loader  # noqa: E402  (common puts the repo root on sys.path)
+from school_search import SchoolIndex  # noqa: E402
+
+QUERIES = ["new jersey institute", "NJIT", "Rutgers Newark", "TCNJ", "montclair st", "college", "montclare"]
+
+
+def per_call_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--institutions", type=int, default=9600)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    base = data_loader.load_dataset("admission")[["unitid", "university_name"]].drop_duplicates("unitid")
+    schools = scale_frame(base, args.institutions).astype({"university_name": str})
+    names = schools["university_name"]
+
+    start = time.perf_counter()
+    index = SchoolIndex.from_frame(schools)
+    print(f"{len(index):,} schools, index built in {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+    print(f"{'query':<24}{'scan us':>10}{'found':>7}{'index us':>10}  best match")
+    for query in QUERIES:
+        scan_us, found = per_call_us(lambda: schools[names.str.contains(query, case=False, na=False)], args.repeat)
+        index_us, best = per_call_us(lambda: index.search(query), args.repeat)
+        print(f"{query!r:<24}{scan_us:>10.0f}{len(found):>7}{index_us:>10.1f}  {best[0] if best else '-'}")
+
+
+if __name__ == "__main__":
+    main()
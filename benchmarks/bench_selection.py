@@ -0,0 +1,59 @@
+"""
+Per-selection latency of boolean masks vs the (unitid, year) index in data_index.
+
+The graduation dataset is scaled up by replicating institutions; the mask
+cost grows with the row count while the indexed lookup stays flat.
+
+    python benchmarks/bench_selection.py [--scales 1 10 100] [--lookups 200]
+"""
+import argparse
+import random
+import time
+
+from common import scale_frame
+
+import data_loader  # noqa: E402
+from data_index import IndexedDataset  # noqa: E402
+
+
+def per_call_us(fn, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    base = data_loader.load_dataset("graduation")
+    n_schools = base["unitid"].nunique()
+    rng = random.Random(0)
+
+    print(f"{'scale':>6}{'rows':>12}{'build ms':>10}{'mask us':>10}{'index us':>10}"
+          f"{'name mask us':>14}{'name index us':>15}")
+    for scale in args.scales:
+        df = scale_frame(base, n_schools * scale)
+
+        start = time.perf_counter()
+        indexed = IndexedDataset(df)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        pairs = list(indexed._pair_offsets)
+        picks = [rng.choice(pairs) for _ in range(args.lookups)]
+        names = [(rng.choice(indexed.school_names),) for _ in range(args.lookups)]
+
+        mask_us = per_call_us(lambda u, y: df[(df["unitid"] == u) & (df["year"] == y)], picks)
+        index_us = per_call_us(lambda u, y: indexed.select(unitids=[u], years=[y]), picks)
+        name_mask_us = per_call_us(lambda n: df[df["university_name"] == n], names)
+        name_index_us = per_call_us(lambda n: indexed.select(names=[n]), names)
+
+        print(f"{scale:>6}{len(df):>12,}{build_ms:>10.1f}{mask_us:>10.1f}{index_us:>10.1f}"
+              f"{name_mask_us:>14.1f}{name_index_us:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Check that frames derived from a loaded dataset never get the whole dataset's cached results.
+
+Pandas copies attrs, and with them data_loader's version stamp, onto every
+frame derived from a loaded one. Each per-version cache is first filled from
+the loaded dataset, then called with derived frames (filtered, edited and
+sorted copies, and a selection of the indexed dataset). The results for a
+derived frame must equal a fresh, uncached computation on that frame.
+
+Exits non-zero on any failure.
+
+    python benchmarks/check_derived_frames.py
+"""
+import json
+import logging
+import sys
+
+import pandas as pd
+
+from bench_charts import chart_calls
+from common import uncached
+
+import aggregates  # noqa: E402  (common puts the repo root on sys.path)
+import data_loader  # noqa: E402
+import query_engine  # noqa: E402
+from data_index import IndexedDataset, as_indexed, dataset_version  # noqa: E402
+
+# The measure each dataset's edited copy changes
+MEASURES = {
+    "admission": "Enrolled_total",
+    "graduation": "Total",
+    "sfa": "total_amount_of_federal_state_local_institutional_or_other_sources_of_grant_aid_awarded_to_undergraduate_students",
+}
+
+
+def derived_frames(name, df):
+    """{label: frame derived from the loaded `df`}; each one keeps df's attrs."""
+    unitid = df["unitid"].iloc[0]
+    measure = MEASURES[name]
+    return {
+        "filtered": df[df["unitid"] == unitid],
+        "edited": df.assign(**{measure: df[measure] * 2}),
+        "sorted": df.sort_values("year", ascending=False, kind="stable"),
+        "selection": IndexedDataset(df).select(unitids=[int(unitid)]),
+    }
+
+
+def same(left, right):
+    try:
+        pd.testing.assert_frame_equal(left, right)
+    except AssertionError:
+        return False
+    return True
+
+
+def check_indexes(name, df, failures):
+    """as_indexed indexes a derived frame on its own, and nothing derived carries a version."""
+    as_indexed(df)
+    for label, frame in derived_frames(name, df).items():
+        if dataset_version(frame) is not None:
+            failures.append(f"{name} {label}: has the dataset's version {dataset_version(frame)}")
+        if not same(as_indexed(frame).frame, IndexedDataset(frame).frame):
+            failures.append(f"{name} {label}: as_indexed returned another frame's index")
+    selection = IndexedDataset(df).select(unitids=[int(df["unitid"].iloc[0])])
+    if set(selection.attrs) & set(data_loader.STAMP_KEYS):
+        failures.append(f"{name}: a selection kept the stamp attrs {sorted(selection.attrs)}")
+
+
+def check_graduation_cube(df, failures):
+    """graduation_cube (per-version cube) on derived frames, after it holds the loaded dataset's cube."""
+    aggregates.graduation_cube(df)
+    for label, frame in derived_frames("graduation", df).items():
+        if not same(aggregates.graduation_cube(frame).cube, aggregates.GraduationCube(frame).cube):
+            failures.append(f"graduation_cube on the {label} frame: got the cube of other data")
+
+
+def check_enrollment_shares(df, failures):
+    """enrollment_shares (per-version shares) on derived frames, after it holds the loaded dataset's shares."""
+    aggregates.enrollment_shares(df)
+    latest = df[df["year"] == df["year"].max()]
+    frames = dict(derived_frames("admission", df), **{"latest year": latest})
+    for label, frame in frames.items():
+        cached, fresh = aggregates.enrollment_shares(frame), aggregates.EnrollmentShares(frame)
+        if not (same(cached.enrollment, fresh.enrollment) and same(cached.share, fresh.share)):
+            failures.append(f"enrollment_shares on the {label} frame: got the shares of other data")
+
+
+def check_engine(datasets, failures):
+    """The DuckDB aggregations on derived frames, after their views hold the loaded datasets."""
+    if query_engine.duckdb is None:
+        print("duckdb is not installed: skipping the engine checks")
+        return
+    previous = query_engine.use("duckdb")
+    try:
+        admission, graduation = datasets["admission"], datasets["graduation"]
+        school = admission["university_name"].iloc[0]
+        aggregates.graduation_yearly(graduation)
+        aggregates.school_shares(admission, school)
+        for label, frame in derived_frames("graduation", graduation).items():
+            if not same(aggregates.graduation_yearly(frame), aggregates.GraduationCube(frame).yearly()):
+                failures.append(f"graduation_yearly (duckdb) on the {label} frame: got the result of other data")
+        for label, frame in derived_frames("admission", admission).items():
+            fresh = aggregates.EnrollmentShares(frame).for_school(school)
+            if not same(aggregates.school_shares(frame, school)[fresh.columns], fresh):
+                failures.append(f"school_shares (duckdb) on the {label} frame: got the result of other data")
+    finally:
+        query_engine.use(previous)
+
+
+def comparable(result):
+    """A chart result as plain values: a figure as parsed JSON, anything else as its repr."""
+    return json.loads(result.to_json()) if hasattr(result, "to_json") else repr(result)
+
+
+def check_figures(datasets, failures):
+    """Chart builders (figure cache) on derived frames, after the cache holds the loaded datasets' figures."""
+    indexed = {name: IndexedDataset(df) for name, df in datasets.items()}
+    calls = chart_calls(indexed["admission"], indexed["graduation"], indexed["sfa"])
+    for _, builder, args, kwargs in calls:
+        builder(*args, **kwargs)
+    for name, builder, args, kwargs in calls:
+        dataset = next(n for n, data in indexed.items() if data is args[0])
+        for label, frame in derived_frames(dataset, datasets[dataset]).items():
+            cached = comparable(builder(frame, *args[1:], **kwargs))
+            if cached != comparable(uncached(builder)(frame, *args[1:], **kwargs)):
+                failures.append(f"{name} on the {label} {dataset} frame: got a cached figure of other data")
+
+
+def main():
+    # st.warning() outside `streamlit run` only logs; keep the output to the results
+    logging.disable(logging.WARNING)
+
+    datasets = {name: data_loader.load_dataset(name) for name in MEASURES}
+    failures = []
+    for name, df in datasets.items():
+        check_indexes(name, df, failures)
+    check_graduation_cube(datasets["graduation"], failures)
+    check_enrollment_shares(datasets["admission"], failures)
+    check_engine(datasets, failures)
+    check_figures(datasets, failures)
+
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("OK: derived frames get their own results, not the loaded dataset's")
+
+
+if __name__ == "__main__":
+    main()
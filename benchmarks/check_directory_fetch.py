@@ -0,0 +1,123 @@
+"""
+Check the institution directory fetcher against a local stub of the directory API.
+
+The stub serves /directory/<year>/?unitid=a,b,c with paged results
+(`next` links) and a fixed delay per request, and counts requests and the
+peak number in flight. The check fetches N unitids and verifies that every
+name resolves, that requests were batched and ran concurrently, and that a
+second fetch is served entirely from the on-disk cache. The time of one
+request per unitid at the same delay is shown for contrast.
+
+    python benchmarks/check_directory_fetch.py [--unitids 2000] [--delay 0.02]
+"""
+import argparse
+import json
+import math
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import common  # noqa: F401  (puts the repo root on sys.path)
+
+import institution_directory  # noqa: E402
+
+PAGE_SIZE = 40
+
+
+class StubDirectory(BaseHTTPRequestHandler):
+    delay = 0.0
+    requests = 0
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            time.sleep(cls.delay)
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            unitids = [int(u) for u in query.get("unitid", [""])[0].split(",") if u]
+            page = int(query.get("page", ["1"])[0])
+            chunk = unitids[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+            more = page * PAGE_SIZE < len(unitids)
+            body = {
+                "count": len(unitids),
+                "next": f"http://{self.headers['Host']}{url.path}?{urlencode({'unitid': query['unitid'][0], 'page': page + 1})}" if more else None,
+                "results": [{"unitid": u, "inst_name": f"Institution {u}", "state_abbr": "NJ"} for u in chunk],
+            }
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--unitids", type=int, default=2000)
+    parser.add_argument("--delay", type=float, default=0.02, help="seconds the stub waits per request")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    StubDirectory.delay = args.delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubDirectory)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/directory/{{year}}/"
+    unitids = list(range(100000, 100000 + args.unitids))
+    failures = []
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        directory = institution_directory.fetch(
+            unitids, batch_size=args.batch_size, workers=args.workers, base_url=base_url, cache_dir=cache_dir)
+        elapsed = time.perf_counter() - start
+        first_requests, peak = StubDirectory.requests, StubDirectory.peak
+
+        batches = math.ceil(args.unitids / args.batch_size)
+        expected = batches * math.ceil(min(args.batch_size, args.unitids) / PAGE_SIZE)
+        names = directory.names(unitids)
+        if names.isna().any() or names.iloc[0] != f"Institution {unitids[0]}":
+            failures.append(f"{int(names.isna().sum())} unitids without a name")
+        if first_requests > expected:
+            failures.append(f"{first_requests} requests for {batches} batches (expected at most {expected})")
+        if args.workers > 1 and peak < 2:
+            failures.append("requests never overlapped")
+
+        StubDirectory.requests = 0
+        start = time.perf_counter()
+        cached = institution_directory.fetch(
+            unitids, batch_size=args.batch_size, workers=args.workers, base_url=base_url, cache_dir=cache_dir)
+        cached_elapsed = time.perf_counter() - start
+        if StubDirectory.requests:
+            failures.append(f"cached refresh made {StubDirectory.requests} requests")
+        if len(cached) != len(directory):
+            failures.append("cached refresh returned a different directory")
+
+    server.shutdown()
+    print(f"{args.unitids:,} unitids: {first_requests} requests, peak {peak} in flight, {elapsed * 1e3:.0f} ms")
+    print(f"cached refresh: {StubDirectory.requests} requests, {cached_elapsed * 1e3:.0f} ms")
+    print(f"one request per unitid at {args.delay * 1e3:.0f} ms each: ~{args.unitids * args.delay:.1f} s")
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
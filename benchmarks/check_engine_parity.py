@@ -0,0 +1,125 @@
+"""
+Check that the DuckDB query engine returns what the pandas path returns.
+
+Runs every engine-backed aggregation in aggregates.py (school shares, school
+vs. others totals, graduation year × status tables, top rows by aid) under
+both engines, for every school / unitid in the data: on the Parquet cache,
+on one state's partitions, and on a scaled in-memory copy (which DuckDB
+scans as a frame).
+The four charts built on them are compared as figure JSON too.
+Exits non-zero on any mismatch.
+
+    python benchmarks/check_engine_parity.py [--institutions 1000]
+"""
+import argparse
+import json
+import logging
+import sys
+
+import numpy as np
+import pandas as pd
+from common import scale_frame, uncached
+
+import aggregates  # noqa: E402  (common puts the repo root on sys.path)
+import data_loader  # noqa: E402
+import data_partitions  # noqa: E402
+import query_engine  # noqa: E402
+from charts_enrollment import create_njit_vs_others_pie, plot_njit_share_change  # noqa: E402
+from charts_finaid import plot_top20_institutions_by_total_aid  # noqa: E402
+from charts_graduation import plot_graduation_rate_trend  # noqa: E402
+from data_index import IndexedDataset  # noqa: E402
+
+GRANT_COLUMN = "total_amount_of_federal_state_local_institutional_or_other_sources_of_grant_aid_awarded_to_undergraduate_students"
+NJIT_UNITID = 185828
+
+
+def calls(adms, grad, sfa):
+    """(label, fn) for every aggregation and chart the engine serves."""
+    years = adms.years
+    out = []
+    for name in adms.school_names:
+        out.append((f"school_shares {name}", lambda name=name: aggregates.school_shares(adms, name)))
+        out.append((f"school_totals {name}", lambda name=name: aggregates.school_totals(adms, name, years[-2:])))
+    out.append(("school_totals missing year", lambda: aggregates.school_totals(adms, adms.school_names[0], [1900])))
+    for unitid in [None] + sorted(grad.frame["unitid"].unique().tolist()):
+        out.append((f"graduation_yearly {unitid}", lambda unitid=unitid: aggregates.graduation_yearly(grad, unitid)))
+    out.append(("top_rows", lambda: aggregates.top_rows(sfa, GRANT_COLUMN, ["university_name", GRANT_COLUMN], n=20)))
+
+    out.append(("create_njit_vs_others_pie", lambda: uncached(create_njit_vs_others_pie)(adms, years[-1:])))
+    out.append(("plot_njit_share_change", lambda: uncached(plot_njit_share_change)(adms)))
+    out.append(("plot_graduation_rate_trend", lambda: uncached(plot_graduation_rate_trend)(grad, selected_unitid=NJIT_UNITID)))
+    out.append(("plot_top20_institutions_by_total_aid", lambda: uncached(plot_top20_institutions_by_total_aid)(sfa)))
+    return out
+
+
+def _comparable(result):
+    """Results as plain values: frames by column name without dtypes, figures as parsed JSON."""
+    if hasattr(result, "to_json") and hasattr(result, "data"):
+        return json.loads(result.to_json())
+    if isinstance(result, pd.DataFrame):
+        # Row labels count when they are named (years); column order does not
+        frame = result.sort_index(axis=1).reset_index(drop=result.index.name is None)
+        return [[v.item() if hasattr(v, "item") else v for v in row] for row in frame.astype(object).to_numpy()]
+    return result
+
+
+def _same(a, b):
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return bool(np.isclose(a, b, rtol=1e-9, equal_nan=True))
+    if a is None or b is None:
+        return a is b or bool(pd.isna(a) and pd.isna(b))
+    return str(a) == str(b)
+
+
+def check(label, adms, grad, sfa):
+    mismatches = []
+    for name, fn in calls(adms, grad, sfa):
+        query_engine.use("pandas")
+        expected = _comparable(fn())
+        query_engine.use("duckdb")
+        actual = _comparable(fn())
+        if not _same(expected, actual):
+            mismatches.append(name)
+    query_engine.use("pandas")
+    total = len(calls(adms, grad, sfa))
+    print(f"{label:<36}{total - len(mismatches):>5} / {total} match")
+    for name in mismatches[:10]:
+        print(f"  MISMATCH {name}")
+    if len(mismatches) > 10:
+        print(f"  ... and {len(mismatches) - 10} more")
+    return not mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--institutions", type=int, default=1000, help="scaled in-memory copy; 0 skips it")
+    parser.add_argument("--state", default=data_partitions.DEFAULT_STATE)
+    args = parser.parse_args()
+
+    if query_engine.duckdb is None:
+        sys.exit("duckdb is not installed: pip install duckdb")
+    # st.warning() outside `streamlit run` only logs; keep the output to the report
+    logging.disable(logging.WARNING)
+
+    datasets = {name: data_loader.load_dataset(name) for name in ("admission", "graduation", "sfa")}
+    ok = check("Parquet cache", *(IndexedDataset(df) for df in datasets.values()))
+    partitions = (data_partitions.load_partitions(name, states=[args.state]) for name in datasets)
+    ok = check(f"state={args.state} partitions", *(IndexedDataset(df) for df in partitions)) and ok
+
+    if args.institutions:
+        scaled = []
+        for name, df in datasets.items():
+            # In memory only, so no source files: DuckDB scans the frame
+            version = f"{df.attrs['version']}-x{args.institutions}"
+            scaled.append(IndexedDataset(data_loader.stamp(scale_frame(df, args.institutions), name, version)))
+        ok = check(f"{args.institutions:,} institutions (frame)", *scaled) and ok
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Check that a figure cache hit returns the same figure as the miss that stored it.
+
+Every chart builder runs through cached_figure twice on the loaded datasets
+(bench_charts' selections). The hit must match the miss trace by trace and
+in the layout: the same keys, the same Python types, and numpy arrays of the
+same dtype, shape, values and read-only flag.
+
+Exits non-zero on any difference.
+
+    python benchmarks/check_figure_cache.py
+"""
+import logging
+import sys
+
+import numpy as np
+
+from bench_charts import chart_calls
+
+import data_loader  # noqa: E402  (common puts the repo root on sys.path)
+from data_index import IndexedDataset  # noqa: E402
+from figure_cache import FIGURE_CACHE  # noqa: E402
+
+
+def difference(miss, hit, path):
+    """Where two figure property trees differ, or None."""
+    if type(miss) is not type(hit):
+        return f"{path}: {type(miss).__name__} on a miss, {type(hit).__name__} on a hit"
+    if isinstance(miss, dict):
+        if miss.keys() != hit.keys():
+            return f"{path}: keys {sorted(miss.keys() ^ hit.keys())}"
+        return next((d for key in miss if (d := difference(miss[key], hit[key], f"{path}.{key}"))), None)
+    if isinstance(miss, (list, tuple)):
+        if len(miss) != len(hit):
+            return f"{path}: {len(miss)} items on a miss, {len(hit)} on a hit"
+        return next((d for i, (a, b) in enumerate(zip(miss, hit)) if (d := difference(a, b, f"{path}[{i}]"))), None)
+    if isinstance(miss, np.ndarray):
+        if (miss.dtype, miss.shape, miss.flags.writeable) != (hit.dtype, hit.shape, hit.flags.writeable):
+            return (f"{path}: {miss.dtype}{miss.shape} on a miss, {hit.dtype}{hit.shape} on a hit"
+                    f" (writeable {miss.flags.writeable}/{hit.flags.writeable})")
+        equal = np.array_equal(miss, hit, equal_nan=miss.dtype.kind == "f") if miss.dtype.kind != "O" else miss.tolist() == hit.tolist()
+        return None if equal else f"{path}: values differ"
+    if miss != hit and not (isinstance(miss, float) and np.isnan(miss) and np.isnan(hit)):
+        return f"{path}: {miss!r} on a miss, {hit!r} on a hit"
+    return None
+
+
+def main():
+    # st.warning() outside `streamlit run` only logs; keep the output to the results
+    logging.disable(logging.WARNING)
+
+    adms, grad, sfa = (IndexedDataset(data_loader.load_dataset(name)) for name in ("admission", "graduation", "sfa"))
+    FIGURE_CACHE.clear()
+    failures = []
+    calls = chart_calls(adms, grad, sfa)
+    for name, builder, args, kwargs in calls:
+        miss = builder(*args, **kwargs)
+        hits = FIGURE_CACHE.hits
+        hit = builder(*args, **kwargs)
+        if FIGURE_CACHE.hits != hits + 1:
+            failures.append(f"{name}: the second call was not a cache hit")
+            continue
+        trees = [(f"data[{i}]", a.to_plotly_json(), b.to_plotly_json()) for i, (a, b) in enumerate(zip(miss.data, hit.data))]
+        trees.append(("layout", miss.layout.to_plotly_json(), hit.layout.to_plotly_json()))
+        if len(miss.data) != len(hit.data):
+            failures.append(f"{name}: {len(miss.data)} traces on a miss, {len(hit.data)} on a hit")
+        found = next((d for path, a, b in trees if (d := difference(a, b, path))), None)
+        if found:
+            failures.append(f"{name}: {found}")
+    print(f"{len(calls)} charts, {len(failures)} hits differ from their miss")
+
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("OK: cache hits return the same figures as misses")
+
+
+if __name__ == "__main__":
+    main()
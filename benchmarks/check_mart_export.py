@@ -0,0 +1,161 @@
+"""
+Check the mart export end to end on a local DuckDB warehouse.
+
+The dbt marts are built from synthetic raw tables (bench_dbt_incremental's
+warehouse and project), then exported with mart_export into a temporary
+data folder, which IPEDS_DATA_DIR points the loaders at. The check verifies:
+
+  - the export has the app's columns and dtypes (NJ_*_data.csv layout,
+    data_loader's schema) and the mart's totals
+  - data_loader / data_partitions read it, and the graduation charts render
+  - a second export of unchanged marts is skipped and keeps the version
+  - after the newest year is revised and dbt re-run, the export is rewritten,
+    the version bumped and the partitions rebuilt
+
+Needs dbt-core and dbt-duckdb; runs `dbt deps` for dbt_utils if needed and is
+skipped (exit 0) when that is not possible, as bench_dbt_incremental.py does.
+
+    python benchmarks/check_mart_export.py [--institutions 300]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+DATA_ROOT = tempfile.mkdtemp(prefix="ipeds-export-")
+# The loaders read their folders at import time, so point them at the temporary one first
+os.environ["IPEDS_DATA_DIR"] = DATA_ROOT
+
+import duckdb  # noqa: E402
+from bench_dbt_incremental import (  # noqa: E402
+    build_warehouse,
+    require_dbt,
+    revise_newest_year,
+    run_dbt,
+    write_project,
+)
+from common import REPO_ROOT  # noqa: E402
+
+import data_loader  # noqa: E402
+import data_partitions  # noqa: E402
+import mart_export  # noqa: E402
+from charts_graduation import (  # noqa: E402
+    plot_graduation_by_gender_bar,
+    plot_graduation_by_race_treemap,
+    plot_graduation_rate_trend,
+)
+from data_index import IndexedDataset  # noqa: E402
+
+
+def write_directory(institutions):
+    """Names and states for all but the last ten synthetic schools (those fall back to the placeholder name)."""
+    unitids = range(100000, 100000 + institutions - 10)
+    pd.DataFrame({
+        "unitid": list(unitids),
+        "university_name": [f"Synthetic College {u}" for u in unitids],
+        "state": ["NJ" if u % 2 else "NY" for u in unitids],
+    }).to_csv(data_partitions.STATES_FILE, index=False)
+
+
+def export(warehouse):
+    con = duckdb.connect(warehouse)
+    try:
+        return mart_export.export_marts(con, directory=mart_export.InstitutionDirectory.load())
+    finally:
+        con.close()
+
+
+def mart_totals(warehouse):
+    """What the exported totals must add up to, straight from the mart tables."""
+    con = duckdb.connect(warehouse)
+    grad = mart_export.read_mart(con, "graduation")
+    enroll = mart_export.read_mart(con, "enrollment")
+    con.close()
+    levels = pd.to_numeric(enroll["effyalev_code"]).isin(mart_export.ENROLLMENT_LEVELS)
+    return {"graduation": ("Total", float(grad["gr_total_all"].sum())),
+            "enrollment": ("headcount", float(enroll.loc[levels, "grand_total"].sum()))}
+
+
+def check_layout(failures):
+    for name in mart_export.MARTS:
+        df = data_loader.load_dataset(name)
+        csv_columns = pd.read_csv(os.path.join(REPO_ROOT, "data", f"NJ_{name}_data.csv"), nrows=0).columns
+        missing = set(csv_columns) - set(df.columns)
+        if missing:
+            failures.append(f"{name}: export lacks the app columns {sorted(missing)}")
+        dtypes = {col: str(df[col].dtype) for col in ("unitid", "year")}
+        if dtypes != {"unitid": "int32", "year": "int16"}:
+            failures.append(f"{name}: key dtypes {dtypes}, expected unitid int32 and year int16")
+        if "-mart1-" not in df.attrs["version"]:
+            failures.append(f"{name}: loaded version {df.attrs['version']} is not the first mart export")
+    placeholder = data_loader.load_dataset("graduation")["university_name"].astype(str).str.startswith("No school found")
+    if placeholder.sum() == 0:
+        failures.append("schools missing from the directory did not get the placeholder name")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--institutions", type=int, default=300)
+    args = parser.parse_args()
+
+    try:
+        require_dbt()
+    except SystemExit:
+        shutil.rmtree(DATA_ROOT, ignore_errors=True)
+        raise
+
+    failures = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        warehouse = os.path.join(work_dir, "IPEDS.duckdb")
+        build_warehouse(warehouse, args.institutions)
+        project = write_project(work_dir, warehouse)
+        run_dbt(project, "seed")
+        run_dbt(project, "run")
+        write_directory(args.institutions)
+
+        first = export(warehouse)
+        print("first export:  " + ", ".join(f"{n} {e['rows']:,} rows {e['status']}" for n, e in first.items()))
+        if any(entry["status"] != "exported" for entry in first.values()):
+            failures.append("the first export skipped a mart")
+        check_layout(failures)
+        for name, (column, expected) in mart_totals(warehouse).items():
+            got = float(data_loader.load_dataset(name)[column].sum())
+            if got != expected:
+                failures.append(f"{name}: {column} sums to {got}, the mart to {expected}")
+
+        nj = IndexedDataset(data_partitions.load_partitions("graduation", states=["NJ"]))
+        unitid = int(nj.frame["unitid"].iloc[0])
+        for chart in (plot_graduation_rate_trend, plot_graduation_by_race_treemap, plot_graduation_by_gender_bar):
+            chart(nj, selected_unitid=unitid)
+        partitions = data_partitions.read_manifest("graduation")["version"]
+
+        second = export(warehouse)
+        print("second export: " + ", ".join(f"{n} {e['status']} (version {e['version']})" for n, e in second.items()))
+        if any(entry["status"] != "unchanged" or entry["version"] != 1 for entry in second.values()):
+            failures.append("re-exporting unchanged marts rewrote them or bumped the version")
+
+        revise_newest_year(warehouse)
+        run_dbt(project, "run", "--select", "staging", "marts")
+        before = data_loader.current_version("graduation")
+        third = export(warehouse)
+        print("after revision: " + ", ".join(f"{n} {e['status']} (version {e['version']})" for n, e in third.items()))
+        if any(entry["status"] != "exported" or entry["version"] != 2 for entry in third.values()):
+            failures.append("revised marts were not re-exported with a bumped version")
+        if data_loader.current_version("graduation") == before:
+            failures.append("current_version did not change after the graduation mart changed")
+        data_partitions.load_partitions("graduation", states=["NJ"])
+        if data_partitions.read_manifest("graduation")["version"] == partitions:
+            failures.append("the graduation partitions were not rebuilt from the new export")
+
+    shutil.rmtree(DATA_ROOT, ignore_errors=True)
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Check that chart queries allocate in proportion to the selected rows, not the dataset.
+
+For each dataset size, the same selection (K schools x 2 years) is run through
+IndexedDataset.query and through a few admission charts while tracemalloc
+records the peak allocation. A full `data.copy()` is shown for contrast.
+Exits non-zero if a peak grows with the dataset instead of the selection.
+
+    python benchmarks/check_query_memory.py [--institutions 100 1000 7000] [--schools 1 10 100]
+"""
+import argparse
+import sys
+import tracemalloc
+
+from common import scale_frame, uncached
+
+import data_loader  # noqa: E402  (common puts the repo root on sys.path)
+from charts_enrollment import (  # noqa: E402
+    create_admission_yield_rate_chart,
+    create_full_vs_part_time_trend_multiple,
+    create_total_enrollment_bar_chart,
+)
+from data_index import IndexedDataset  # noqa: E402
+
+COLUMNS = ["university_name", "year", "Applicants_total", "Admissions_total", "Enrolled_total"]
+
+# A peak may exceed the smallest dataset's peak by this factor plus a fixed slack
+GROWTH_LIMIT = 1.25
+SLACK_BYTES = 64 * 1024
+
+
+def peak_bytes(fn):
+    """Peak traced allocation of a call, after one untraced warm-up call (pandas/plotly fill lazy caches on first use)."""
+    fn()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def measure(adms, schools, years):
+    return {
+        "full copy": peak_bytes(lambda: adms.frame.copy()),
+        "query": peak_bytes(lambda: adms.query(COLUMNS, names=schools, years=years)),
+        "total bar": peak_bytes(lambda: uncached(create_total_enrollment_bar_chart)(adms, schools, years)),
+        "yield chart": peak_bytes(lambda: uncached(create_admission_yield_rate_chart)(adms, schools, years)),
+        "ft/pt trend": peak_bytes(lambda: uncached(create_full_vs_part_time_trend_multiple)(adms, schools)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--institutions", type=int, nargs="+", default=[100, 1000, 7000])
+    parser.add_argument("--schools", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    admission = data_loader.load_dataset("admission")
+    years = sorted(admission["year"].unique())[-2:]
+    datasets = {n: IndexedDataset(scale_frame(admission, n)) for n in args.institutions}
+
+    failures = []
+    for k in args.schools:
+        # Same schools at every size: the first k of the smallest dataset
+        schools = datasets[min(datasets)].school_names[:k]
+        print(f"\n{k} selected school(s), {len(years)} years (peak KiB)")
+        print(f"{'institutions':>12}{'rows':>9}" + "".join(f"{name:>13}" for name in measure(datasets[min(datasets)], schools, years)))
+
+        baseline = None
+        for n, adms in datasets.items():
+            peaks = measure(adms, schools, years)
+            print(f"{n:>12}{len(adms):>9,}" + "".join(f"{peak / 1024:>13.1f}" for peak in peaks.values()))
+            if baseline is None:
+                baseline = peaks
+                continue
+            for name, peak in peaks.items():
+                if name != "full copy" and peak > baseline[name] * GROWTH_LIMIT + SLACK_BYTES:
+                    failures.append(f"{name}: {k} school(s) at {n} institutions peaked at {peak:,} B "
+                                    f"vs {baseline[name]:,} B at {min(datasets)}")
+
+    if failures:
+        print("\nFAIL\n" + "\n".join(failures))
+        sys.exit(1)
+    print("\nOK: peak allocation follows the selection, not the dataset size")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Check that the chart builders work on frozen (read-only, shared) datasets and leave them unchanged.
+
+The datasets are loaded and frozen as app.py does (IndexedDataset.freeze),
+then every chart builder runs uncached with bench_charts' selections and
+with the default views' (warmup.default_views). The check verifies:
+
+  - no builder fails on the read-only arrays (no in-place write into the data)
+  - every dataset's columns, dtypes and values are the same afterwards
+  - afterwards, an in-place write into any column of a frozen dataset, or
+    into a selection of it, still raises
+
+Exits non-zero on any failure.
+
+    python benchmarks/check_read_only.py
+    IPEDS_QUERY_ENGINE=duckdb python benchmarks/check_read_only.py
+"""
+import logging
+import sys
+
+from bench_charts import chart_calls
+from common import uncached
+
+import data_partitions  # noqa: E402  (common puts the repo root on sys.path)
+import warmup  # noqa: E402
+from data_index import IndexedDataset  # noqa: E402
+from mart_export import content_hash  # noqa: E402
+
+
+def fingerprint(dataset):
+    return list(dataset.frame.columns), content_hash(dataset.frame)
+
+
+def check_writes_raise(name, dataset, failures):
+    """In-place writes into the dataset, a selection of it and every column must raise (run after the charts)."""
+    frame = dataset.frame
+    unitid = int(frame["unitid"].iloc[0])
+    first = frame.index[0]
+
+    def set_cell(col):
+        def attempt():
+            frame.loc[first, col] = frame[col].iloc[-1]
+        return attempt
+
+    def set_selection():
+        selection = dataset.select(unitids=[unitid])
+        selection.loc[selection.index[0], "unitid"] = unitid
+
+    attempts = [(f"column {col}", set_cell(col)) for col in frame.columns]
+    attempts.append(("a selection", set_selection))
+    for label, attempt in attempts:
+        try:
+            attempt()
+        except ValueError:
+            continue
+        failures.append(f"{name}: writing into {label} did not raise")
+
+
+def main():
+    # st.warning() outside `streamlit run` only logs; keep the output to the results
+    logging.disable(logging.WARNING)
+
+    state = data_partitions.DEFAULT_STATE
+    datasets = {name: IndexedDataset(data_partitions.load_partitions(name, states=[state])).freeze()
+                for name in warmup.DATASETS}
+    before = {name: fingerprint(dataset) for name, dataset in datasets.items()}
+
+    calls = [(name, builder, args, kwargs)
+             for name, builder, args, kwargs in chart_calls(datasets["admission"], datasets["graduation"], datasets["sfa"])]
+    calls += [(f"{page}: {chart.__name__}", chart, args, kwargs)
+              for page, chart, args, kwargs in warmup.default_views(datasets)]
+
+    failures = []
+    for label, builder, args, kwargs in calls:
+        try:
+            uncached(builder)(*args, **kwargs)
+        except Exception as error:  # noqa: BLE001
+            failures.append(f"{label}: {error!r}")
+    print(f"{len(calls)} chart calls on frozen datasets, {len(failures)} failed")
+
+    for name, dataset in datasets.items():
+        if fingerprint(dataset) != before[name]:
+            failures.append(f"{name}: the dataset changed while the charts ran")
+    for name, dataset in datasets.items():
+        check_writes_raise(name, dataset, failures)
+
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("OK: the charts run on read-only datasets and leave them unchanged")
+
+
+if __name__ == "__main__":
+    main()
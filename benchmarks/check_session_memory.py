@@ -0,0 +1,155 @@
+"""
+Check that sessions share the loaded datasets and that memory stays flat as sessions are added.
+
+N sessions (AppTest instances, one after another, all kept open as browser
+tabs would be) open the same page, as on a running server whose first
+visitor already loaded the data. Every dataset a session's page receives
+(DatasetRegistry.get) is recorded. The check passes when:
+
+  - all sessions got the same object for each dataset, over the same column
+    buffers. With a per-call copy (st.cache_data, which unpickles a fresh
+    frame for every rerun), each session gets its own object and buffers.
+  - the memory retained per added session (tracemalloc) stays under
+    --budget-kib. What a session keeps is Streamlit's per-session state: its
+    widgets' options, its fragments and the rendered elements (AppTest's
+    element tree). On the Graduation page that is about 100 KiB with the NJ
+    extract and 170 KiB with the synthetic NJ (more schools to list), not a
+    share of the data. A per-session copy of the data, or of a selection of
+    it, grows with the datasets and fails the check. (The Graduation page
+    used to keep each session's year selection, every column of it, in a
+    script variable: 320 / 710 KiB per session.)
+
+    python benchmarks/check_session_memory.py
+    python benchmarks/check_session_memory.py --sessions 1 8 32 --page Enrollment
+    IPEDS_DATA_DIR=data/synthetic IPEDS_DATA_PREFIX=SYN python benchmarks/check_session_memory.py
+    python benchmarks/check_session_memory.py --app /tmp/app_before.py   # e.g. the app before a change
+"""
+import argparse
+import gc
+import logging
+import os
+import sys
+import tracemalloc
+
+import pandas as pd
+
+from common import REPO_ROOT
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import data_loader  # noqa: E402  (common puts the repo root on sys.path)
+import data_partitions  # noqa: E402
+from data_index import IndexedDataset  # noqa: E402
+from data_registry import DatasetRegistry  # noqa: E402
+
+PAGE_DATASETS = {"Enrollment": ["admission"], "Graduation": ["graduation"], "Financial Aid": ["sfa"]}
+
+
+def open_page(app, page):
+    at = AppTest.from_file(app, default_timeout=600)
+    at.session_state["active_page"] = page
+    at.session_state["enrollment_section"] = "section1" if page == "Enrollment" else None
+    at.run()
+    if at.exception:
+        raise SystemExit(f"{page}: {at.exception[0].value}")
+    return at
+
+
+def record_datasets():
+    """Record (name, dataset) for every dataset the app's pages get from their DatasetRegistry."""
+    received = []
+    get = DatasetRegistry.get
+
+    def recording_get(self, name):
+        data = get(self, name)
+        received.append((name, data))
+        return data
+
+    DatasetRegistry.get = recording_get
+    return received
+
+
+def column_buffers(data):
+    """Address of each column's values (categorical codes for categoricals)."""
+    buffers = []
+    for col in data.frame.columns:
+        column = data.frame[col]
+        values = column.cat.codes.to_numpy() if isinstance(column.dtype, pd.CategoricalDtype) else column.to_numpy()
+        buffers.append(values.__array_interface__["data"][0])
+    return tuple(buffers)
+
+
+def check_shared(received, failures):
+    """One object, over one set of column buffers, per dataset across all sessions."""
+    for name in dict.fromkeys(name for name, _ in received):
+        datasets = [data for received_name, data in received if received_name == name]
+        objects = len({id(data) for data in datasets})
+        buffers = len({column_buffers(data) for data in datasets})
+        print(f"{name}: {len(datasets)} sessions got {objects} object(s) over {buffers} set(s) of column buffers")
+        if objects != 1 or buffers != 1:
+            failures.append(f"{name}: sessions hold {objects} separate copies of the dataset")
+
+
+def retained_bytes(app, page, sessions):
+    """Memory still held, above the baseline, once `sessions` sessions have opened `page` and stay open."""
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    kept = [open_page(app, page) for _ in range(sessions)]
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return retained - baseline
+
+
+def dataset_bytes(page):
+    """In-memory size of the page's datasets for the default state, as the app loads them."""
+    total = 0
+    for name in PAGE_DATASETS[page]:
+        frame = IndexedDataset(data_partitions.load_partitions(name, states=[data_partitions.DEFAULT_STATE])).frame
+        total += int(frame.memory_usage(deep=True).sum())
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--app", default=os.path.join(REPO_ROOT, "app.py"))
+    parser.add_argument("--page", choices=list(PAGE_DATASETS), default="Graduation")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--budget-kib", type=float, default=256, help="most memory one added session may retain")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # AppTest's bare-mode and deprecation warnings
+    os.chdir(REPO_ROOT)
+    app = os.path.abspath(args.app)
+    size = dataset_bytes(args.page)
+    print(f"{args.page} on {data_partitions.DEFAULT_STATE} ({data_loader.DATA_DIR}): "
+          f"datasets {size / 2**20:.1f} MiB in memory")
+    open_page(app, args.page)  # loads the datasets and fills the caches, as the first visitor does
+    open_page(app, args.page)  # and Streamlit's one-off allocations (compiled script, widget registry)
+    received = record_datasets()
+
+    retained = {}
+    print(f"{'sessions':>8}{'retained MiB':>14}{'KiB/session':>13}")
+    for sessions in sorted(set(args.sessions)):
+        retained[sessions] = retained_bytes(app, args.page, sessions)
+        print(f"{sessions:>8}{retained[sessions] / 2**20:>14.2f}{retained[sessions] / sessions / 2**10:>13.1f}")
+
+    failures = []
+    check_shared(received, failures)
+    fewest, most = min(retained), max(retained)
+    if most > fewest:
+        growth = (retained[most] - retained[fewest]) / (most - fewest)
+        print(f"Growth per added session: {growth / 2**10:.1f} KiB ({growth / size:.1%} of the datasets), "
+              f"budget {args.budget_kib:.0f} KiB")
+        if growth > args.budget_kib * 2**10:
+            failures.append(f"each added session retains {growth / 2**10:.1f} KiB, over the {args.budget_kib:.0f} KiB budget")
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("OK: sessions share the datasets and memory stays flat as sessions are added")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Shared helpers for the benchmark scripts."""
+import inspect
+import os
+import sys
+import time
+
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def scale_frame(df, institutions):
+    """
+    Replicate a frame with offset unitids until it covers `institutions` schools.
+    Copies get a " #<n>" suffix on university_name so names stay unique.
+    """
+    n_schools = df["unitid"].nunique()
+    copies = max(1, -(-institutions // n_schools))
+    frames = []
+    for i in range(copies):
+        part = df.copy()
+        part["unitid"] = part["unitid"] + i * 1_000_000
+        if i and "university_name" in part.columns:
+            part["university_name"] = part["university_name"].astype(str) + f" #{i}"
+        frames.append(part)
+    scaled = pd.concat(frames, ignore_index=True)
+    if "university_name" in scaled.columns and isinstance(df["university_name"].dtype, pd.CategoricalDtype):
+        scaled["university_name"] = scaled["university_name"].astype("category")
+    return scaled
+
+
+def best_of(fn, repeat):
+    """Fastest wall-clock time of `repeat` calls to `fn`, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def uncached(builder):
+    """The undecorated chart builder, bypassing the figure cache and profiling wrappers."""
+    return inspect.unwrap(builder)
@@ -0,0 +1,186 @@
+"""
+Generate IPEDS-shaped synthetic extracts for load testing the dashboard.
+
+The shipped NJ extracts are used as templates. Each synthetic institution
+copies the row blocks of a randomly chosen NJ school, one block per year,
+so column names, code columns (Cohort_type, Graduation_rate_status_in_cohort,
+the admission-consideration codes), imputation flags, blank cells and row
+structure follow the real data. Counts are rescaled by a per-institution size
+factor with per-cell noise. A share of numeric cells is replaced by the
+PrivacySuppressed / NULL sentinels the loader must resolve.
+
+    python benchmarks/synthetic.py --institutions 960 --years 6 --seed 0 --out data/synthetic
+
+writes SYN_<dataset>_data.csv for admission, enrollment, graduation and sfa
+(the NJ rows plus the synthetic ones), and institutions.csv (unitid,
+university_name, state). Point the dashboard at them with
+
+    IPEDS_DATA_DIR=data/synthetic IPEDS_DATA_PREFIX=SYN streamlit run app.py
+
+or load one file with data_loader.load_dataset(name, cache_dir=..., csv_path=...).
+"""
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from common import REPO_ROOT
+
+import data_loader  # noqa: E402  (common puts the repo root on sys.path)
+from data_normalize import SENTINELS  # noqa: E402
+
+DATASET_NAMES = ["admission", "enrollment", "graduation", "sfa"]
+
+# Columns copied from the template as-is (identifiers, codes, flags, rates)
+KEY_COLUMNS = ["unitid", "university_name", "year", "Unique_identification_number_of_the_institution"]
+UNSCALED = re.compile(r"percent|average|rate|_code$", re.IGNORECASE)
+
+STATES = [
+    "AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "DC", "FL", "GA", "HI", "ID", "IL", "IN", "IA", "KS",
+    "KY", "LA", "ME", "MD", "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ", "NM", "NY", "NC",
+    "ND", "OH", "OK", "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY",
+]
+
+# Synthetic unitids start here, above the range IPEDS assigns to real institutions
+UNITID_BASE = 900_000
+
+
+def read_template(name):
+    """An NJ extract as raw strings, keeping blank cells and sentinels exactly as written."""
+    path = os.path.join(REPO_ROOT, data_loader.DATASETS[name]["path"])
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def scaled_columns(name, template):
+    """Count/amount columns that grow with institution size."""
+    spec = data_loader.DATASETS[name]
+    text_pattern = re.compile(spec.get("text_pattern", r"$^"))
+    skip = set(KEY_COLUMNS) | set(spec.get("codes", [])) | set(spec["columns"])
+    columns = []
+    for col in template.columns:
+        if col in skip or text_pattern.match(col) or UNSCALED.search(col):
+            continue
+        numeric = pd.to_numeric(template[col].replace("", np.nan), errors="coerce")
+        if numeric.notna().any():
+            columns.append(col)
+    return columns
+
+
+def institutions(count, seed, states=None):
+    """unitid, name, state, NJ template unitid and size factor per synthetic institution."""
+    rng = np.random.default_rng(seed)
+    names = read_template("admission").drop_duplicates("unitid").set_index("unitid")["university_name"]
+    templates = rng.choice(names.index.to_numpy(), size=count)
+    state_codes = rng.choice(states or STATES, size=count)
+    return pd.DataFrame({
+        "unitid": UNITID_BASE + np.arange(count),
+        "university_name": [
+            f"{names[t]} - {state} Campus {i}" for i, (t, state) in enumerate(zip(templates, state_codes))
+        ],
+        "state": state_codes,
+        "template": templates,
+        "size": rng.lognormal(mean=0.0, sigma=0.5, size=count),
+    })
+
+
+def generate(name, schools, years, seed, suppression=0.01, include_template=True):
+    """
+    A synthetic extract for `name` covering `schools` x `years`, as strings.
+
+    Datasets with integer survey years get one template block per year (the
+    template's own years are reused cyclically when more are requested).
+    SFA has a single academic-year label and keeps it. With `include_template`
+    the NJ rows are kept unchanged in front, so the dashboard defaults (NJIT,
+    Rutgers-Newark) still resolve.
+    """
+    rng = np.random.default_rng([seed, DATASET_NAMES.index(name)])
+    template = read_template(name)
+    blocks = template.groupby(["unitid", "year"], sort=True).indices
+    years_by_unit = {}
+    for unitid, year in blocks:
+        years_by_unit.setdefault(unitid, []).append(year)
+
+    integer_years = template["year"].str.fullmatch(r"\d{4}").all()
+    units = list(years_by_unit)
+    positions, unitids, names, out_years, sizes = [], [], [], [], []
+    for school in schools.itertuples(index=False):
+        # A template school without rows in this dataset borrows another school's blocks
+        school_template = school.template if school.template in years_by_unit else rng.choice(units)
+        template_years = years_by_unit[school_template]
+
+        targets = years if integer_years else template_years[:1]
+        for i, year in enumerate(targets):
+            source_year = template_years[i % len(template_years)]
+            rows = blocks[(school_template, source_year)]
+            positions.append(rows)
+            unitids.append(np.full(len(rows), school.unitid))
+            names.extend([school.university_name] * len(rows))
+            out_years.extend([str(year) if integer_years else source_year] * len(rows))
+            sizes.append(np.full(len(rows), school.size))
+
+    out = template.iloc[np.concatenate(positions)].reset_index(drop=True)
+    unitid_text = np.concatenate(unitids).astype(str)
+    out["unitid"] = unitid_text
+    out["university_name"] = names
+    out["year"] = out_years
+    if "Unique_identification_number_of_the_institution" in out.columns:
+        out["Unique_identification_number_of_the_institution"] = unitid_text
+    size = np.concatenate(sizes)
+
+    scaled = {}
+    for col in scaled_columns(name, template):
+        raw = out[col]
+        numeric = pd.to_numeric(raw.replace("", np.nan), errors="coerce").to_numpy()
+        present = ~np.isnan(numeric)
+        noise = rng.normal(1.0, 0.1, size=len(out)).clip(0.5, 1.5)
+        values = numeric * size * noise
+        integral = np.all(numeric[present] == np.round(numeric[present]))
+        text = raw.to_numpy().copy()
+        if integral:
+            text[present] = np.round(values[present]).astype(np.int64).astype(str)
+        else:
+            text[present] = np.char.mod("%.2f", values[present])
+
+        # Suppress a share of the reported cells the way IPEDS / Scorecard extracts do
+        suppressed = present & (rng.random(len(out)) < suppression)
+        text[suppressed] = rng.choice(SENTINELS, size=int(suppressed.sum()))
+        scaled[col] = text
+
+    out = out.assign(**scaled)[template.columns]
+    return pd.concat([template, out], ignore_index=True) if include_template else out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--institutions", type=int, default=960, help="number of institutions (NJ has 96)")
+    parser.add_argument("--years", type=int, default=6, help="survey years, ending at the latest NJ year")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--states", nargs="+", help="state codes to spread institutions over (default: all)")
+    parser.add_argument("--suppression", type=float, default=0.01, help="share of numeric cells replaced by sentinels")
+    parser.add_argument("--no-nj", action="store_true", help="leave the NJ template rows out of the output")
+    parser.add_argument("--prefix", default="SYN")
+    parser.add_argument("--out", default=os.path.join("data", "synthetic"))
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    latest = int(read_template("admission")["year"].astype(int).max())
+    years = list(range(latest - args.years + 1, latest + 1))
+    schools = institutions(args.institutions, args.seed, args.states)
+
+    directory = schools[["unitid", "university_name", "state"]]
+    if not args.no_nj:
+        nj = read_template("admission").drop_duplicates("unitid")[["unitid", "university_name"]].assign(state="NJ")
+        directory = pd.concat([nj, directory], ignore_index=True)
+    directory.to_csv(os.path.join(args.out, "institutions.csv"), index=False)
+
+    for name in DATASET_NAMES:
+        df = generate(name, schools, years, args.seed, args.suppression, include_template=not args.no_nj)
+        path = os.path.join(args.out, f"{args.prefix}_{name}_data.csv")
+        df.to_csv(path, index=False)
+        print(f"{name:<12}{len(df):>10,} rows  {os.path.getsize(path) / 1e6:>7.1f} MB  {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,31 +2,38 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import numpy as np
+
+from aggregates import school_shares, school_totals
+from data_index import as_indexed, dataset_state
+from figure_cache import cached_figure
+from instrument import profiled
+from reshape import to_long
+
+NJIT_NAME = "New Jersey Institute of Technology"
+
+
+def _short_name(school_name):
+    """Label used in titles and legends: "NJIT" for NJIT, the full name otherwise."""
+    return "NJIT" if school_name == NJIT_NAME else school_name
 
-# 🔹 Load data with caching
-@st.cache_data
-def load_data(file_path):
-    return pd.read_csv(file_path)
 
 # 🔹 Total Enrollment Bar Chart
+@profiled
+@cached_figure
 def create_total_enrollment_bar_chart(adms_data, selected_schools, selected_years):
     if not selected_schools or not selected_years:
         st.warning("Please select at least one school and one year.")
         return None
 
-    filtered_data = adms_data[
-        adms_data["university_name"].isin(selected_schools) &
-        adms_data["year"].isin(selected_years)
-    ]
+    chart_data = as_indexed(adms_data).query(
+        ["university_name", "year", "Enrolled_total"], names=selected_schools, years=selected_years)
 
-    if filtered_data.empty:
+    if chart_data.empty:
         st.warning("No data available for the selected schools and years.")
         return None
 
-    chart_data = filtered_data[[
-        "university_name", "year", "Enrolled_total"]].copy()
-    chart_data["Enrolled_total"] = pd.to_numeric(
-        chart_data["Enrolled_total"], errors='coerce').fillna(0)
+    chart_data["Enrolled_total"] = chart_data["Enrolled_total"].fillna(0)
     chart_data["year"] = chart_data["year"].astype(
         str)  # Make year categorical
 
@@ -54,37 +61,28 @@ def create_total_enrollment_bar_chart(adms_data, selected_schools, selected_year
     return fig
 
 # 🔹 Gender Enrollment Bar Chart
+@profiled
+@cached_figure
 def create_gender_enrollment_bar_chart(adms_data, selected_schools, selected_years):
     if not selected_schools or not selected_years:
         st.warning("Please select at least one school and one year.")
         return None
 
-    filtered_data = adms_data[
-        adms_data["university_name"].isin(selected_schools) &
-        adms_data["year"].isin(selected_years)
-    ]
+    filtered_data = as_indexed(adms_data).query(
+        ["university_name", "year", "Enrolled__men", "Enrolled__women"], names=selected_schools, years=selected_years)
 
     if filtered_data.empty:
         st.warning("No data available for the selected schools and years.")
         return None
 
-    rows = []
-    for _, row in filtered_data.iterrows():
-        try:
-            men = float(row["Enrolled__men"])
-        except:
-            men = 0
-        try:
-            women = float(row["Enrolled__women"])
-        except:
-            women = 0
-
-        rows.append({"university_name": row["university_name"],
-                    "year": row["year"], "Gender": "Men", "Headcount": men})
-        rows.append({"university_name": row["university_name"],
-                    "year": row["year"], "Gender": "Women", "Headcount": women})
-
-    chart_data = pd.DataFrame(rows)
+    chart_data = to_long(
+        filtered_data,
+        id_vars=["university_name", "year"],
+        value_vars=["Enrolled__men", "Enrolled__women"],
+        var_name="Gender",
+        value_name="Headcount",
+        labels={"Enrolled__men": "Men", "Enrolled__women": "Women"},
+    )
 
     fig = px.bar(
         chart_data,
@@ -108,29 +106,30 @@ def create_gender_enrollment_bar_chart(adms_data, selected_schools, selected_yea
     return fig
 
 # 🔹 Full-Time vs Part-Time Enrollment Trend Over Time
+@profiled
+@cached_figure
 def create_full_vs_part_time_trend(adms_data, selected_school):
     if not selected_school:
         st.warning("Please select a school.")
         return None
 
-    data = adms_data[adms_data["university_name"] == selected_school][
-        ["year", "Enrolled_full_time_total", "Enrolled_part_time_total"]
-    ].copy()
+    data = as_indexed(adms_data).query(
+        ["year", "Enrolled_full_time_total", "Enrolled_part_time_total"], names=[selected_school])
 
     if data.empty:
         st.warning(f"No enrollment data available for {selected_school}.")
         return None
 
-    data["Enrolled_full_time_total"] = pd.to_numeric(
-        data["Enrolled_full_time_total"], errors="coerce").fillna(0)
-    data["Enrolled_part_time_total"] = pd.to_numeric(
-        data["Enrolled_part_time_total"], errors="coerce").fillna(0)
-
     grouped = data.groupby("year")[
         ["Enrolled_full_time_total", "Enrolled_part_time_total"]].sum().reset_index()
 
-    melted = grouped.melt(
-        id_vars="year", var_name="Enrollment Type", value_name="Headcount")
+    melted = to_long(
+        grouped,
+        id_vars="year",
+        value_vars=["Enrolled_full_time_total", "Enrolled_part_time_total"],
+        var_name="Enrollment Type",
+        value_name="Headcount",
+    )
 
     fig = px.line(
         melted,
@@ -155,38 +154,32 @@ def create_full_vs_part_time_trend(adms_data, selected_school):
 
     return fig
 
+@profiled
+@cached_figure
 def create_full_vs_part_time_trend_multiple(adms_data, selected_schools):
     if not selected_schools:
         st.warning("Please select at least one school.")
         return None
 
-    data = adms_data[adms_data["university_name"].isin(selected_schools)][
-        ["year", "university_name", "Enrolled_full_time_total", "Enrolled_part_time_total"]
-    ].copy()
+    data = as_indexed(adms_data).query(
+        ["year", "university_name", "Enrolled_full_time_total", "Enrolled_part_time_total"], names=selected_schools)
 
     if data.empty:
         st.warning(f"No enrollment data available for the selected schools.")
         return None
 
-    data["Enrolled_full_time_total"] = pd.to_numeric(
-        data["Enrolled_full_time_total"], errors="coerce").fillna(0)
-    data["Enrolled_part_time_total"] = pd.to_numeric(
-        data["Enrolled_part_time_total"], errors="coerce").fillna(0)
+    data = data.fillna({"Enrolled_full_time_total": 0, "Enrolled_part_time_total": 0})
 
-    # Melt for better plotting
-    melted = data.melt(
+    # Long form with clean Enrollment Type labels
+    melted = to_long(
+        data,
         id_vars=["year", "university_name"],
         value_vars=["Enrolled_full_time_total", "Enrolled_part_time_total"],
         var_name="Enrollment Type",
-        value_name="Headcount"
+        value_name="Headcount",
+        labels={"Enrolled_full_time_total": "Full-Time", "Enrolled_part_time_total": "Part-Time"},
     )
 
-    # Make Enrollment Type cleaner
-    melted["Enrollment Type"] = melted["Enrollment Type"].replace({
-        "Enrolled_full_time_total": "Full-Time",
-        "Enrolled_part_time_total": "Part-Time"
-    })
-
     fig = px.line(
         melted,
         x="year",
@@ -210,26 +203,23 @@ def create_full_vs_part_time_trend_multiple(adms_data, selected_schools):
 
 
 # 🔹 Admission/Enrollment Rate by School
+@profiled
+@cached_figure
 def create_admission_yield_rate_chart(adms_data, selected_schools, selected_years):
     if not selected_schools or not selected_years:
         st.warning("Please select at least one school and year.")
         return None
 
-    df = adms_data.copy()
-    df["Applicants_total"] = pd.to_numeric(
-        df["Applicants_total"], errors="coerce").fillna(0)
-    df["Admissions_total"] = pd.to_numeric(
-        df["Admissions_total"], errors="coerce").fillna(0)
-    df["Enrolled_total"] = pd.to_numeric(
-        df["Enrolled_total"], errors="coerce").fillna(0)
-
-    df = df[df["university_name"].isin(
-        selected_schools) & df["year"].isin(selected_years)]
+    count_cols = ["Applicants_total", "Admissions_total", "Enrolled_total"]
+    df = as_indexed(adms_data).query(
+        ["university_name", "year"] + count_cols, names=selected_schools, years=selected_years)
 
     if df.empty:
         st.warning("No data available for the selected schools and years.")
         return None
 
+    df = df.fillna(dict.fromkeys(count_cols, 0))
+
     # Compute rates per school per year
     df["Admission Rate"] = df["Admissions_total"] / df["Applicants_total"]
     df["Yield Rate"] = df["Enrolled_total"] / df["Admissions_total"]
@@ -237,12 +227,13 @@ def create_admission_yield_rate_chart(adms_data, selected_schools, selected_year
     # Clean up invalid values
     df = df.replace([float("inf"), float("nan")], 0)
 
-    # Melt for bar chart
-    melted = df.melt(
+    # Long form for bar chart
+    melted = to_long(
+        df,
         id_vars=["university_name", "year"],
         value_vars=["Admission Rate", "Yield Rate"],
         var_name="Rate Type",
-        value_name="Rate"
+        value_name="Rate",
     )
     melted["Rate (%)"] = (melted["Rate"] * 100).round(2)
     melted["year"] = melted["year"].astype(str)
@@ -268,14 +259,14 @@ def create_admission_yield_rate_chart(adms_data, selected_schools, selected_year
     return fig
 
 # 🔹 Admission Funnel
+@profiled
+@cached_figure
 def plot_admission_funnel(data, school_name, selected_year):
     """Plots the admission funnel for a specific school and year."""
 
     # Filter by school and year
-    school_data = data[
-        (data["university_name"] == school_name) & 
-        (data["year"] == selected_year)
-    ]
+    school_data = as_indexed(data).query(
+        ["Applicants_total", "Admissions_total", "Enrolled_total"], names=[school_name], years=[selected_year])
 
     if school_data.empty:
         st.warning(f"No admission data available for {school_name} in {selected_year}.")
@@ -318,34 +309,31 @@ def plot_admission_funnel(data, school_name, selected_year):
     return fig
 
 # 🔹 Pie Chart
-def create_njit_vs_others_pie(adms_data, selected_years):
-    df = adms_data.copy()
-
-    # Clean + filter
-    df["Enrolled_total"] = pd.to_numeric(
-        df["Enrolled_total"], errors="coerce").fillna(0)
-    df = df[df["year"].isin(selected_years)]
+@profiled
+@cached_figure
+def create_njit_vs_others_pie(adms_data, selected_years, school_name=NJIT_NAME):
+    # Aggregate total enrollment
+    totals = school_totals(adms_data, school_name, selected_years)
 
-    if df.empty:
+    if totals is None:
         st.warning("No enrollment data available for the selected years.")
         return None
 
-    # Aggregate total enrollment
-    njit_name = "New Jersey Institute of Technology"
-    njit_total = df[df["university_name"] == njit_name]["Enrolled_total"].sum()
-    others_total = df[df["university_name"]
-                      != njit_name]["Enrolled_total"].sum()
+    school_total, others_total = totals
+    label = _short_name(school_name)
+    state = dataset_state(adms_data)
+    others = f"Other {state} Schools" if state else "Other Schools"
 
     pie_data = pd.DataFrame({
-        "School": ["NJIT", "All Other NJ Schools"],
-        "Enrolled": [njit_total, others_total]
+        "School": [label, f"All {others}"],
+        "Enrolled": [school_total, others_total]
     })
 
     fig = px.pie(
         pie_data,
         names="School",
         values="Enrolled",
-        title=f"NJIT vs Other NJ Schools Undergraduate Enrollment ({', '.join(map(str, selected_years))})",
+        title=f"{label} vs {others} Undergraduate Enrollment ({', '.join(map(str, selected_years))})",
         hole=0.3,
         color_discrete_sequence=["#292361", "#bfb8fc"]
     )
@@ -353,23 +341,11 @@ def create_njit_vs_others_pie(adms_data, selected_years):
     return fig
 
 # 🔹 Stacked Bar Chart
-def plot_njit_share_change(df, njit_name="New Jersey Institute of Technology"):
-    df["Enrolled_total"] = pd.to_numeric(df["Enrolled_total"], errors="coerce").fillna(0)
-
-    # Aggregate total enrollment by year and university
-    grouped = df.groupby(["year", "university_name"])["Enrolled_total"].sum().reset_index()
-
-    # Compute NJIT vs Others
-    grouped["School Group"] = grouped["university_name"].apply(
-        lambda name: njit_name if name == njit_name else "All Other NJ Schools"
-    )
-    totals = grouped.groupby(["year", "School Group"])["Enrolled_total"].sum().reset_index()
-
-    # Pivot to calculate NJIT share
-    pivot = totals.pivot(index="year", columns="School Group", values="Enrolled_total").fillna(0)
-    pivot["Total"] = pivot.sum(axis=1)
-    pivot["NJIT Share (%)"] = (pivot[njit_name] / pivot["Total"]) * 100
-    pivot["Share Change (%)"] = pivot["NJIT Share (%)"].diff()
+@profiled
+@cached_figure
+def plot_njit_share_change(df, njit_name=NJIT_NAME):
+    # Shares and share changes: precomputed pandas tables, or SQL with the DuckDB engine
+    table = school_shares(df, njit_name)
 
     # Format label for annotation
     def format_label(change):
@@ -380,17 +356,22 @@ def plot_njit_share_change(df, njit_name="New Jersey Institute of Technology"):
         else:
             return f"<span style='color:#d32f2f'>▼ {abs(change):.1f}%</span>"  # Red
 
-    pivot["Annotation"] = pivot["Share Change (%)"].apply(format_label)
-    pivot = pivot.reset_index()
+    table["Annotation"] = table["share_change"].map(format_label)
+    table = table.rename_axis("year").reset_index()
+    state = dataset_state(df)
+    others = f"All Other {state} Schools" if state else "All Other Schools"
 
-    # Melt for stacked bar chart
-    melt = pivot.melt(id_vars=["year", "Annotation"], value_vars=[njit_name, "All Other NJ Schools"],
-                      var_name="School Group", value_name="Enrolled_total")
+    # Long format for stacked bar chart
+    melt = pd.DataFrame({
+        "year": np.tile(table["year"].to_numpy(), 2),
+        "School Group": np.repeat([njit_name, others], len(table)),
+        "Enrolled_total": np.concatenate([table["school"].to_numpy(), table["others"].to_numpy()]),
+    })
 
     # Set color theme
     color_map = {
         njit_name: "#bfb8fc",
-        "All Other NJ Schools": "#292361"
+        others: "#292361"
     }
 
     fig = px.bar(
@@ -400,25 +381,24 @@ def plot_njit_share_change(df, njit_name="New Jersey Institute of Technology"):
         color="School Group",
         barmode="stack",
         color_discrete_map=color_map,
-        title="Yearly Enrollment and Change in NJIT’s Share of Total Enrollment",
+        title=f"Yearly Enrollment and Change in {_short_name(njit_name)}’s Share of Total Enrollment",
         labels={"Enrolled_total": "Enrollment", "year": "Year"}
     )
 
-    # Add annotation: only once per year above NJIT bar
-    for year in pivot["year"]:
-        njit_enrollment = melt[(melt["year"] == year) & (melt["School Group"] == njit_name)]["Enrolled_total"].values[0]
-        annotation_text = pivot[pivot["year"] == year]["Annotation"].values[0]
-
-        if annotation_text:
-            fig.add_annotation(
-                x=year,
-                y=njit_enrollment,
-                text=annotation_text,
-                showarrow=False,
-                yshift=10,
-                font=dict(size=12),
-                align="center"
-            )
+    # Add annotation: only once per year above the school's bar
+    labelled = table[table["Annotation"] != ""]
+    fig.update_layout(annotations=[
+        dict(
+            x=year,
+            y=enrollment,
+            text=text,
+            showarrow=False,
+            yshift=10,
+            font=dict(size=12),
+            align="center"
+        )
+        for year, enrollment, text in zip(labelled["year"], labelled["school"], labelled["Annotation"])
+    ])
 
     fig.update_layout(
         height=600,
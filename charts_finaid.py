@@ -1,14 +1,14 @@
-import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-# 🔹 Load data with caching
-@st.cache_data
-def load_data(file_path):
-    return pd.read_csv(file_path)
+from aggregates import top_rows
+from data_index import as_indexed, dataset_state
+from figure_cache import cached_figure
+from instrument import profiled
 
 # 🔹 Net price by income
+@profiled
+@cached_figure
 def plot_net_price_by_income(df, university_name):
     price_columns = [
         'average_net_price_income_0_30_000_students_awarded_title_iv_federal_financial_aid_2020_21',
@@ -20,13 +20,13 @@ def plot_net_price_by_income(df, university_name):
 
     bracket_labels = ['$0–30k', '$30k–48k', '$48k–75k', '$75k–110k', '$110k+']
 
-    # Filter by university name
-    row = df[df['university_name'].str.lower() == university_name.lower()]
+    # Filter by university name (case-insensitive)
+    row = as_indexed(df).query(price_columns, names=[university_name], case_sensitive=False)
     if row.empty:
         return f"No data found for university: {university_name}"
 
-    # Clean and convert to float
-    prices = row[price_columns].iloc[0].replace(['PrivacySuppressed', 'NULL'], pd.NA).astype(float)
+    # Sentinels ('PrivacySuppressed', 'NULL') were already resolved to NaN at ingest
+    prices = row[price_columns].iloc[0]
 
     # Plot
     fig = go.Figure(data=go.Bar(x=bracket_labels, y=prices, marker_color='orange'))
@@ -39,26 +39,33 @@ def plot_net_price_by_income(df, university_name):
     )
     return fig
 
+@profiled
+@cached_figure
 def plot_top20_institutions_by_total_aid(df):
     """
-    Plot a stacked bar chart of total aid (grants, Pell, loans) for the top 20 institutions in NJ.
+    Plot a stacked bar chart of total aid (grants, Pell, loans) for the top 20 institutions in the dataset's state.
     Assumes columns: total_grants, total_pell, total_loans, unit_id.
     Requires get_school_name(unitid) to resolve school names.
     """
-    # Sort and select top 20
-    df_top = df.sort_values(by='total_amount_of_federal_state_local_institutional_or_other_sources_of_grant_aid_awarded_to_undergraduate_students', ascending=False).head(20).copy()
+    grant_col = 'total_amount_of_federal_state_local_institutional_or_other_sources_of_grant_aid_awarded_to_undergraduate_students'
+    loan_col = 'total_amount_of_federal_student_loans_awarded_to_undergraduate_students'
+    pell_col = 'total_amount_of_pell_grant_aid_awarded_to_full_time_first_time_undergraduates'
+
+    # Select the top 20 rows first, then only the columns the chart plots
+    df_top = top_rows(df, grant_col, ['university_name', grant_col, loan_col, pell_col], n=20)
 
     # Create figure
     fig = go.Figure(data=[
-        go.Bar(name='Total Grants', x=df_top['university_name'], y=df_top['total_amount_of_federal_state_local_institutional_or_other_sources_of_grant_aid_awarded_to_undergraduate_students']),
-        go.Bar(name='Total Pell Grants', x=df_top['university_name'], y=df_top['total_amount_of_federal_student_loans_awarded_to_undergraduate_students']),
-        go.Bar(name='Total Loans', x=df_top['university_name'], y=df_top['total_amount_of_pell_grant_aid_awarded_to_full_time_first_time_undergraduates'])
+        go.Bar(name='Total Grants', x=df_top['university_name'], y=df_top[grant_col]),
+        go.Bar(name='Total Pell Grants', x=df_top['university_name'], y=df_top[loan_col]),
+        go.Bar(name='Total Loans', x=df_top['university_name'], y=df_top[pell_col])
     ])
 
     # Customize layout
+    state = dataset_state(df)
     fig.update_layout(
         barmode='stack',
-        title="Top 20 NJ Institutions by Total Aid Disbursed (Grants + Pell + Loans)",
+        title=f"Top 20 {state + ' ' if state else ''}Institutions by Total Aid Disbursed (Grants + Pell + Loans)",
         xaxis_title="Institution Name",
         yaxis_title="Total Aid Amount (USD)",
         xaxis_tickangle=45,
@@ -67,6 +74,8 @@ def plot_top20_institutions_by_total_aid(df):
 
     return fig
 
+@profiled
+@cached_figure
 def plot_aid_type_breakdown_percent(df, university_name):
     """
     Create a 100% stacked bar chart showing the percentage breakdown of total aid
@@ -77,8 +86,8 @@ def plot_aid_type_breakdown_percent(df, university_name):
     pell_col = 'total_amount_of_federal_pell_grant_aid_awarded_to_undergraduate_students'
     loan_col = 'total_amount_of_federal_student_loans_awarded_to_undergraduate_students'
 
-    # Filter the row for the specified school
-    row = df[df['university_name'].str.lower() == university_name.lower()]
+    # Filter the row for the specified school (case-insensitive)
+    row = as_indexed(df).query([grant_col, pell_col, loan_col], names=[university_name], case_sensitive=False)
     if row.empty:
         return f"No data found for '{university_name}'"
 
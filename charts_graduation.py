@@ -2,16 +2,30 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from aggregates import graduation_cube, graduation_yearly
+from data_index import as_indexed, dataset_state
+from figure_cache import cached_figure
+from instrument import profiled
+from reshape import code_table, codes_to_long, labelled, to_long
+
+
+def _query(data, columns, selected_unitid=None, selected_year=None):
+    """Read-only `columns` for an institution and/or year, looked up through the (unitid, year) index."""
+    return as_indexed(data).query(
+        columns,
+        unitids=[selected_unitid] if selected_unitid else None,
+        years=[selected_year] if selected_year else None,
+    )
+
+@profiled
+@cached_figure
 def graduation_funnel_chart(df, selected_unitid=None, selected_year=None):
     """
     Creates and returns a Plotly funnel chart showing:
     Adjusted Cohort -> Graduated in 100% -> Graduated in 150% -> Transferred Out
     """
 
-    if selected_unitid:
-        df = df[df["unitid"] == selected_unitid]
-    if selected_year:
-        df = df[df["year"] == selected_year]
+    totals = graduation_cube(df).status_totals(selected_unitid or None, selected_year or None)["Total"]
 
     funnel_stages = {
         12: "Initial Bachelor’s Cohort",
@@ -21,18 +35,12 @@ def graduation_funnel_chart(df, selected_unitid=None, selected_year=None):
         16: "Transferred Out",
     }
 
-    stage_names = []
-    student_counts = []
-
-    for code, label in funnel_stages.items():
-        count = df[df["Graduation_rate_status_in_cohort"] == code]["Total"].sum()
-        stage_names.append(label)
-        student_counts.append(count)
+    counts = code_table(totals, funnel_stages)
 
     funnel_df = pd.DataFrame({
-        "Stage": stage_names,
-        "Students": student_counts,
-        "Text": [f"{int(v):,}" for v in student_counts]  # format like 13,933
+        "Stage": labelled(counts.index, funnel_stages),
+        "Students": counts.to_numpy(),
+        "Text": counts.astype("int64").map("{:,}".format).to_numpy()  # format like 13,933
     })
 
     fig = px.bar(
@@ -57,34 +65,26 @@ def graduation_funnel_chart(df, selected_unitid=None, selected_year=None):
 
     return fig
 
+@profiled
+@cached_figure
 def plot_graduation_rate_trend(data, selected_unitid=None):
     """
     Plots a line chart showing graduation rates (4, 5, 6 years) over time
     for a specific institution or across all if selected_unitid is None.
     """
-    df = data.copy()
-    df["Total"] = pd.to_numeric(df["Total"], errors="coerce")
-
-    # Filter to relevant CHRTSTAT codes
+    # Relevant CHRTSTAT codes
     relevant_codes = {
         12: "Adjusted Cohort",
         13: "Grad ≤ 4 Years",
         14: "Grad in 5 Years",
         15: "Grad in 6 Years"
     }
-    df = df[df["Graduation_rate_status_in_cohort"].isin(relevant_codes.keys())]
-
-    if selected_unitid:
-        df = df[df["unitid"] == selected_unitid]
 
-    # Pivot data: year x outcome
-    pivot = df.pivot_table(
-        index=["year"],
-        columns="Graduation_rate_status_in_cohort",
-        values="Total",
-        aggfunc="sum"
-    ).reset_index()
-    pivot.rename(columns=relevant_codes, inplace=True)
+    # year x outcome table, already aggregated in the graduation cube
+    yearly = graduation_yearly(data, selected_unitid or None)
+    pivot = yearly[[code for code in relevant_codes if code in yearly.columns]]
+    pivot = pivot.dropna(how="all").reset_index()
+    pivot = pivot.rename(columns=relevant_codes)
 
     # Skip if Adjusted Cohort is missing
     if "Adjusted Cohort" not in pivot.columns:
@@ -98,11 +98,12 @@ def plot_graduation_rate_trend(data, selected_unitid=None):
     # Melt for plotting
     available_labels = [col for col in ["Grad ≤ 4 Years", "Grad in 5 Years", "Grad in 6 Years"] if col in pivot.columns]
 
-    melted = pivot.melt(
+    melted = to_long(
+        pivot,
         id_vars="year",
         value_vars=available_labels,
         var_name="Completion Time",
-        value_name="Graduation Rate (%)"
+        value_name="Graduation Rate (%)",
     )
 
     fig = px.line(
@@ -124,17 +125,10 @@ def plot_graduation_rate_trend(data, selected_unitid=None):
 
     return fig
 
+@profiled
+@cached_figure
 def plot_graduation_by_race_treemap(data, selected_unitid=None, selected_year=None):
-    df = data.copy()
-    df["Total"] = pd.to_numeric(df["Total"], errors="coerce").fillna(0)
-
-    if selected_unitid:
-        df = df[df["unitid"] == selected_unitid]
-    if selected_year:
-        df = df[df["year"] == selected_year]
-
-    # Only CHRTSTAT 13 = completed within 4 years of less
-    df = df[df["Graduation_rate_status_in_cohort"] == 13]
+    cube = graduation_cube(data)
 
     race_cols = {
         "American_Indian_or_Alaska_Native_total": "American Indian or Alaska Native",
@@ -148,11 +142,17 @@ def plot_graduation_by_race_treemap(data, selected_unitid=None, selected_year=No
         "U_S__Nonresident_total": "Nonresident Alien"
     }
 
-    available_cols = [col for col in race_cols if col in df.columns]
+    available_cols = [col for col in race_cols if col in cube.columns]
     if not available_cols:
         return None
 
-    totals = df[available_cols].sum().dropna().astype(int).to_dict()
+    # Only CHRTSTAT 13 = completed within 4 years of less
+    by_status = cube.status_totals(selected_unitid or None, selected_year or None, available_cols)
+    if 13 in by_status.index:
+        completed = by_status.loc[13]
+    else:
+        completed = pd.Series(0, index=available_cols)
+    totals = completed.dropna().astype(int).to_dict()
 
     labels = [race_cols[k] for k in totals.keys()]
     values = list(totals.values())
@@ -172,20 +172,20 @@ def plot_graduation_by_race_treemap(data, selected_unitid=None, selected_year=No
 
     return fig
 
+@profiled
+@cached_figure
 def plot_graduation_by_gender_bar(data, selected_unitid=None, selected_year=None):
     """
     Plots a grouped bar chart showing graduation outcomes by gender
     for a selected school and year.
     """
 
-    df = data.copy()
-    df["Total_men"] = pd.to_numeric(df["Total_men"], errors="coerce").fillna(0)
-    df["Total_women"] = pd.to_numeric(df["Total_women"], errors="coerce").fillna(0)
-
-    if selected_unitid:
-        df = df[df["unitid"] == selected_unitid]
-    if selected_year:
-        df = df[df["year"] == selected_year]
+    df = _query(
+        data,
+        ["Cohort_type", "Graduation_rate_status_in_cohort", "Total_men", "Total_women"],
+        selected_unitid,
+        selected_year,
+    )
 
     # Select relevant GRTYPE codes (based on Bachelor’s cohort: GRTYPE 8)
     df = df[df["Cohort_type"] == '8']  # Replace with your actual GRTYPE column name
@@ -201,19 +201,15 @@ def plot_graduation_by_gender_bar(data, selected_unitid=None, selected_year=None
         32: "No Longer Enrolled"
     }
 
-    gender_data = []
-    for chrtstat_code, label in outcome_codes.items():
-        subset = df[df["Graduation_rate_status_in_cohort"] == chrtstat_code]
-        men = subset["Total_men"].sum()
-
-        print(men)
-        women = subset["Total_women"].sum()
-        gender_data.extend([
-            {"Outcome": label, "Gender": "Men", "Count": men},
-            {"Outcome": label, "Gender": "Women", "Count": women},
-        ])
-
-    gender_df = pd.DataFrame(gender_data)
+    totals = df.groupby("Graduation_rate_status_in_cohort")[["Total_men", "Total_women"]].sum()
+    gender_df = codes_to_long(
+        totals,
+        outcome_codes,
+        var_name="Gender",
+        value_name="Count",
+        code_name="Outcome",
+        columns={"Total_men": "Men", "Total_women": "Women"},
+    )
 
     fig = px.bar(
         gender_df,
@@ -233,25 +229,25 @@ def plot_graduation_by_gender_bar(data, selected_unitid=None, selected_year=None
 
     return fig
 
+@profiled
+@cached_figure
 def plot_school_graduation_share_pie_by_unitid(df, selected_unitid, selected_year):
-    # Filter for the selected year and graduation cohort (graduated = 10)
-    df_year = df[(df['year'] == selected_year) & (df['Graduation_rate_status_in_cohort'] == 10)]
+    cube = graduation_cube(df)
 
-    # Total graduates in that year
-    total_grads_all = df_year['Total'].sum()
-
-    # Get the selected school's row by unitid
-    selected_row = df_year[df_year['unitid'] == selected_unitid]
-    if selected_row.empty:
+    # Graduation cohort (graduated = 10) for the selected school and year
+    selected_grads = cube.value(selected_unitid, selected_year, 10)
+    if selected_grads is None:
         print(f"No graduation data found for unitid '{selected_unitid}' in {selected_year}.")
         return None
 
-    selected_grads = selected_row['Total'].values[0]
-    selected_name = selected_row['university_name'].values[0]
+    # Total graduates in that year
+    total_grads_all = cube.year_total(selected_year, 10)
+    selected_name = cube.name_for(selected_unitid)
     other_grads = total_grads_all - selected_grads
 
+    state = dataset_state(df)
     pie_data = pd.DataFrame({
-        'School': [selected_name, 'All Other NJ Schools'],
+        'School': [selected_name, f'All Other {state} Schools' if state else 'All Other Schools'],
         'Graduates': [selected_grads, other_grads]
     })
 
@@ -259,7 +255,7 @@ def plot_school_graduation_share_pie_by_unitid(df, selected_unitid, selected_yea
         pie_data,
         names='School',
         values='Graduates',
-        title=f"Selected School Share of Total Graduates in New Jersey ({selected_year})",
+        title=f"Selected School Share of Total Graduates in {state or 'All Selected States'} ({selected_year})",
         hole=0.4,
         color_discrete_sequence=px.colors.qualitative.G10,
     )
@@ -268,24 +264,24 @@ def plot_school_graduation_share_pie_by_unitid(df, selected_unitid, selected_yea
 
     return fig
 
+@profiled
+@cached_figure
 def plot_school_graduation_share_pie(df, selected_school="New Jersey Institute of Technology", selected_year=None):
-    # Filter for the selected year and graduation cohort
-    df_year = df[(df['year'] == selected_year) & (df['Graduation_rate_status_in_cohort'] == 10)]
-
-    # Group data
-    total_grads_all = df_year['Total'].sum()
-    
-    # Graduation count for selected school
-    selected_row = df_year[df_year['university_name'] == selected_school]
-    if selected_row.empty:
+    cube = graduation_cube(df)
+
+    # Graduation count (graduated = 10) for the selected school and year
+    selected_grads = cube.value(cube.unitid_for(selected_school), selected_year, 10)
+    if selected_grads is None:
         print(f"No graduation data found for '{selected_school}' in {selected_year}.")
         return None
 
-    selected_grads = selected_row['Total'].values[0]
+    # Total graduates in that year
+    total_grads_all = cube.year_total(selected_year, 10)
     other_grads = total_grads_all - selected_grads
 
+    state = dataset_state(df)
     pie_data = pd.DataFrame({
-        'School': ['NJIT', 'All Other NJ Schools'],
+        'School': ['NJIT', f'All Other {state} Schools' if state else 'All Other Schools'],
         'Graduates': [selected_grads, other_grads]
     })
 
@@ -293,7 +289,7 @@ def plot_school_graduation_share_pie(df, selected_school="New Jersey Institute o
         pie_data,
         names='School',
         values='Graduates',
-        title=f"NJIT Share of Total Graduates in New Jersey ({selected_year})",
+        title=f"NJIT Share of Total Graduates in {state or 'All Selected States'} ({selected_year})",
         hole=0.4,
         color_discrete_sequence=px.colors.qualitative.G10,
     )
@@ -0,0 +1,177 @@
+"""
+Compiled IPEDS data dictionaries: each *dict.xlsx parsed once, reused until the file changes.
+
+An IPEDS dictionary workbook has a `varlist` sheet (varname, varTitle) and a
+`Frequencies` sheet (varname, codevalue, valuelabel). Reading it with
+pd.read_excel takes seconds; the compiled form is a small JSON file under
+data/cache/dictionaries/ keyed by the workbook's SHA-256, so ingestion
+(ingest.variable_mapping), the notebooks and the dbt seed export read the
+mappings in milliseconds and only re-parse a workbook whose contents changed.
+
+    python data_dictionary.py raw/adm/adm2023_dict.xlsx raw/sfa/sfa_dict.xlsx
+    python data_dictionary.py raw/gr2023dict.xlsx --seeds dbt-preprocessing/ipeds_dbt/seeds
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import data_loader
+
+# Anchored at the repo, so notebooks run from other folders (dbt-preprocessing/scrape.ipynb) share one cache
+DICTIONARY_CACHE_DIR = os.path.join(Path(__file__).resolve().parent, data_loader.CACHE_DIR, "dictionaries")
+DICTIONARY_SHEETS = ("varlist", "Frequencies")
+DICTIONARY_FORMAT = 1
+
+
+class DataDictionary:
+    """
+    varname -> title and, per variable, code -> label for one survey/year.
+
+    `titles` keeps the varlist order; `codes` maps each varname to its
+    (code, label) pairs in Frequencies order, as the seed export writes them.
+    """
+
+    def __init__(self, titles, codes=None, source=None):
+        self.titles = titles
+        self.codes = codes or {}
+        self.source = source
+
+    def __len__(self):
+        return len(self.titles)
+
+    def column_names(self, shorten=False):
+        """
+        varname -> column name: titles with spaces replaced by underscores, or
+        with `shorten` lowercased and reduced to [a-z0-9_] as in process_sfa.ipynb.
+        """
+        titles = pd.Series(list(self.titles.values()), dtype=object).astype(str)
+        if shorten:
+            titles = titles.str.lower().str.replace(r"[^a-z0-9]+", " ", regex=True).str.split().str.join("_")
+        else:
+            titles = titles.str.replace(" ", "_")
+        return dict(zip(self.titles, titles))
+
+    def labels(self, varname):
+        """code -> label for one variable (empty when it has no frequencies)."""
+        return dict(self.codes.get(varname, []))
+
+    def varlist(self):
+        return pd.DataFrame({"varname": list(self.titles), "varTitle": list(self.titles.values())})
+
+    def frequencies(self):
+        return pd.DataFrame(
+            [(var, code, label) for var, pairs in self.codes.items() for code, label in pairs],
+            columns=["varname", "codevalue", "valuelabel"],
+        )
+
+    def to_json(self):
+        return {"format": DICTIONARY_FORMAT, "source": self.source, "titles": self.titles,
+                "codes": {var: [list(pair) for pair in pairs] for var, pairs in self.codes.items()}}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["titles"], {var: [tuple(pair) for pair in pairs] for var, pairs in data["codes"].items()},
+                   data.get("source"))
+
+
+def parse_dictionary(path, sheet_name=DICTIONARY_SHEETS):
+    """
+    Read a dictionary workbook (or a CSV export of its varlist sheet) without the cache.
+    `sheet_name` is the (varlist, frequencies) sheet pair, for workbooks that name them differently.
+    """
+    varlist_sheet, freq_sheet = sheet_name
+    if str(path).endswith(".csv"):
+        varlist, freq = pd.read_csv(path), None
+    else:
+        with pd.ExcelFile(path) as workbook:
+            sheets = {name: workbook.parse(name) for name in sheet_name if name in workbook.sheet_names}
+        varlist, freq = sheets.get(varlist_sheet), sheets.get(freq_sheet)
+    if varlist is None or "varname" not in varlist.columns or "varTitle" not in varlist.columns:
+        raise ValueError(f"Required columns 'varname' and 'varTitle' not found in {path}.")
+
+    varlist = varlist.dropna(subset=["varname"])
+    titles = dict(zip(varlist["varname"].tolist(), varlist["varTitle"].tolist()))
+    codes = {}
+    if freq is not None and {"varname", "codevalue", "valuelabel"} <= set(freq.columns):
+        for var, code, label in zip(freq["varname"].tolist(), freq["codevalue"].tolist(), freq["valuelabel"].tolist()):
+            codes.setdefault(var, []).append((code, label))
+    return DataDictionary(titles, codes, source=os.path.basename(path))
+
+
+def compiled_path(path, cache_dir=DICTIONARY_CACHE_DIR, sheet_name=DICTIONARY_SHEETS):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if tuple(sheet_name) != DICTIONARY_SHEETS:
+        stem = f"{stem}.{'.'.join(sheet_name)}"
+    return os.path.join(cache_dir, f"{stem}-{data_loader.source_hash(path)[:16]}.json")
+
+
+_LOADED = {}
+
+
+def load_dictionary(path, cache_dir=DICTIONARY_CACHE_DIR, sheet_name=DICTIONARY_SHEETS):
+    """
+    The DataDictionary of a workbook, from its compiled cache when the
+    workbook's hash matches, else parsed and compiled now. Stale compiled
+    files of the same workbook are removed. `sheet_name` is the (varlist,
+    frequencies) sheet pair, as the notebooks passed to pd.read_excel.
+    """
+    target = compiled_path(path, cache_dir, sheet_name)
+    if target in _LOADED:
+        return _LOADED[target]
+
+    if os.path.exists(target):
+        with open(target, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") == DICTIONARY_FORMAT:
+            _LOADED[target] = DataDictionary.from_json(data)
+            return _LOADED[target]
+
+    dictionary = parse_dictionary(path, sheet_name)
+    os.makedirs(cache_dir, exist_ok=True)
+    prefix = os.path.basename(target).rsplit("-", 1)[0] + "-"
+    for old in os.listdir(cache_dir):
+        if old.startswith(prefix) and old != os.path.basename(target):
+            os.remove(os.path.join(cache_dir, old))
+    tmp_path = f"{target}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dictionary.to_json(), f, ensure_ascii=False)
+    os.replace(tmp_path, target)
+    _LOADED[target] = dictionary
+    return dictionary
+
+
+# 🔹 dbt seeds (what dbt-preprocessing/scrape.ipynb exports)
+def export_seeds(dictionary, out_dir):
+    """
+    varlist_columns.csv (varname, varTitle) and one <varname>_code.csv
+    (code, label) per variable with frequencies. Returns the number of code files.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    dictionary.varlist().to_csv(os.path.join(out_dir, "varlist_columns.csv"), index=False)
+    for var, pairs in dictionary.codes.items():
+        pd.DataFrame(pairs, columns=["code", "label"]).to_csv(os.path.join(out_dir, f"{var.lower()}_code.csv"), index=False)
+    return len(dictionary.codes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="dictionary workbooks (*dict.xlsx)")
+    parser.add_argument("--seeds", help="also export dbt seed CSVs to this folder")
+    parser.add_argument("--cache-dir", default=DICTIONARY_CACHE_DIR)
+    args = parser.parse_args()
+
+    for path in args.paths:
+        start = time.perf_counter()
+        dictionary = load_dictionary(path, args.cache_dir)
+        line = f"{path}: {len(dictionary):,} variables, {len(dictionary.codes):,} coded"
+        if args.seeds:
+            line += f", {export_seeds(dictionary, args.seeds):,} code files"
+        print(f"{line} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import os
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import data_partitions
+from instrument import timed
+
+
+class IndexedDataset:
+    """
+    A dataset sorted by (unitid, year) with precomputed row offsets.
+
+    Selecting one institution, one institution-year or one year is a dict
+    lookup plus a slice instead of a boolean mask over every row, so the
+    cost depends on the number of rows returned, not the size of the dataset.
+    Rows come back in frame order, matching what a boolean mask would return.
+
+    `version` is the data_loader stamp of the frame it was built from, or
+    None when that frame was not the stamped one (e.g. a filtered copy).
+    Selections never carry the stamp.
+    """
+
+    def __init__(self, df, name_column="university_name"):
+        frame = df.sort_values(["unitid", "year"], kind="stable").reset_index(drop=True)
+        frame.attrs = dict(df.attrs)
+        self.version = data_loader.stamped_version(df)
+        if self.version is None:
+            data_loader.unstamped(frame)
+        self.frame = frame
+        self.name_column = name_column
+        self.frozen = False
+
+        unitids = frame["unitid"].to_numpy()
+        years = frame["year"].to_numpy()
+        n = len(frame)
+
+        # Boundaries of each (unitid, year) run and each unitid run in the sorted frame
+        new_pair = np.flatnonzero((unitids[1:] != unitids[:-1]) | (years[1:] != years[:-1])) + 1
+        pair_starts = np.r_[0, new_pair] if n else np.array([], dtype=int)
+        pair_stops = np.r_[new_pair, n] if n else np.array([], dtype=int)
+        self._pair_offsets = {
+            (u, y): (start, stop)
+            for u, y, start, stop in zip(
+                unitids[pair_starts].tolist(), years[pair_starts].tolist(),
+                pair_starts.tolist(), pair_stops.tolist(),
+            )
+        }
+
+        new_unit = np.flatnonzero(unitids[1:] != unitids[:-1]) + 1
+        unit_starts = np.r_[0, new_unit] if n else np.array([], dtype=int)
+        unit_stops = np.r_[new_unit, n] if n else np.array([], dtype=int)
+        self._unit_offsets = dict(zip(unitids[unit_starts].tolist(), zip(unit_starts.tolist(), unit_stops.tolist())))
+
+        # Row positions per year (ascending, so selections keep frame order)
+        by_year = np.argsort(years, kind="stable")
+        year_values, year_starts = np.unique(years[by_year], return_index=True)
+        self._year_rows = dict(zip(year_values.tolist(), np.split(by_year, year_starts[1:])))
+
+        # Name -> unitids (a name can belong to more than one unitid), exact and case-insensitive
+        self._name_to_unitids = {}
+        self._lower_name_to_unitids = {}
+        if name_column in frame.columns:
+            names = frame[name_column].astype(object).to_numpy()
+            for name, unitid in zip(names[unit_starts].tolist(), unitids[unit_starts].tolist()):
+                if pd.isna(name):
+                    continue
+                self._name_to_unitids.setdefault(name, []).append(unitid)
+                self._lower_name_to_unitids.setdefault(name.lower(), []).append(unitid)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def freeze(self):
+        """
+        Make the dataset read-only so it can be shared as-is (one copy for all
+        sessions). The frame is rebuilt from non-writeable column arrays, and
+        the offset, year and name lookups become read-only mappings, so an
+        in-place write raises instead of changing what other sessions see.
+        A selection is then a read-only view or a copy of its own. Returns self.
+        """
+        frame = pd.DataFrame({col: _read_only_column(self.frame[col]) for col in self.frame.columns},
+                             index=self.frame.index, copy=False)
+        frame.attrs = self.frame.attrs
+        self.frame = frame
+
+        for rows in self._year_rows.values():
+            rows.flags.writeable = False
+        self._pair_offsets = MappingProxyType(self._pair_offsets)
+        self._unit_offsets = MappingProxyType(self._unit_offsets)
+        self._year_rows = MappingProxyType(self._year_rows)
+        self._name_to_unitids = MappingProxyType({k: tuple(v) for k, v in self._name_to_unitids.items()})
+        self._lower_name_to_unitids = MappingProxyType({k: tuple(v) for k, v in self._lower_name_to_unitids.items()})
+        self.frozen = True
+        return self
+
+    @property
+    def years(self):
+        return sorted(self._year_rows)
+
+    @property
+    def school_names(self):
+        return sorted(self._name_to_unitids)
+
+    def unitids_for(self, names, case_sensitive=True):
+        """All unitids registered under the given institution names."""
+        lookup = self._name_to_unitids if case_sensitive else self._lower_name_to_unitids
+        found = []
+        for name in names:
+            key = name if case_sensitive else name.lower()
+            found.extend(lookup.get(key, []))
+        return found
+
+    def unitid_for(self, name, case_sensitive=True):
+        """First unitid for an institution name, or None if the name is unknown."""
+        found = self.unitids_for([name], case_sensitive=case_sensitive)
+        return found[0] if found else None
+
+    def _rows(self, unitids=None, years=None, names=None, case_sensitive=True):
+        """Row positions for a selection: a slice for one contiguous run, else a sorted array."""
+        if names is not None:
+            unitids = list(unitids or []) + self.unitids_for(names, case_sensitive=case_sensitive)
+
+        if unitids is None and years is None:
+            return slice(0, len(self.frame))
+
+        if unitids is None:
+            parts = [self._year_rows[y] for y in dict.fromkeys(years) if y in self._year_rows]
+            return np.sort(np.concatenate(parts)) if parts else np.array([], dtype=int)
+
+        if years is None:
+            ranges = [self._unit_offsets[u] for u in dict.fromkeys(unitids) if u in self._unit_offsets]
+        else:
+            ranges = [
+                self._pair_offsets[(u, y)]
+                for u in dict.fromkeys(unitids) for y in dict.fromkeys(years)
+                if (u, y) in self._pair_offsets
+            ]
+
+        ranges.sort()
+        if ranges and all(stop == start for (_, stop), (start, _) in zip(ranges, ranges[1:])):
+            return slice(ranges[0][0], ranges[-1][1])
+        return np.concatenate([np.arange(start, stop) for start, stop in ranges]) if ranges else np.array([], dtype=int)
+
+    @timed("filter")
+    def select(self, unitids=None, years=None, names=None, case_sensitive=True):
+        """
+        Rows for the given unitids / institution names and years.
+        A criterion left as None is not filtered on.
+        """
+        if unitids is None and years is None and names is None:
+            # A new frame over the same columns, so adding a column to the result leaves the dataset alone
+            return data_loader.unstamped(self.frame.copy(deep=False))
+        return data_loader.unstamped(self.frame.iloc[self._rows(unitids, years, names, case_sensitive)])
+
+    @timed("filter")
+    def query(self, columns=None, unitids=None, years=None, names=None, case_sensitive=True):
+        """
+        Read-only result of a selection, filtered first and projected to `columns`.
+
+        Only the selected cells of the requested columns are materialized (a
+        single contiguous run is a zero-copy view, categoricals keep only the
+        categories that occur), and numeric columns are
+        marked read-only, so in-place writes raise instead of reaching the
+        shared dataset. Derive new frames with assign/fillna/etc.
+        """
+        rows = self._rows(unitids, years, names, case_sensitive)
+        out = {}
+        for col in (self.frame.columns if columns is None else columns):
+            values = self.frame[col].array
+            if isinstance(values, pd.arrays.NumpyExtensionArray):
+                values = values.to_numpy()[rows]
+                values.flags.writeable = False
+            elif isinstance(values, pd.Categorical):
+                # Keep only the categories present in the selection, not the whole dataset's
+                values = values[rows].remove_unused_categories()
+            else:
+                values = values[rows]
+            out[col] = values
+        return pd.DataFrame(out, index=self.frame.index[rows], copy=False)
+
+
+def _read_only_column(column):
+    """
+    A non-writeable copy of a column's values: a numpy array, or a categorical
+    over non-writeable codes. Other extension arrays (e.g. Arrow strings) are
+    immutable already and are kept as they are.
+    """
+    values = column.array
+    if isinstance(values, pd.Categorical):
+        codes = values.codes.copy()
+        codes.flags.writeable = False
+        return pd.Categorical.from_codes(codes, dtype=values.dtype)
+    if isinstance(values, pd.arrays.NumpyExtensionArray):
+        array = column.to_numpy(copy=True)
+        array.flags.writeable = False
+        return array
+    return values
+
+
+def as_indexed(data):
+    """
+    Return `data` as an IndexedDataset. The frame data_loader stamped is
+    indexed once per version; any other frame (including one derived from
+    it) is indexed on every call.
+    """
+    if isinstance(data, IndexedDataset):
+        return data
+    return _INDEXED.get(IndexedDataset, data)
+
+
+def frame_of(data):
+    """The underlying DataFrame of an IndexedDataset, or `data` itself."""
+    return data.frame if isinstance(data, IndexedDataset) else data
+
+
+def dataset_version(data):
+    """
+    The (dataset, version) data_loader stamped on `data`, or None for ad-hoc
+    frames and frames derived from a loaded one (which inherit its attrs).
+    """
+    if isinstance(data, IndexedDataset):
+        return data.version
+    return data_loader.stamped_version(data)
+
+
+def dataset_state(data):
+    """
+    The state `data` covers: the one value of its `state` column (partitioned
+    loads carry it), DEFAULT_STATE for a frame without one, or None for several states.
+    """
+    frame = frame_of(data)
+    if "state" not in frame.columns:
+        return data_partitions.DEFAULT_STATE
+    states = frame["state"].dropna().unique()
+    return str(states[0]) if len(states) == 1 else None
+
+
+def dataset_source(data):
+    """attrs["source"] (the Parquet files holding exactly this data) of a stamped dataset, or None."""
+    version = dataset_version(data)
+    source = frame_of(data).attrs.get("source") or {}
+    if version is None or source.get("version") != version[1]:
+        return None
+    return source
+
+
+
+class VersionedCache:
+    """
+    Bounded LRU of tables and indexes built from datasets, keyed on the full
+    (dataset, version) stamp, so sessions on different states each keep theirs.
+    Only stamped data is cached (see dataset_version); derived frames are not.
+    Builds run under the lock: sessions that ask for the same table at
+    the same time wait for one build instead of each running their own.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, builder, data):
+        """`builder(data)`, built once per data version. Data without a version is built on every call."""
+        version = dataset_version(data)
+        if version is None:
+            return builder(data)
+        with self._lock:
+            built = self._entries.get(version)
+            if built is None:
+                built = builder(data)
+                self._entries[version] = built
+            self._entries.move_to_end(version)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return built
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Indexes built for plain versioned frames passed to as_indexed
+_INDEXED = VersionedCache(maxsize=int(os.environ.get("AGGREGATE_CACHE_SIZE", 8)))
@@ -0,0 +1,405 @@
+import hashlib
+import itertools
+import json
+import os
+import re
+import tempfile
+import weakref
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_normalize import coerce_numeric, compact_frame, memory_report
+
+# Extracts are read from <IPEDS_DATA_DIR>/<IPEDS_DATA_PREFIX>_<dataset>_data.csv
+# (data/NJ_* by default; benchmarks/synthetic.py writes other-sized sets)
+DATA_DIR = os.environ.get("IPEDS_DATA_DIR", "data")
+DATA_PREFIX = os.environ.get("IPEDS_DATA_PREFIX", "NJ")
+
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+# Bump when the conversion or compaction rules change so existing caches are rebuilt
+CACHE_FORMAT = "3"
+CACHE_FORMAT_KEY = b"ipeds.cache_format"
+SOURCE_HASH_KEY = b"ipeds.source_sha256"
+MEMORY_REPORT_KEY = b"ipeds.memory_report"
+VALIDATION_REPORT_KEY = b"ipeds.validation_report"
+
+# 🔹 Declared schema per dataset
+# Columns listed under "columns" get the given Arrow type, columns matching
+# "text_pattern" are kept as strings, and every other column is numeric (float64).
+# "codes" are small categorical code columns that get downcast to int8/int16.
+DATASETS = {
+    "admission": {
+        "path": os.path.join(DATA_DIR, f"{DATA_PREFIX}_admission_data.csv"),
+        "columns": {
+            "unitid": pa.int32(),
+            "university_name": pa.string(),
+            "year": pa.int16(),
+        },
+        "text_pattern": r"^X[A-Z0-9]+$",  # IPEDS imputation flags (XAPPLCN, XENRLT, ...)
+        "codes": [
+            "Secondary_school_GPA",
+            "Secondary_school_rank",
+            "Secondary_school_record",
+            "Completion_of_college-preparatory_program",
+            "Recommendations",
+            "Formal_demonstration_of_competencies",
+            "Admission_test_scores",
+            "English_Proficiency_Test",
+            "Other_Test_(Wonderlic,_WISC-III,_etc.)",
+            "Work_experience",
+            "Personal_statement_or_essay",
+            "Legacy_status",
+        ],
+    },
+    "enrollment": {
+        "path": os.path.join(DATA_DIR, f"{DATA_PREFIX}_enrollment_data.csv"),
+        "columns": {
+            "unitid": pa.int32(),
+            "university_name": pa.string(),
+            "level_of_study": pa.string(),
+            "year": pa.int16(),
+        },
+    },
+    "graduation": {
+        "path": os.path.join(DATA_DIR, f"{DATA_PREFIX}_graduation_data.csv"),
+        "columns": {
+            "unitid": pa.int32(),
+            "university_name": pa.string(),
+            "year": pa.int16(),
+            "Cohort_type": pa.int16(),
+            "Graduation_rate_status_in_cohort": pa.int16(),
+            "Cohort": pa.int16(),
+        },
+        "codes": ["Cohort_type", "Graduation_rate_status_in_cohort", "Cohort"],
+    },
+    "sfa": {
+        "path": os.path.join(DATA_DIR, f"{DATA_PREFIX}_sfa_data.csv"),
+        "columns": {
+            "unitid": pa.int32(),
+            "university_name": pa.string(),
+            "year": pa.string(),  # academic year label, e.g. "2022–23"
+        },
+    },
+}
+
+
+def dataset_for_path(file_path):
+    """Return the dataset name declared for a CSV path, or None if it is not declared."""
+    target = os.path.normpath(file_path)
+    for name, spec in DATASETS.items():
+        if os.path.normpath(spec["path"]) == target:
+            return name
+    return None
+
+
+def file_hash(file_path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, used to decide when a cache is stale."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_SOURCE_HASHES = {}
+
+
+def source_hash(file_path):
+    """
+    file_hash of a source CSV, remembered per (size, mtime) so repeat loads
+    of an unchanged file skip re-reading it.
+    """
+    stat = os.stat(file_path)
+    key = os.path.abspath(file_path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _SOURCE_HASHES.get(key)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, file_hash(file_path))
+        _SOURCE_HASHES[key] = cached
+    return cached[1]
+
+
+def cache_path(name, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{name}.parquet")
+
+
+def dataset_schema(name, columns):
+    """Build the Arrow schema for a dataset given the CSV's column order."""
+    spec = DATASETS[name]
+    declared = spec["columns"]
+    text_pattern = spec.get("text_pattern")
+
+    fields = []
+    for col in columns:
+        if col in declared:
+            fields.append(pa.field(col, declared[col]))
+        elif text_pattern and re.match(text_pattern, col):
+            fields.append(pa.field(col, pa.string()))
+        else:
+            fields.append(pa.field(col, pa.float64()))
+    return pa.schema(fields)
+
+
+def _apply_schema(df, schema):
+    """
+    Coerce a raw CSV frame so it converts cleanly to the declared Arrow schema.
+
+    This is the only place numeric columns are parsed: suppression sentinels
+    become NaN here so chart code never has to call pd.to_numeric. Returns the
+    frame and a validation report of blanked cells per numeric column.
+    """
+    report = {}
+    for field in schema:
+        col = field.name
+        if pa.types.is_string(field.type):
+            df[col] = df[col].astype("string")
+        elif pa.types.is_floating(field.type):
+            df[col], counts = coerce_numeric(df[col])
+            if counts["sentinel"] or counts["coerced"]:
+                report[col] = counts
+        else:
+            df[col] = df[col].astype(field.type.to_pandas_dtype())
+    return df, report
+
+
+def _compact(name, df):
+    """Apply the dataset's compaction rules: declared integer keys stay as declared."""
+    spec = DATASETS[name]
+    codes = set(spec.get("codes", ()))
+    keys = [
+        col for col, dtype in spec["columns"].items()
+        if pa.types.is_integer(dtype) and col not in codes
+    ]
+    return compact_frame(df, codes=codes, keys=keys)
+
+
+def _check_schema(table, schema):
+    """
+    Raise TypeError when a column of the compacted `table` does not hold its
+    declared type: text may be dictionary-encoded and numbers narrowed, but
+    every other type must match exactly.
+    """
+    for field in schema:
+        actual = table.schema.field(field.name).type
+        if pa.types.is_dictionary(actual):
+            actual = actual.value_type
+        if pa.types.is_string(field.type):
+            valid = pa.types.is_string(actual) or pa.types.is_large_string(actual)
+        elif pa.types.is_floating(field.type):
+            valid = pa.types.is_integer(actual) or pa.types.is_floating(actual)
+        elif pa.types.is_integer(field.type):
+            valid = pa.types.is_integer(actual)
+        else:
+            valid = actual == field.type
+        if not valid:
+            raise TypeError(f"Column {field.name!r} is {actual}, expected {field.type}.")
+
+
+def typed_table(name, raw, source_hash):
+    """
+    A dataset frame as the typed, compacted Arrow table the cache stores,
+    with the source hash and the memory/validation reports in its metadata.
+    """
+    schema = dataset_schema(name, raw.columns)
+    df, validation = _apply_schema(raw.copy(), schema)
+    compact = _compact(name, df)
+    report = memory_report(raw, compact)
+
+    # One conversion: the compact table is checked against the declared schema and stored
+    table = pa.Table.from_pandas(compact, preserve_index=False)
+    _check_schema(table, schema)
+    metadata = dict(table.schema.metadata or {})
+    metadata[SOURCE_HASH_KEY] = source_hash.encode()
+    metadata[CACHE_FORMAT_KEY] = CACHE_FORMAT.encode()
+    metadata[MEMORY_REPORT_KEY] = json.dumps(report).encode()
+    metadata[VALIDATION_REPORT_KEY] = json.dumps(validation).encode()
+    return table.replace_schema_metadata(metadata)
+
+
+def write_table(table, target):
+    """Write a zstd-compressed Parquet file, replacing `target` atomically."""
+    folder = os.path.dirname(target) or "."
+    os.makedirs(folder, exist_ok=True)
+    # A temporary name of its own, so concurrent writers never share a half-written file
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(target)}-", suffix=".tmp", dir=folder)
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def build_cache(name, cache_dir=CACHE_DIR, source_hash=None, csv_path=None):
+    """Parse a dataset's CSV once and write it as a typed Parquet file."""
+    csv_path = csv_path or DATASETS[name]["path"]
+    source_hash = source_hash or file_hash(csv_path)
+
+    raw = pd.read_csv(csv_path, low_memory=False)
+    table = typed_table(name, raw, source_hash)
+    write_table(table, cache_path(name, cache_dir))
+    return table
+
+
+def cached_source_hash(name, cache_dir=CACHE_DIR):
+    """Return the source hash recorded in a current-format Parquet cache, or None."""
+    target = cache_path(name, cache_dir)
+    if not os.path.exists(target):
+        return None
+    metadata = pq.read_schema(target).metadata or {}
+    if metadata.get(CACHE_FORMAT_KEY) != CACHE_FORMAT.encode():
+        return None
+    value = metadata.get(SOURCE_HASH_KEY)
+    return value.decode() if value else None
+
+
+# 🔹 Mart exports (mart_export.py) replace a dataset's CSV extract when present
+EXPORT_DIR = os.environ.get("IPEDS_EXPORT_DIR", os.path.join(DATA_DIR, "marts"))
+EXPORT_MANIFEST = "_exports.json"
+
+
+def export_path(name, export_dir=EXPORT_DIR):
+    return os.path.join(export_dir, f"{name}.parquet")
+
+
+def read_exports(export_dir=EXPORT_DIR):
+    """{dataset: {"hash", "version", "rows", ...}} recorded by mart_export.py, or {}."""
+    path = os.path.join(export_dir, EXPORT_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def current_version(name, csv_path=None, export_dir=EXPORT_DIR):
+    """
+    The version load_dataset will stamp on a dataset: the mart export's
+    version counter and content hash when it has been exported, else the
+    source CSV's hash. Cheap enough to check on every rerun.
+    """
+    if csv_path is None:
+        entry = read_exports(export_dir).get(name)
+        if entry and os.path.exists(export_path(name, export_dir)):
+            return f"{CACHE_FORMAT}-mart{entry['version']}-{entry['hash'][:16]}"
+    return f"{CACHE_FORMAT}-{source_hash(csv_path or DATASETS[name]['path'])[:16]}"
+
+
+def load_dataset(name, cache_dir=CACHE_DIR, csv_path=None):
+    """
+    Load a declared dataset from its mart export, or from its Parquet cache,
+    rebuilding the cache only when the source CSV's hash no longer matches.
+    """
+    version = current_version(name, csv_path)
+    if "-mart" in version:
+        path = export_path(name)
+        table = pq.read_table(path)
+    else:
+        csv_path = csv_path or DATASETS[name]["path"]
+        digest = source_hash(csv_path)
+        path = cache_path(name, cache_dir)
+        if cached_source_hash(name, cache_dir) == digest:
+            table = pq.read_table(path)
+        else:
+            table = build_cache(name, cache_dir, source_hash=digest, csv_path=csv_path)
+
+    # The file this version was read from, for engines that query Parquet directly
+    return stamp(table.to_pandas(), name, version, files=[path])
+
+
+# 🔹 Version stamps
+# Identify a loaded frame's data for downstream caches (figure_cache,
+# aggregates, query_engine). Pandas copies attrs onto every frame derived
+# from a stamped one (df[mask], assign, slices), so the attrs alone would
+# hand a filtered frame the whole dataset's cached results. Each stamp also
+# carries a token registered to the one frame it was put on: a derived frame
+# inherits the token but is not that frame, so it has no version.
+STAMP_KEYS = ("dataset", "version", "source", "stamp")
+_STAMPED = weakref.WeakValueDictionary()
+_stamp_tokens = itertools.count()
+
+
+def stamp(df, name, version, files=None):
+    """
+    Mark `df` (in place) as dataset `name` at `version`; `files` are the
+    Parquet files holding exactly this data, when there are any. Returns df.
+    """
+    token = next(_stamp_tokens)
+    df.attrs["dataset"] = name
+    df.attrs["version"] = version
+    if files is None:
+        df.attrs.pop("source", None)
+    else:
+        df.attrs["source"] = {"version": version, "files": list(files)}
+    df.attrs["stamp"] = token
+    _STAMPED[token] = df
+    return df
+
+
+def stamped_version(df):
+    """(dataset, version) of the very frame stamp() marked, else None (ad-hoc and derived frames)."""
+    token = df.attrs.get("stamp")
+    if token is None or _STAMPED.get(token) is not df:
+        return None
+    return df.attrs["dataset"], df.attrs["version"]
+
+
+def unstamped(df):
+    """`df` without the stamp attrs (replaced, not edited, so the frame it came from keeps them). Returns df."""
+    df.attrs = {key: value for key, value in df.attrs.items() if key not in STAMP_KEYS}
+    return df
+
+
+def load_data(file_path):
+    """Load a CSV through the typed Parquet cache when it is a declared dataset."""
+    name = dataset_for_path(file_path)
+    if name is None:
+        return pd.read_csv(file_path)
+    return load_dataset(name)
+
+
+def dataset_file(name, cache_dir=CACHE_DIR):
+    """
+    The Parquet file load_dataset reads a dataset from: its mart export, or
+    its CSV's cache (rebuilt first when stale). Nothing else is read.
+    """
+    if "-mart" in current_version(name):
+        return export_path(name)
+    digest = source_hash(DATASETS[name]["path"])
+    if cached_source_hash(name, cache_dir) != digest:
+        build_cache(name, cache_dir, source_hash=digest)
+    return cache_path(name, cache_dir)
+
+
+def _cached_report(name, key, cache_dir):
+    # From the footer of the file the data is loaded from, without reading any rows
+    metadata = pq.read_schema(dataset_file(name, cache_dir)).metadata or {}
+    return json.loads(metadata.get(key, b"{}"))
+
+
+def cached_memory_report(name, cache_dir=CACHE_DIR):
+    """Return the bytes-saved report recorded when the loaded dataset's file (cache or mart export) was written."""
+    return _cached_report(name, MEMORY_REPORT_KEY, cache_dir)
+
+
+def validation_report(name, cache_dir=CACHE_DIR):
+    """Return {column: {"sentinel": n, "coerced": n}} for cells blanked at ingest."""
+    return _cached_report(name, VALIDATION_REPORT_KEY, cache_dir)
+
+
+if __name__ == "__main__":
+    print(f"{'dataset':<12}{'default MB':>12}{'compact MB':>12}{'saved MB':>10}{'ratio':>8}")
+    for name in DATASETS:
+        report = cached_memory_report(name)
+        print(f"{name:<12}{report['bytes_before'] / 1e6:>12.2f}{report['bytes_after'] / 1e6:>12.2f}"
+              f"{report['bytes_saved'] / 1e6:>10.2f}{report['ratio']:>8.3f}")
+
+    print(f"\n{'dataset':<12}{'column':<60}{'sentinel':>10}{'coerced':>9}")
+    for name in DATASETS:
+        report = validation_report(name)
+        if not report:
+            print(f"{name:<12}{'(no cells blanked)':<60}")
+        for col, counts in report.items():
+            print(f"{name:<12}{col[:59]:<60}{counts['sentinel']:>10}{counts['coerced']:>9}")
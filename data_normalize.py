@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+# Largest integer a float32 can hold exactly; bigger counts (e.g. aid dollars) stay float64.
+FLOAT32_EXACT_MAX = 2 ** 24
+
+# Placeholders IPEDS / College Scorecard extracts use instead of a number
+SENTINELS = ("PrivacySuppressed", "NULL")
+
+
+def coerce_numeric(series):
+    """
+    Resolve suppression sentinels to NaN and parse a column as float64.
+
+    Returns the numeric series plus a count of the cells that were blanked:
+    {"sentinel": <PrivacySuppressed/NULL cells>, "coerced": <other unparseable cells>}.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype("float64"), {"sentinel": 0, "coerced": 0}
+
+    is_sentinel = series.isin(SENTINELS)
+    numeric = pd.to_numeric(series.mask(is_sentinel), errors="coerce").astype("float64")
+    blanked = numeric.isna() & series.notna()
+    sentinel = int(is_sentinel.sum())
+    return numeric, {"sentinel": sentinel, "coerced": int(blanked.sum()) - sentinel}
+
+
+def memory_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def _is_integral(values):
+    finite = values[~np.isnan(values)]
+    return bool(np.all(finite == np.round(finite)))
+
+
+def _compact_numeric(series):
+    """Pick the smallest exact dtype for a count/amount column."""
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    has_nan = bool(np.isnan(values).any())
+
+    if not _is_integral(values):
+        # float32 keeps ~7 significant digits: use it only when every value survives the round trip
+        exact = np.array_equal(values.astype("float32").astype("float64"), values, equal_nan=True)
+        return series.astype("float32" if exact else "float64")
+
+    finite = values[~np.isnan(values)]
+    peak = np.abs(finite).max() if finite.size else 0
+    if has_nan:
+        return series.astype("float32" if peak < FLOAT32_EXACT_MAX else "float64")
+    if peak <= np.iinfo("int32").max:
+        return series.astype("int32")
+    return series.astype("int64")
+
+
+def _compact_code(series):
+    """Downcast a small categorical code column (CHRTSTAT, GRTYPE, ...) to int8/int16."""
+    if series.isna().any():
+        return series.astype("float32")
+    return pd.to_numeric(series, downcast="integer")
+
+
+def compact_frame(df, codes=(), keys=()):
+    """
+    Return a copy of `df` using compact dtypes:
+    text columns become categoricals, code columns int8/int16,
+    counts int32 (or float32 when they contain missing values), and
+    fractional amounts float32 when that is exact, float64 otherwise.
+    Columns listed in `keys` keep their declared dtype.
+    """
+    out = {}
+    for col in df.columns:
+        series = df[col]
+        if col in keys:
+            out[col] = series
+        elif col in codes:
+            out[col] = _compact_code(series)
+        elif pd.api.types.is_numeric_dtype(series):
+            out[col] = _compact_numeric(series)
+        else:
+            out[col] = series.astype("category")
+    return pd.DataFrame(out, index=df.index)
+
+
+def memory_report(before, after):
+    """Bytes used by a frame before and after compaction."""
+    before_bytes = memory_bytes(before)
+    after_bytes = memory_bytes(after)
+    return {
+        "bytes_before": before_bytes,
+        "bytes_after": after_bytes,
+        "bytes_saved": before_bytes - after_bytes,
+        "ratio": round(after_bytes / before_bytes, 3) if before_bytes else 1.0,
+    }
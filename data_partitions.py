@@ -0,0 +1,195 @@
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import data_loader
+from institution_directory import DIRECTORY_FILE, InstitutionDirectory
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are only serialised within the process
+    fcntl = None
+
+# Hive-style layout: <PARTITION_DIR>/<dataset>/state=<XX>/year=<YYYY>/part-0.parquet
+PARTITION_DIR = os.path.join(data_loader.DATA_DIR, "partitions")
+MANIFEST = "_manifest.json"
+
+# unitid -> state from the institution directory. Institutions missing from it,
+# or every institution when the file does not exist, get DEFAULT_STATE.
+STATES_FILE = DIRECTORY_FILE
+DEFAULT_STATE = os.environ.get("IPEDS_DEFAULT_STATE", "NJ")
+
+# Rows per Parquet row group; a state-year partition is far smaller than this
+ROW_GROUP_ROWS = 1 << 20
+
+
+def partition_path(name, root=PARTITION_DIR):
+    return os.path.join(root, name)
+
+
+def _partitioning(name):
+    year_type = data_loader.DATASETS[name]["columns"]["year"]
+    return ds.partitioning(pa.schema([("state", pa.string()), ("year", year_type)]), flavor="hive")
+
+
+def _states_version(states_file):
+    return data_loader.source_hash(states_file)[:16] if os.path.exists(states_file) else DEFAULT_STATE
+
+
+def partitions_version(name, states_file=STATES_FILE):
+    """The version a dataset's partitions are built for: its source version and the state lookup's."""
+    return f"{data_loader.current_version(name)}-{_states_version(states_file)}"
+
+
+_build_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _locked(name, root):
+    """
+    Hold a dataset's build lock: one thread of this process, and one process
+    (a lock file in `root`, where fcntl exists).
+    """
+    os.makedirs(root, exist_ok=True)
+    with _build_lock, open(os.path.join(root, f".{name}.lock"), "w") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def read_manifest(name, root=PARTITION_DIR):
+    """The manifest written with a dataset's partitions, or None if there are none."""
+    path = os.path.join(partition_path(name, root), MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def state_lookup(unitids, states_file=STATES_FILE):
+    """State code per unitid, from the institution directory or DEFAULT_STATE."""
+    return InstitutionDirectory.load(states_file, missing_ok=True).states(unitids).fillna(DEFAULT_STATE)
+
+
+def build_partitions(name, root=PARTITION_DIR, states_file=STATES_FILE):
+    """
+    Write a dataset as state=/year= Parquet partitions, from its typed cache.
+    Replaces any earlier partitions of the dataset and records a manifest.
+    """
+    with _locked(name, root):
+        return _write_partitions(name, root, states_file)
+
+
+def _write_partitions(name, root, states_file):
+    """build_partitions under the lock: write to a fresh folder in `root`, then swap it in."""
+    df = data_loader.load_dataset(name)
+    version = f"{df.attrs['version']}-{_states_version(states_file)}"
+    df = df.assign(state=state_lookup(df["unitid"], states_file).astype(str))
+    # Contiguous partitions, so each file is written as one row group
+    df = df.sort_values(["state", "year"], kind="stable", ignore_index=True)
+
+    target = partition_path(name, root)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{name}-", dir=root)
+    try:
+        ds.write_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            tmp_dir,
+            format="parquet",
+            partitioning=_partitioning(name),
+            file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+            basename_template="part-{i}.parquet",
+            min_rows_per_group=ROW_GROUP_ROWS,
+            max_rows_per_group=ROW_GROUP_ROWS,
+        )
+
+        manifest = {
+            "version": version,
+            "columns": [col for col in df.columns if col != "state"],
+            "states": sorted(df["state"].unique().tolist()),
+            "years": sorted(df["year"].unique().tolist()),
+        }
+        with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        # A folder cannot be replaced by another: move the old partitions aside first
+        old_dir = f"{tmp_dir}.old"
+        if os.path.exists(target):
+            os.replace(target, old_dir)
+        os.replace(tmp_dir, target)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def ensure_partitions(name, root=PARTITION_DIR, states_file=STATES_FILE):
+    """
+    The dataset's manifest, rebuilding the partitions when the source or state
+    lookup changed. Concurrent callers wait for one rebuild, then re-read its manifest.
+    """
+    version = partitions_version(name, states_file)
+    manifest = read_manifest(name, root)
+    if manifest is None or manifest["version"] != version:
+        with _locked(name, root):
+            manifest = read_manifest(name, root)
+            if manifest is None or manifest["version"] != version:
+                manifest = _write_partitions(name, root, states_file)
+    return manifest
+
+
+def available(name, root=PARTITION_DIR, states_file=STATES_FILE):
+    """(states, years) present in a dataset's partitions, without reading any rows."""
+    manifest = ensure_partitions(name, root, states_file)
+    return manifest["states"], manifest["years"]
+
+
+def load_partitions(name, states=None, years=None, root=PARTITION_DIR, states_file=STATES_FILE):
+    """
+    Load only the partitions matching `states` and `years` (None = all).
+
+    The filter is pushed down to the partition paths, so files outside the
+    selection are never opened. With no selection the single compacted cache
+    is read instead, which beats opening every partition file. The frame
+    carries a `state` column and a version that includes the selection, for
+    downstream caches.
+    """
+    manifest = ensure_partitions(name, root, states_file)
+    if states is None and years is None:
+        df = data_loader.load_dataset(name)
+        df["state"] = state_lookup(df["unitid"], states_file).astype("category")
+        return data_loader.stamp(df, name, f"{manifest['version']}-*", df.attrs["source"]["files"])
+
+    dataset = ds.dataset(partition_path(name, root), format="parquet", partitioning=_partitioning(name))
+
+    predicate = None
+    if states is not None:
+        predicate = ds.field("state").isin(list(states))
+    if years is not None:
+        by_year = ds.field("year").isin(list(years))
+        predicate = by_year if predicate is None else predicate & by_year
+
+    files = [fragment.path for fragment in dataset.get_fragments(filter=predicate)]
+    table = dataset.to_table(filter=predicate).select(manifest["columns"] + ["state"])
+    df = table.to_pandas()
+    df["state"] = df["state"].astype("category")
+    if pa.types.is_string(data_loader.DATASETS[name]["columns"]["year"]):
+        # Text partition values come back as plain strings; compaction stores text as categoricals
+        df["year"] = df["year"].astype("category")
+
+    selection = ",".join(sorted(states)) if states is not None else "*"
+    if years is not None:
+        selection += ":" + ",".join(str(y) for y in sorted(years))
+    return data_loader.stamp(df, name, f"{manifest['version']}-{selection}", files)
+
+
+if __name__ == "__main__":
+    for name in data_loader.DATASETS:
+        manifest = build_partitions(name)
+        print(f"{name:<12}{len(manifest['states']):>4} states {len(manifest['years']):>3} years  "
+              f"{partition_path(name)}")
@@ -0,0 +1,33 @@
+import data_loader
+
+
+class DatasetRegistry:
+    """
+    Hands out datasets by name, loading each one on first access.
+
+    Pages ask the registry for what they need instead of loading everything
+    up front, so a rerun only parses (and hashes) the datasets the active page
+    uses. `touched` maps each page to the dataset names it requested; pass a
+    dict kept in `st.session_state` to accumulate it across reruns.
+    """
+
+    def __init__(self, loader=data_loader.load_dataset, touched=None):
+        self._loader = loader
+        self._frames = {}
+        self.touched = touched if touched is not None else {}
+        self.page = None
+
+    def get(self, name):
+        if name not in data_loader.DATASETS:
+            raise KeyError(f"Unknown dataset '{name}'. Expected one of: {', '.join(data_loader.DATASETS)}")
+
+        if self.page is not None:
+            self.touched.setdefault(self.page, set()).add(name)
+
+        if name not in self._frames:
+            self._frames[name] = self._loader(name)
+        return self._frames[name]
+
+    def loaded(self):
+        """Names of the datasets loaded through this registry so far."""
+        return list(self._frames)
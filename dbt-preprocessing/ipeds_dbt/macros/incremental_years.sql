@@ -0,0 +1,34 @@
+{#-
+  Per-year incremental builds. IPEDS only revises the newest year, so an
+  incremental run (re)loads just the years missing from the target plus the
+  `refresh_years` var (dbt_project.yml: the newest year). The delete+insert
+  strategy on survey_year replaces each reloaded year as a whole, including
+  institutions a revision no longer reports.
+  `dbt run --full-refresh` rebuilds every year.
+
+    dbt run                                        -- new years + refresh_years
+    dbt run --vars '{refresh_years: [2022, 2023]}' -- also reload 2022
+-#}
+{% macro years_to_build(years) %}
+  {% if not execute or not is_incremental() %}
+    {{ return(years) }}
+  {% endif %}
+
+  {% set loaded = run_query('select distinct survey_year from ' ~ this).columns[0].values() | map('int') | list %}
+  {% set refresh = var('refresh_years', []) %}
+  {% set build = [] %}
+  {% for y in years %}
+    {% if y not in loaded or y in refresh %}
+      {% do build.append(y) %}
+    {% endif %}
+  {% endfor %}
+  {{ return(build) }}
+{% endmacro %}
+
+
+{#- `where 1 = 0` when an incremental run has nothing to reload for a per-year staging model -#}
+{% macro incremental_year_filter(year) %}
+  {%- if not years_to_build([year]) %}
+where 1 = 0
+  {%- endif %}
+{% endmacro %}
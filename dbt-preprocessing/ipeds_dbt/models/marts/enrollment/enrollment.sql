@@ -1,9 +1,16 @@
-{{ config(materialized='table', cluster_by=['institution_id','survey_year']) }}
+{#- unique_key survey_year: a reloaded year replaces every row of that year -#}
+{{ config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='survey_year',
+    cluster_by=['institution_id','survey_year']
+) }}
 
 {% set years = [2023] %}  -- Add more years as enrollment staging models are created
+{% set build_years = years_to_build(years) %}  -- incremental runs: new years + refresh_years
 
 {% set rels = [] %}
-{% for y in years %}
+{% for y in build_years or years[-1:] %}
   {% do rels.append( ref('stage__enrollment' ~ y) ) %}
 {% endfor %}
 
@@ -17,6 +24,7 @@ select
   ela.effyalev_label as student_level_and_degree_status,
   el.effylev_label as undergraduate_graduate_level,
   ls.lstudy_label as original_level_of_study,
+  b.student_level_and_degree_status as effyalev_code,  -- code the app's Parquet export keeps
   b.grand_total,
   b.grand_total_men,
   b.grand_total_women,
@@ -32,4 +40,5 @@ select
 from base b
 left join {{ ref('dim_effyalev') }} ela on b.student_level_and_degree_status = ela.effyalev_code
 left join {{ ref('dim_effylev') }}  el  on b.undergraduate_graduate_level = el.effylev_code
-left join {{ ref('dim_lstudy') }}   ls  on b.original_level_of_study = ls.lstudy_code
\ No newline at end of file
+left join {{ ref('dim_lstudy') }}   ls  on b.original_level_of_study = ls.lstudy_code
+{% if not build_years %}where 1 = 0{% endif %}
@@ -1,9 +1,16 @@
-{{ config(materialized='table', cluster_by=['institution_id','survey_year']) }}
+{#- unique_key survey_year: a reloaded year replaces every row of that year -#}
+{{ config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='survey_year',
+    cluster_by=['institution_id','survey_year']
+) }}
 
 {% set years = var('grad_years', []) %}
+{% set build_years = years_to_build(years) %}  -- incremental runs: new years + refresh_years
 
 {% set rels = [] %}
-{% for y in years %}
+{% for y in build_years or years[-1:] %}
   {% do rels.append( ref('stage__grad' ~ y) ) %}
 {% endfor %}
 
@@ -19,6 +26,7 @@ select
   s.section_label  as section,
   h.cohort_label   as cohort,
   l.line_label     as line,
+  b.grtype_code,   b.chrtstat_code,  b.cohort_code,  -- codes the app's Parquet export keeps
   b.gr_total_all,  b.gr_total_male,  b.gr_total_female,
   b.gr_ai_an_all,  b.gr_ai_an_male,  b.gr_ai_an_female,
   b.gr_asian_all,  b.gr_asian_male,  b.gr_asian_female,
@@ -35,3 +43,4 @@ left join {{ ref('dim_chrtstat') }} c on b.chrtstat_code = c.chrtstat_code
 left join {{ ref('dim_section') }}  s on b.section_code  = s.section_code
 left join {{ ref('dim_cohort') }}   h on b.cohort_code   = h.cohort_code
 left join {{ ref('dim_line') }}     l on b.line_code     = l.line_code
+{% if not build_years %}where 1 = 0{% endif %}
@@ -3,3 +3,4 @@ with src as (
 )
 
 {{ stage_enrollment(2022) }}
+{{ incremental_year_filter(2022) }}
@@ -1,8 +1,7 @@
-{{ config(materialized='table') }}
-
 with src as (
     select * from {{ source('raw_ipeds','GRAD2022') }}
 )
 
 {{ stg_grad_select(2022) }}
 from src
+{{ incremental_year_filter(2022) }}
@@ -1,8 +1,7 @@
-{{ config(materialized='table') }}
-
 with src as (
     select * from {{ source('raw_ipeds','GRAD2023') }}
 )
 
 {{ stg_grad_select(2023) }}
 from src
+{{ incremental_year_filter(2023) }}
@@ -0,0 +1,251 @@
+"""
+Build the data/<prefix>_*.csv extracts the dashboard reads from raw IPEDS files.
+
+Each yearly raw file (adm20xx.csv, gr20xx.csv, effy20xx_dist.csv, sfa2223.csv)
+is read once and filtered to the whole target unitid set in one vectorized
+step, instead of once per institution as in the process_*.ipynb notebooks.
+Years are processed in parallel in a process pool.
+
+    python ingest.py --raw raw --state NJ
+    python ingest.py --raw raw --datasets graduation --workers 4
+
+Raw files are looked up in <raw>/adm, <raw>/grad, <raw>/effy and <raw>/sfa,
+as the notebooks expected them. Institutions and their names come from the
+local directory (institution_directory.py); nothing is fetched per school.
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import data_loader
+from data_dictionary import load_dictionary
+from institution_directory import DIRECTORY_FILE, InstitutionDirectory
+
+ID_COLUMNS = ["unitid", "university_name", "year"]
+
+# 🔹 Variable mappings (from process_grad.ipynb / process_enrollment.ipynb)
+GRADUATION_MAPPING = {
+    "GRTYPE": "Cohort_type",
+    "CHRTSTAT": "Graduation_rate_status_in_cohort",
+    "COHORT": "Cohort",
+    "GRTOTLT": "Total",
+    "GRTOTLM": "Total_men",
+    "GRTOTLW": "Total_women",
+    "GRAIANT": "American_Indian_total",
+    "GRAIANM": "American_Indian_men",
+    "GRAIANW": "American_Indian_women",
+    "GRASIAT": "Asian_total",
+    "GRASIAM": "Asian_men",
+    "GRASIAW": "Asian_women",
+    "GRBKAAT": "Black_total",
+    "GRBKAAM": "Black_men",
+    "GRBKAAW": "Black_women",
+    "GRHISPT": "Hispanic_total",
+    "GRHISPM": "Hispanic_men",
+    "GRHISPW": "Hispanic_women",
+    "GRNHPIT": "Native_Hawaiian_total",
+    "GRNHPIM": "Native_Hawaiian_men",
+    "GRNHPIW": "Native_Hawaiian_women",
+    "GRWHITT": "White_total",
+    "GRWHITM": "White_men",
+    "GRWHITW": "White_women",
+    "GR2MORT": "Two_or_more_races_total",
+    "GR2MORM": "Two_or_more_races_men",
+    "GR2MORW": "Two_or_more_races_women",
+    "GRUNKNT": "Race_unknown_total",
+    "GRUNKNM": "Race_unknown_men",
+    "GRUNKNW": "Race_unknown_women",
+    "GRNRALT": "Nonresident_alien_total",
+    "GRNRALM": "Nonresident_alien_men",
+    "GRNRALW": "Nonresident_alien_women",
+}
+
+# effyYYYY_dist.csv uses the new variable names, efYYYYa_dist.csv the old ones
+ENROLLMENT_MAPPING_NEW = {"EFFYDLEV": "level_of_study", "EFYDETOT": "headcount"}
+ENROLLMENT_MAPPING_OLD = {"EFDELEV": "level_of_study", "EFDETOT": "headcount"}
+LEVELS = {1: "Undergraduate", 2: "Graduate", 99: "Total"}
+
+
+def variable_mapping(dict_path, shorten=False):
+    """
+    varname -> column name from an IPEDS data dictionary (the varlist sheet of
+    the .xlsx, or a CSV export with varname and varTitle columns). Titles get
+    spaces replaced by underscores, or with `shorten` are lowercased and
+    reduced to [a-z0-9_] as in process_sfa.ipynb. The workbook is parsed once
+    and read from its compiled cache afterwards (see data_dictionary.py).
+    """
+    return load_dictionary(dict_path).column_names(shorten=shorten)
+
+
+# 🔹 Raw file discovery: (year, path, variant) per dataset
+def _yearly_files(folder, pattern):
+    if not os.path.isdir(folder):
+        return []
+    files = []
+    for filename in sorted(os.listdir(folder)):
+        match = re.fullmatch(pattern, filename)
+        if match:
+            files.append((match, os.path.join(folder, filename)))
+    return files
+
+
+def raw_files(name, raw_dir):
+    """[(year, path, variant)] of the raw files for a dataset, in year order."""
+    if name == "admission":
+        found = [(int(m.group(1)), path, None) for m, path in _yearly_files(os.path.join(raw_dir, "adm"), r"adm(\d{4})\.csv")]
+    elif name == "graduation":
+        # gr2022.csv, gr20233.csv (year is the first four digits); *_dict.csv are dictionaries
+        found = [(int(m.group(1)), path, None) for m, path in _yearly_files(os.path.join(raw_dir, "grad"), r"gr(\d{4})\d*\.csv")]
+    elif name == "enrollment":
+        folder = os.path.join(raw_dir, "effy")
+        found = [(int(m.group(1)), path, "new") for m, path in _yearly_files(folder, r"effy(\d{4})\w*_dist\.csv")]
+        found += [(int(m.group(1)), path, "old") for m, path in _yearly_files(folder, r"ef(\d{4})a_dist\.csv")]
+    elif name == "sfa":
+        # sfa2223.csv holds academic year 2022–23
+        found = [(f"20{m.group(1)}–{m.group(2)}", path, None)
+                 for m, path in _yearly_files(os.path.join(raw_dir, "sfa"), r"sfa(\d{2})(\d{2})\.csv")]
+    else:
+        raise KeyError(f"Unknown dataset '{name}'. Expected one of: admission, enrollment, graduation, sfa")
+    return sorted(found, key=lambda item: str(item[0]))
+
+
+# 🔹 One raw file -> the target institutions' rows, mapped (runs in a worker process)
+def _unitid_column(columns):
+    for col in columns:
+        if col.upper() == "UNITID":
+            return col
+    raise ValueError("No UNITID column in raw file.")
+
+
+def process_file(name, path, year, variant, unitids, mapping=None):
+    """
+    Rows of one raw yearly file for every unitid in `unitids`, with the
+    dataset's variable mapping applied and unitid/year columns added.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    id_col = _unitid_column(header)
+    wanted = set(unitids)
+
+    if name == "graduation":
+        usecols = [id_col] + [col for col in header if col in GRADUATION_MAPPING]
+    elif name == "enrollment":
+        mapping = ENROLLMENT_MAPPING_NEW if variant == "new" else ENROLLMENT_MAPPING_OLD
+        usecols = [id_col] + [col for col in header if col in mapping]
+    else:
+        usecols = None
+
+    raw = pd.read_csv(path, usecols=usecols, low_memory=False)
+    raw = raw[raw[id_col].isin(wanted)]
+
+    if name == "admission":
+        # Every column is kept; UNITID itself is renamed by the dictionary too
+        df = raw.rename(columns=mapping or {})
+    elif name == "graduation":
+        df = raw[usecols[1:]].rename(columns=GRADUATION_MAPPING)
+    elif name == "enrollment":
+        df = raw[usecols[1:]].rename(columns=mapping)
+        df = df[df["level_of_study"].isin(LEVELS.keys())]
+        df = df.assign(level_of_study=df["level_of_study"].map(LEVELS))
+    else:
+        # SFA keeps the numeric columns, renamed to shortened titles
+        df = raw.drop(columns=[id_col]).select_dtypes(include="number")
+        df = df.rename(columns={k: v for k, v in (mapping or {}).items() if k in df.columns})
+
+    df = df.copy()
+    df["year"] = year
+    df["unitid"] = raw.loc[df.index, id_col]
+    return df
+
+
+def _run(jobs, workers):
+    """Results of process_file over `jobs`, in job order; workers <= 1 runs in this process."""
+    if workers <= 1 or len(jobs) <= 1:
+        return [process_file(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(process_file, *zip(*jobs)))
+
+
+def build_dataset(name, raw_dir, institutions, mapping=None, workers=None):
+    """
+    One dataset for every institution in `institutions` (unitid, university_name),
+    read from the raw yearly files with one pass per file.
+    Rows are ordered by institution (in `institutions` order), then year.
+    """
+    unitids = institutions["unitid"].tolist()
+    files = raw_files(name, raw_dir)
+    if not files:
+        print(f"No raw {name} files found under {raw_dir}.")
+        return pd.DataFrame()
+
+    jobs = [(name, path, year, variant, unitids, mapping) for year, path, variant in files]
+    frames = [df for df in _run(jobs, workers or os.cpu_count() or 1) if not df.empty]
+    if not frames:
+        print(f"No {name} data found for the selected institutions.")
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    names = institutions.drop_duplicates("unitid").set_index("unitid")["university_name"]
+    df["university_name"] = df["unitid"].map(names)
+    missing = df["university_name"].isna()
+    df.loc[missing, "university_name"] = "No school found for unitid " + df.loc[missing, "unitid"].astype(str)
+
+    position = df["unitid"].map({unitid: i for i, unitid in enumerate(unitids)})
+    df = df.iloc[position.argsort(kind="stable")].reset_index(drop=True)
+
+    if name == "enrollment":
+        return df[["unitid", "university_name", "level_of_study", "headcount", "year"]]
+    return df[ID_COLUMNS + [col for col in df.columns if col not in ID_COLUMNS]]
+
+
+def output_path(name, out_dir, prefix):
+    return os.path.join(out_dir, f"{prefix}_{name}_data.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--raw", required=True, help="folder holding adm/, grad/, effy/ and sfa/")
+    parser.add_argument("--institutions", default=DIRECTORY_FILE, help="institution directory CSV (unitid, university_name, state)")
+    parser.add_argument("--state", help="only institutions in this state")
+    parser.add_argument("--datasets", nargs="+", default=["admission", "enrollment", "graduation", "sfa"])
+    parser.add_argument("--adm-dict", help="admission dictionary (default: <raw>/adm/adm2023_dict.xlsx)")
+    parser.add_argument("--sfa-dict", help="SFA dictionary (default: <raw>/sfa/sfa_dict.xlsx)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes; 1 reads files in this process")
+    parser.add_argument("--out", default=data_loader.DATA_DIR)
+    parser.add_argument("--prefix", default=data_loader.DATA_PREFIX)
+    parser.add_argument("--parquet", action="store_true",
+                        help="also build each dataset's typed Parquet cache under <out>/cache")
+    args = parser.parse_args()
+
+    directory = InstitutionDirectory.load(args.institutions)
+    institutions = directory.in_state(args.state) if args.state else directory.frame
+    print(f"{len(institutions):,} institutions")
+    if institutions.empty:
+        raise SystemExit(f"No institutions in {args.institutions}; build it with institution_directory.py")
+
+    mappings = {
+        "admission": lambda: variable_mapping(args.adm_dict or os.path.join(args.raw, "adm", "adm2023_dict.xlsx")),
+        "sfa": lambda: variable_mapping(args.sfa_dict or os.path.join(args.raw, "sfa", "sfa_dict.xlsx"), shorten=True),
+    }
+
+    os.makedirs(args.out, exist_ok=True)
+    for name in args.datasets:
+        start = time.perf_counter()
+        mapping = mappings[name]() if name in mappings else None
+        df = build_dataset(name, args.raw, institutions, mapping, args.workers)
+        if df.empty:
+            continue
+
+        path = output_path(name, args.out, args.prefix)
+        df.to_csv(path, index=False)
+        if args.parquet:
+            data_loader.load_dataset(name, cache_dir=os.path.join(args.out, "cache"), csv_path=path)
+        print(f"{name:<12}{len(raw_files(name, args.raw)):>4} files {len(df):>10,} rows "
+              f"{time.perf_counter() - start:>8.2f}s  {path}")
+
+
+if __name__ == "__main__":
+    main()
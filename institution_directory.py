@@ -0,0 +1,209 @@
+"""
+Local IPEDS institution directory: unitid -> name and state, looked up in memory.
+
+The store is a CSV (unitid, university_name, state) at data/institutions.csv,
+the file data_partitions, ingest.py and the notebooks read. It is not shipped
+with the repo: build it (before ingest.py) from an IPEDS HD file or a saved
+directory API dump, or refresh it from the Urban Institute directory API
+with batched, concurrent requests cached on disk:
+
+    python institution_directory.py --hd raw/hd2022.csv
+    python institution_directory.py --dump directory.json
+    python institution_directory.py --fetch --unitids-from data/NJ_admission_data.csv --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import pandas as pd
+
+import data_loader
+
+DIRECTORY_FILE = os.path.join(data_loader.DATA_DIR, "institutions.csv")
+COLUMNS = ["unitid", "university_name", "state"]
+
+API_URL = "https://educationdata.urban.org/api/v1/college-university/ipeds/directory/{year}/"
+FETCH_CACHE_DIR = os.path.join(data_loader.CACHE_DIR, "directory")
+
+
+class InstitutionDirectory:
+    """
+    unitid -> university_name / state for every known institution.
+
+    Lookups are vectorized against an in-memory index, so resolving the
+    names of a whole dataset is one map() rather than one request per school.
+    """
+
+    def __init__(self, frame):
+        frame = frame[COLUMNS].dropna(subset=["unitid"]).drop_duplicates("unitid", keep="last")
+        self.frame = frame.astype({"unitid": "int64"}).sort_values("unitid", ignore_index=True)
+        self._by_unitid = self.frame.set_index("unitid")
+
+    def __len__(self):
+        return len(self.frame)
+
+    @classmethod
+    def load(cls, path=DIRECTORY_FILE, missing_ok=False):
+        """
+        The saved directory. A missing file raises FileNotFoundError saying how
+        to build it, unless `missing_ok` (then the directory is empty).
+        """
+        if not os.path.exists(path):
+            if missing_ok:
+                return cls(pd.DataFrame(columns=COLUMNS))
+            raise FileNotFoundError(
+                f"No institution directory at {path}. Build it from an IPEDS HD file "
+                f"(python institution_directory.py --hd raw/hd2022.csv, i.e. InstitutionDirectory.from_hd) "
+                f"or fetch it from the directory API (python institution_directory.py --fetch "
+                f"--unitids-from data/NJ_admission_data.csv, i.e. fetch)."
+            )
+        frame = pd.read_csv(path)
+        if "state" not in frame.columns:
+            frame["state"] = None
+        return cls(frame)
+
+    @classmethod
+    def from_hd(cls, path):
+        """From an IPEDS institutional characteristics (HD) file: UNITID, INSTNM, STABBR."""
+        try:
+            frame = pd.read_csv(path, usecols=["UNITID", "INSTNM", "STABBR"])
+        except UnicodeDecodeError:
+            # NCES ships HD files in Windows-1252
+            frame = pd.read_csv(path, usecols=["UNITID", "INSTNM", "STABBR"], encoding="cp1252")
+        return cls(frame.rename(columns={"UNITID": "unitid", "INSTNM": "university_name", "STABBR": "state"}))
+
+    @classmethod
+    def from_results(cls, results):
+        """From directory API records (unitid, inst_name, state_abbr)."""
+        frame = pd.DataFrame.from_records(list(results), columns=["unitid", "inst_name", "state_abbr"])
+        return cls(frame.rename(columns={"inst_name": "university_name", "state_abbr": "state"}))
+
+    @classmethod
+    def from_dump(cls, path):
+        """From a saved directory API response: {"results": [...]} or a plain list of records."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls.from_results(data.get("results", []) if isinstance(data, dict) else data)
+
+    def merge(self, other):
+        """A directory with both sets of institutions; `other` wins where they overlap."""
+        return InstitutionDirectory(pd.concat([self.frame, other.frame], ignore_index=True))
+
+    def save(self, path=DIRECTORY_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        self.frame.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def names(self, unitids):
+        """university_name per unitid (NaN when unknown), aligned with `unitids`."""
+        unitids = unitids if isinstance(unitids, pd.Series) else pd.Series(list(unitids))
+        return unitids.map(self._by_unitid["university_name"])
+
+    def states(self, unitids):
+        """State code per unitid (NaN when unknown), aligned with `unitids`."""
+        unitids = unitids if isinstance(unitids, pd.Series) else pd.Series(list(unitids))
+        return unitids.map(self._by_unitid["state"])
+
+    def name(self, unitid, default=None):
+        try:
+            return self._by_unitid.at[int(unitid), "university_name"]
+        except KeyError:
+            return default
+
+    def in_state(self, state):
+        """unitid, university_name, state of the institutions in a state (case-insensitive code)."""
+        return self.frame[self.frame["state"].astype(str).str.upper() == state.upper()].reset_index(drop=True)
+
+    def missing(self, unitids):
+        """The unitids the directory has no entry for."""
+        return sorted(set(int(u) for u in unitids) - set(self._by_unitid.index))
+
+
+# 🔹 Refresh from the directory API
+def _get_json(url, cache_dir, timeout):
+    """A JSON response, read from the on-disk cache when this URL was fetched before."""
+    path = None
+    if cache_dir:
+        path = os.path.join(cache_dir, hashlib.sha256(url.encode()).hexdigest()[:32] + ".json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+
+    with urlopen(url, timeout=timeout) as response:
+        data = json.loads(response.read())
+
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    return data
+
+
+def _fetch_batch(url, cache_dir, timeout):
+    """All records for one batch URL, following the API's `next` pages."""
+    results = []
+    while url:
+        data = _get_json(url, cache_dir, timeout)
+        results.extend(data.get("results", []))
+        url = data.get("next")
+    return results
+
+
+def fetch(unitids, year=2020, batch_size=100, workers=8, base_url=API_URL, cache_dir=FETCH_CACHE_DIR, timeout=30):
+    """
+    Directory records for `unitids` from the API, `batch_size` unitids per
+    request and up to `workers` requests in flight. Responses are cached on
+    disk by URL, so a repeat refresh makes no network calls.
+    """
+    unitids = sorted(set(int(u) for u in unitids))
+    base = base_url.format(year=year)
+    urls = [
+        f"{base}?{urlencode({'unitid': ','.join(map(str, unitids[i:i + batch_size]))})}"
+        for i in range(0, len(unitids), batch_size)
+    ]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        batches = list(pool.map(lambda url: _fetch_batch(url, cache_dir, timeout), urls))
+    return InstitutionDirectory.from_results(record for batch in batches for record in batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hd", help="IPEDS HD file to build the directory from")
+    parser.add_argument("--dump", help="saved directory API response (JSON)")
+    parser.add_argument("--fetch", action="store_true", help="fetch unitids missing from the directory")
+    parser.add_argument("--unitids", type=int, nargs="*", default=[])
+    parser.add_argument("--unitids-from", nargs="*", default=[], help="CSV files with a unitid column")
+    parser.add_argument("--year", type=int, default=2020)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--base-url", default=API_URL)
+    parser.add_argument("--out", default=DIRECTORY_FILE)
+    args = parser.parse_args()
+
+    directory = InstitutionDirectory.load(args.out, missing_ok=True)
+    if args.hd:
+        directory = directory.merge(InstitutionDirectory.from_hd(args.hd))
+    if args.dump:
+        directory = directory.merge(InstitutionDirectory.from_dump(args.dump))
+    if args.fetch:
+        wanted = set(args.unitids)
+        for path in args.unitids_from:
+            wanted.update(pd.read_csv(path, usecols=["unitid"])["unitid"].dropna().astype(int))
+        missing = directory.missing(wanted)
+        if missing:
+            directory = directory.merge(fetch(missing, args.year, args.batch_size, args.workers, args.base_url))
+        print(f"fetched {len(missing):,} of {len(wanted):,} unitids")
+
+    directory.save(args.out)
+    print(f"{len(directory):,} institutions in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+_state = threading.local()
+
+
+def _timings():
+    return getattr(_state, "timings", None)
+
+
+@contextmanager
+def recording():
+    """
+    Collect phase timings (seconds per phase name) for the code run inside the block.
+    Outside a recording block, phase() and timed() cost one attribute lookup.
+    """
+    previous = _timings()
+    _state.timings = {}
+    try:
+        yield _state.timings
+    finally:
+        _state.timings = previous
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to phase `name` of the active recording."""
+    timings = _timings()
+    if timings is None or getattr(_state, "depth", 0):
+        yield
+        return
+
+    _state.depth = 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+        _state.depth = 0
+
+
+def timed(name):
+    """
+    Decorator: count calls to the function as phase `name`.
+    Nested timed calls are charged to the outermost phase only.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _timings() is None or getattr(_state, "depth", 0):
+                return func(*args, **kwargs)
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# 🔹 Per-rerun profiling for the Streamlit app
+# Order of the phases in reports
+PHASES = ["load_data", "cache", "filter", "aggregate", "build", "serialize"]
+
+
+class RerunProfile:
+    """Timings (seconds) of one app rerun: one record per dataset load and per chart call."""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.time()
+        self.records = []
+        self._by_figure = {}
+
+    def add(self, record, figure=None):
+        self.records.append(record)
+        if figure is not None:
+            self._by_figure[id(figure)] = record
+        return record
+
+    def record_for(self, figure):
+        return self._by_figure.get(id(figure))
+
+    def totals(self):
+        """Seconds per phase summed over the rerun."""
+        totals = {}
+        for record in self.records:
+            for name in PHASES:
+                totals[name] = totals.get(name, 0.0) + record.get(name, 0.0)
+        return totals
+
+    def to_json_lines(self):
+        lines = []
+        for record in self.records:
+            lines.append(json.dumps({"started": self.started, "page": self.page, **record}))
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def start_rerun(page):
+    """Begin profiling a rerun; until end_rerun() chart calls and loads are recorded."""
+    _state.rerun = RerunProfile(page)
+    return _state.rerun
+
+
+def current_rerun():
+    """The rerun being profiled on this thread, or None."""
+    return getattr(_state, "rerun", None)
+
+
+def end_rerun():
+    profile = getattr(_state, "rerun", None)
+    _state.rerun = None
+    return profile
+
+
+def profiled(func):
+    """
+    Decorator for chart builders: while a rerun is being profiled, record the
+    call's filter / aggregate / cache / build time. When profiling is off the
+    only cost is one thread-local lookup.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        rerun = getattr(_state, "rerun", None)
+        if rerun is None:
+            return func(*args, **kwargs)
+
+        with recording() as timings:
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+        record = {"name": func.__name__, **timings}
+        record["build"] = elapsed - sum(timings.values())
+        record["total"] = elapsed
+        rerun.add(record, figure=result)
+        return result
+    return wrapper
+
+
+def timed_loader(loader):
+    """Wrap a dataset loader so each load is recorded as load_data in the profiled rerun."""
+    @functools.wraps(loader)
+    def wrapper(name, *args, **kwargs):
+        rerun = getattr(_state, "rerun", None)
+        if rerun is None:
+            return loader(name, *args, **kwargs)
+
+        start = time.perf_counter()
+        data = loader(name, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+        rerun.add({"name": f"load {name}", "load_data": elapsed, "total": elapsed})
+        return data
+    return wrapper
+
+
+@contextmanager
+def rendering(figure):
+    """Charge the time spent in the block (st.plotly_chart) as serialize to the chart that built `figure`."""
+    rerun = getattr(_state, "rerun", None)
+    if rerun is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        record = rerun.record_for(figure)
+        if record is None:
+            record = rerun.add({"name": "plotly_chart"})
+        record["serialize"] = record.get("serialize", 0.0) + elapsed
+        record["total"] = record.get("total", 0.0) + elapsed
+
+
+def dump_json_lines(profile, path):
+    """Append a rerun's records to a JSON-lines file."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(profile.to_json_lines())
@@ -0,0 +1,183 @@
+"""
+Export the dbt marts to the typed Parquet files the app reads (data/marts/<dataset>.parquet).
+
+Each mart (dbt-preprocessing/ipeds_dbt: graduation, enrollment) is read from
+the warehouse, renamed to the columns the charts_* modules use (chrtstat_code
+-> Graduation_rate_status_in_cohort, gr_total_all -> Total, ...), typed and
+compacted like the CSV cache (data_loader.typed_table) and written as zstd
+Parquet. data/marts/_exports.json keeps a content hash per dataset: a mart
+whose rows have not changed is skipped, a changed one bumps the dataset's
+version, which data_loader.current_version reports and the app's caches and
+partitions are keyed on. admission and sfa have no marts and stay on their CSVs.
+
+The warehouse is read through DuckDB (pip install duckdb): a DuckDB file the
+models were built into, or a local copy of the Snowflake marts.
+
+    python mart_export.py --duckdb IPEDS.duckdb
+    python mart_export.py --duckdb IPEDS.duckdb --datasets graduation --out data/marts
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from institution_directory import InstitutionDirectory
+
+try:
+    import duckdb
+except ImportError:  # optional: only needed to read a warehouse
+    duckdb = None
+
+# 🔹 Mart columns -> app columns
+GRAD_CODES = {
+    "grtype_code": "Cohort_type",
+    "chrtstat_code": "Graduation_rate_status_in_cohort",
+    "cohort_code": "Cohort",
+}
+GRAD_GROUPS = {
+    "total": "Total",
+    "ai_an": "American_Indian",
+    "asian": "Asian",
+    "black": "Black",
+    "hispanic": "Hispanic",
+    "nhpi": "Native_Hawaiian",
+    "white": "White",
+    "two_or_more": "Two_or_more_races",
+    "unknown": "Race_unknown",
+    "nonresident": "Nonresident_alien",
+}
+GRAD_SEXES = {"all": "total", "male": "men", "female": "women"}
+
+# EFFYALEV rows that are the undergraduate / graduate totals (the other rows break those down)
+ENROLLMENT_LEVELS = {2: "Undergraduate", 12: "Graduate"}
+
+
+def _grad_column(group, sex):
+    label = GRAD_GROUPS[group]
+    if group == "total":
+        return label if sex == "all" else f"{label}_{GRAD_SEXES[sex]}"
+    return f"{label}_{GRAD_SEXES[sex]}"
+
+
+def graduation_frame(mart):
+    """The graduation mart in the layout of NJ_graduation_data.csv (without university_name)."""
+    columns = {"institution_id": "unitid", "survey_year": "year", **GRAD_CODES}
+    for group in GRAD_GROUPS:
+        for sex in GRAD_SEXES:
+            columns[f"gr_{group}_{sex}"] = _grad_column(group, sex)
+    df = mart[list(columns)].rename(columns=columns)
+    for col in GRAD_CODES.values():
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df.sort_values(["unitid", "year", *GRAD_CODES.values()], kind="stable", ignore_index=True)
+
+
+def enrollment_frame(mart):
+    """The enrollment mart's level totals in the layout of NJ_enrollment_data.csv (without university_name)."""
+    codes = pd.to_numeric(mart["effyalev_code"], errors="coerce")
+    rows = mart[codes.isin(ENROLLMENT_LEVELS)]
+    df = pd.DataFrame({
+        "unitid": rows["institution_id"],
+        "level_of_study": codes[rows.index].map(ENROLLMENT_LEVELS),
+        "headcount": rows["grand_total"],
+        "year": rows["survey_year"],
+    })
+    return df.sort_values(["unitid", "year", "level_of_study"], kind="stable", ignore_index=True)
+
+
+MARTS = {
+    "graduation": graduation_frame,
+    "enrollment": enrollment_frame,
+}
+
+
+def with_names(df, directory):
+    """Insert university_name after unitid, from the institution directory."""
+    df = df.astype({"unitid": "int64"})
+    fallback = "No school found for unitid " + df["unitid"].astype(str)
+    df.insert(1, "university_name", directory.names(df["unitid"]).fillna(fallback).to_numpy())
+    return df
+
+
+def content_hash(df):
+    """SHA-256 of a frame's columns and rows, independent of row order."""
+    rows = np.sort(pd.util.hash_pandas_object(df, index=False).to_numpy())
+    digest = hashlib.sha256(json.dumps([[col, str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+    digest.update(rows.tobytes())
+    return digest.hexdigest()
+
+
+# 🔹 Warehouse
+def read_mart(con, name):
+    """A mart table as a DataFrame, found by name in whichever schema dbt built it."""
+    found = con.execute(
+        "select table_schema from information_schema.tables where lower(table_name) = ?", [name]).fetchone()
+    if found is None:
+        raise ValueError(f"Mart {name!r} not found in the warehouse; run `dbt run --select marts` first.")
+    return con.execute(f'select * from "{found[0]}"."{name}"').df()
+
+
+def _write_exports(manifest, out_dir):
+    path = os.path.join(out_dir, data_loader.EXPORT_MANIFEST)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def export_marts(con, datasets=None, out_dir=data_loader.EXPORT_DIR, directory=None):
+    """
+    Export the marts for `datasets` (default: all) to `out_dir`. Returns
+    {dataset: manifest entry with "status" "exported" or "unchanged"}.
+    """
+    directory = directory or InstitutionDirectory.load()
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = data_loader.read_exports(out_dir)
+    results = {}
+    for name in datasets or MARTS:
+        df = with_names(MARTS[name](read_mart(con, name)), directory)
+        digest = content_hash(df)
+        entry = manifest.get(name)
+        if (entry and entry["hash"] == digest and entry.get("format") == data_loader.CACHE_FORMAT
+                and os.path.exists(data_loader.export_path(name, out_dir))):
+            results[name] = dict(entry, status="unchanged")
+            continue
+
+        table = data_loader.typed_table(name, df, digest)
+        data_loader.write_table(table, data_loader.export_path(name, out_dir))
+        manifest[name] = {
+            "hash": digest,
+            "version": (entry or {}).get("version", 0) + 1,
+            "rows": len(df),
+            "format": data_loader.CACHE_FORMAT,
+            "exported_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        }
+        # Record each export as soon as it is written, so an interrupted run keeps the finished ones
+        _write_exports(manifest, out_dir)
+        results[name] = dict(manifest[name], status="exported")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duckdb", required=True, help="DuckDB warehouse file holding the dbt marts")
+    parser.add_argument("--datasets", nargs="+", choices=list(MARTS), default=list(MARTS))
+    parser.add_argument("--out", default=data_loader.EXPORT_DIR)
+    args = parser.parse_args()
+
+    if duckdb is None:
+        raise SystemExit("Reading the warehouse needs the duckdb package: pip install duckdb")
+    con = duckdb.connect(args.duckdb, read_only=True)
+    start = time.perf_counter()
+    for name, entry in export_marts(con, args.datasets, args.out).items():
+        print(f"{name}: {entry['rows']:,} rows, {entry['status']} (version {entry['version']})")
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
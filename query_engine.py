@@ -0,0 +1,184 @@
+import itertools
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from data_index import dataset_source, dataset_version, frame_of
+from instrument import timed
+
+try:
+    import duckdb
+except ImportError:  # optional: the pandas path needs nothing extra
+    duckdb = None
+
+# "pandas" (default) or "duckdb"; duckdb runs in-process, there is no server
+ENGINE = os.environ.get("IPEDS_QUERY_ENGINE", "pandas")
+# Views kept registered at once: a few states' worth of each dataset
+VIEW_CACHE_SIZE = int(os.environ.get("AGGREGATE_CACHE_SIZE", 8))
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class DuckDBEngine:
+    """
+    Runs the heavier chart aggregations as SQL in an in-memory DuckDB database.
+
+    Each dataset version gets a view of its own: over its Parquet files
+    when attrs["source"] lists them for this version (the typed cache or
+    the selected state partitions), otherwise over the pandas frame itself,
+    which DuckDB scans in place. Sessions on different states each use
+    their own view, and the least recently used views beyond
+    VIEW_CACHE_SIZE are dropped. Only the small aggregated result is
+    brought back into pandas. One connection is shared, guarded by a lock.
+    """
+
+    def __init__(self, database=":memory:"):
+        if duckdb is None:
+            raise ImportError("The duckdb query engine needs the duckdb package: pip install duckdb")
+        self.con = duckdb.connect(database)
+        self._lock = threading.Lock()
+        self._views = OrderedDict()  # (dataset, version) -> view name
+        self._view_ids = itertools.count()
+
+    def _view(self, data):
+        """Name of the view holding `data`'s version, registering it on first use (call under the lock)."""
+        version = dataset_version(data)
+        view = self._views.get(version)
+        if view is not None:
+            self._views.move_to_end(version)
+            return view
+
+        view = f"ipeds_{version[0]}_{next(self._view_ids)}"
+        source = dataset_source(data)
+        if source is not None:
+            files = ", ".join("'" + path.replace("'", "''") + "'" for path in source["files"])
+            self.con.execute(
+                f"CREATE VIEW {_quote(view)} AS "
+                f"SELECT * FROM read_parquet([{files}], hive_partitioning = true, union_by_name = true)"
+            )
+        else:
+            self.con.register(f"{view}_frame", frame_of(data))
+            self.con.execute(f"CREATE VIEW {_quote(view)} AS SELECT * FROM {_quote(view + '_frame')}")
+        self._views[version] = view
+
+        while len(self._views) > VIEW_CACHE_SIZE:
+            _, old = self._views.popitem(last=False)
+            self.con.execute(f"DROP VIEW {_quote(old)}")
+            self.con.unregister(f"{old}_frame")  # no-op for a view over Parquet files
+        return view
+
+    def _fetch(self, data, sql, params=()):
+        with self._lock:
+            view = self._view(data)
+            # numpy scalars (years and unitids taken from frames) as plain Python values
+            params = [value.item() if hasattr(value, "item") else value for value in params]
+            return self.con.execute(sql.format(view=_quote(view)), params).df()
+
+    @timed("aggregate")
+    def school_shares(self, data, name, column="Enrolled_total", name_column="university_name"):
+        """Same table as EnrollmentShares.for_school: school, others, total, share, share_change per year."""
+        value, school = _quote(column), _quote(name_column)
+        table = self._fetch(data, f"""
+            WITH per_school AS (
+                SELECT {school} AS name, year, COALESCE(SUM(CAST({value} AS DOUBLE)), 0) AS enrolled
+                FROM {{view}}
+                WHERE {school} IS NOT NULL
+                GROUP BY ALL
+            ), state AS (
+                SELECT year, SUM(enrolled) AS total FROM per_school GROUP BY year
+            )
+            SELECT state.year,
+                   COALESCE(mine.enrolled, 0) AS school,
+                   state.total - COALESCE(mine.enrolled, 0) AS others,
+                   state.total
+            FROM state LEFT JOIN per_school AS mine ON mine.year = state.year AND mine.name = ?
+            ORDER BY state.year
+        """, [name])
+        table = table.set_index("year")
+        table["share"] = table["school"] / table["total"] * 100
+        table["share_change"] = table["share"].diff()
+        return table
+
+    @timed("aggregate")
+    def school_totals(self, data, name, years, column="Enrolled_total", name_column="university_name"):
+        """(school, all others) summed over `years`, or None when none of the years has rows."""
+        value, school = _quote(column), _quote(name_column)
+        placeholders = ", ".join("?" for _ in years)
+        result = self._fetch(data, f"""
+            SELECT COUNT(*) AS n,
+                   COALESCE(SUM(CAST({value} AS DOUBLE)), 0) AS state,
+                   COALESCE(SUM(CAST({value} AS DOUBLE)) FILTER (WHERE {school} = ?), 0) AS school
+            FROM {{view}}
+            WHERE {school} IS NOT NULL AND year IN ({placeholders})
+        """, [name, *years])
+        row = result.iloc[0]
+        if not row["n"]:
+            return None
+        return float(row["school"]), float(row["state"] - row["school"])
+
+    @timed("aggregate")
+    def graduation_yearly(self, data, unitid=None, column="Total", status="Graduation_rate_status_in_cohort"):
+        """Same table as GraduationCube.yearly: year × status code sums of `column`."""
+        where, params = ("WHERE unitid = ?", [unitid]) if unitid is not None else ("", [])
+        long = self._fetch(data, f"""
+            SELECT year, {_quote(status)} AS status, COALESCE(SUM({_quote(column)}), 0)::DOUBLE AS value
+            FROM {{view}} {where}
+            GROUP BY ALL
+            ORDER BY year, status
+        """, params)
+        if long.empty:
+            return pd.DataFrame(index=pd.Index([], name="year"))
+
+        # Sums in the dtype pandas gives them: int64 for integer counts, float32 stays float32
+        dtype = frame_of(data)[column].dtype
+        long["value"] = long["value"].astype("int64" if pd.api.types.is_integer_dtype(dtype) else dtype)
+        table = long.pivot(index="year", columns="status", values="value")
+        table.columns.name = status
+        return table
+
+    @timed("aggregate")
+    def top_rows(self, data, order_column, columns, n=20):
+        """
+        `columns` of the `n` rows with the largest non-null `order_column`.
+        Ties keep row order, like DataFrame.nlargest.
+        """
+        selected = ", ".join(_quote(col) for col in columns)
+        order = _quote(order_column)
+        return self._fetch(data, f"""
+            SELECT {selected} FROM (
+                SELECT {selected}, {order} AS ipeds_order, row_number() OVER () AS ipeds_row FROM {{view}}
+            )
+            WHERE ipeds_order IS NOT NULL
+            ORDER BY ipeds_order DESC, ipeds_row
+            LIMIT {int(n)}
+        """)
+
+
+def active(data=None):
+    """
+    The DuckDB engine when IPEDS_QUERY_ENGINE=duckdb, else None (use pandas).
+    Only the dataset data_loader stamped goes to SQL: any other frame, including
+    one filtered or derived from it (which inherits its attrs and so names the
+    whole dataset's Parquet files), takes the pandas path.
+    """
+    global _engine
+    if ENGINE != "duckdb" or (data is not None and dataset_version(data) is None):
+        return None
+    with _engine_lock:
+        if _engine is None:
+            _engine = DuckDBEngine()
+    return _engine
+
+
+def use(engine):
+    """Switch the engine for this process ("pandas" or "duckdb"); returns the previous one."""
+    global ENGINE
+    previous, ENGINE = ENGINE, engine
+    return previous
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from instrument import timed
+
+
+@timed("aggregate")
+def labelled(values, labels):
+    """
+    Map codes or column names to display labels as an ordered categorical.
+    Category order follows `labels`, so charts keep the intended stage/outcome order.
+    """
+    return pd.Categorical(pd.Series(values).map(labels).to_numpy(), categories=list(dict.fromkeys(labels.values())), ordered=True)
+
+
+@timed("aggregate")
+def to_long(df, id_vars, value_vars, var_name="variable", value_name="value", labels=None):
+    """
+    Wide IPEDS columns to long form with melt.
+
+    Rows come out grouped by value column, in frame order within each group.
+    With `labels` ({column: label}), the variable column holds the labels
+    as an ordered categorical instead of the raw column names.
+    """
+    long = df.melt(id_vars=id_vars, value_vars=value_vars, var_name=var_name, value_name=value_name)
+    if labels is not None:
+        long[var_name] = labelled(long[var_name], labels)
+    return long
+
+
+@timed("aggregate")
+def code_table(totals, labels, fill_value=0):
+    """
+    Per-code totals (a Series or DataFrame indexed by code) reindexed to the codes
+    in `labels`, in that order; codes with no rows get `fill_value`.
+    """
+    return totals.reindex(list(labels), fill_value=fill_value)
+
+
+@timed("aggregate")
+def codes_to_long(totals, labels, var_name, value_name, code_name="Code", columns=None):
+    """
+    Stack a code × measure table into long form: one row per (code, measure),
+    ordered by code then measure. `labels` maps codes to display labels and
+    `columns` ({measure column: label}) renames the measures.
+    """
+    table = code_table(totals, labels)
+    if columns is not None:
+        table = table[list(columns)].rename(columns=columns)
+    long = table.rename_axis(index=code_name, columns=var_name).stack(future_stack=True)
+    long = long.rename(value_name).reset_index()
+    long[code_name] = labelled(long[code_name], labels)
+    return long
@@ -0,0 +1,195 @@
+"""
+Prebuilt institution search: partial names, acronyms and aliases in well under a millisecond.
+
+Names are normalized once (lowercase, accents and punctuation stripped, "&"
+read as "and") into word tokens, an acronym and character trigrams. A query
+matches a school when every query word is a prefix of one of its words
+("rutgers newark", "new jersey inst"), when it is the school's acronym or a
+known alias ("NJIT", "TCNJ"), or, failing both, when enough of its trigrams
+appear in the name (typos such as "montclare").
+
+    index = SchoolIndex.from_frame(df)      # or school_index(dataset), cached per data version
+    index.search("njit")                    # ['New Jersey Institute of Technology']
+    index.best("Rutgers Newark")            # 'Rutgers University-Newark'
+"""
+import functools
+import heapq
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+
+from data_index import IndexedDataset, VersionedCache, frame_of
+
+# Shorthand that is not a name's acronym, or that should rank one campus first
+ALIASES = {
+    "Rutgers Newark": "Rutgers University-Newark",
+    "Rutgers New Brunswick": "Rutgers University-New Brunswick",
+    "Rutgers Camden": "Rutgers University-Camden",
+    "RU Newark": "Rutgers University-Newark",
+    "RU New Brunswick": "Rutgers University-New Brunswick",
+    "RU Camden": "Rutgers University-Camden",
+    "FDU Florham": "Fairleigh Dickinson University-Florham Campus",
+    "FDU Metro": "Fairleigh Dickinson University-Metropolitan Campus",
+}
+
+# Words left out of acronyms: "College of New Jersey" -> CNJ, "The College of New Jersey" -> TCNJ
+ACRONYM_SKIP = {"of", "and", "at", "for", "in", "on"}
+MIN_TRIGRAM_SIMILARITY = 0.6
+# Typed prefixes remembered per index
+PREFIX_CACHE_SIZE = 4096
+
+
+def normalize(text):
+    """Lowercase ASCII words separated by single spaces: "Saint Peter's" -> "saint peters"."""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    text = text.lower().replace("&", " and ").replace("'", "")
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def acronym(normalized):
+    words = [word for word in normalized.split() if word not in ACRONYM_SKIP]
+    return "".join(word[0] for word in words) if len(words) > 1 else ""
+
+
+def trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SchoolIndex:
+    """
+    Institution names with their unitids, indexed for search.
+
+    Built once per dataset (see school_index); `names` is the sorted option
+    list the selectboxes show, so no rerun sorts or de-duplicates names again.
+    """
+
+    def __init__(self, names, unitids=None, aliases=ALIASES):
+        unitids = [None] * len(names) if unitids is None else unitids
+        entries = {}
+        for name, unitid in zip(names, unitids):
+            if isinstance(name, str) and name:
+                ids = entries.setdefault(name, [])
+                if unitid is not None and unitid not in ids:
+                    ids.append(unitid)
+
+        self.names = sorted(entries)
+        self._unitids = [entries[name] for name in self.names]
+        self._position = {unitid: i for i, ids in enumerate(self._unitids) for unitid in ids}
+        self._normalized = [normalize(name) for name in self.names]
+
+        postings = {}
+        self._exact = {}
+        self._trigrams = {}
+        for i, text in enumerate(self._normalized):
+            for word in set(text.split()):
+                postings.setdefault(word, set()).add(i)
+            self._exact.setdefault(text, set()).add(i)
+            short = acronym(text)
+            if short:
+                self._exact.setdefault(short, set()).add(i)
+            for gram in trigrams(text):
+                self._trigrams.setdefault(gram, []).append(i)
+        # Shorter names first among equally good matches
+        order = sorted(range(len(self.names)), key=lambda i: (len(self._normalized[i]), self.names[i]))
+        self._order = [0] * len(order)
+        for rank, i in enumerate(order):
+            self._order[i] = rank
+
+        position_by_name = {name: i for i, name in enumerate(self.names)}
+        for alias, name in (aliases or {}).items():
+            if name in position_by_name:
+                self._exact.setdefault(normalize(alias), set()).add(position_by_name[name])
+
+        self._vocab = sorted(postings)
+        self._postings = [frozenset(postings[word]) for word in self._vocab]
+        # Bounded: a long-running server sees an open-ended set of typed prefixes
+        self._with_prefix = functools.lru_cache(maxsize=PREFIX_CACHE_SIZE)(self._prefix_positions)
+
+    @classmethod
+    def from_frame(cls, df, name_column="university_name", id_column="unitid"):
+        """From any frame with institution names (and unitids, when it has the column)."""
+        ids = df[id_column].tolist() if id_column in df.columns else None
+        return cls(df[name_column].tolist(), ids)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefix_positions(self, word):
+        """Positions of the schools with a word starting with `word` (called through the cached _with_prefix)."""
+        lo = bisect_left(self._vocab, word)
+        hi = bisect_left(self._vocab, word + "\x7f", lo)
+        return frozenset().union(*self._postings[lo:hi])
+
+    def _similar(self, query):
+        """Positions whose names contain at least MIN_TRIGRAM_SIMILARITY of the query's trigrams, with that share."""
+        grams = trigrams(query)
+        shared = {}
+        for gram in grams:
+            for i in self._trigrams.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        wanted = MIN_TRIGRAM_SIMILARITY * len(grams)
+        return {i: count / len(grams) for i, count in shared.items() if count >= wanted}
+
+    def search(self, query, limit=10):
+        """
+        Up to `limit` institution names matching `query`, best first: exact
+        names, acronyms and aliases, then names starting with the query, then
+        names containing every query word as a word prefix; typo matches by
+        trigram similarity only when nothing else matches.
+        """
+        text = normalize(query)
+        if not text:
+            return []
+
+        exact = self._exact.get(text, set())
+        words = text.split()
+        matches = self._with_prefix(words[0])
+        for word in words[1:]:
+            if not matches:
+                break
+            matches = matches & self._with_prefix(word)
+
+        if exact or matches:
+            def rank(i):
+                return (0 if i in exact else 1 if self._normalized[i].startswith(text) else 2, self._order[i])
+            best = heapq.nsmallest(limit, exact | matches, key=rank)
+        else:
+            similar = self._similar(text)
+            best = heapq.nsmallest(limit, similar, key=lambda i: (-similar[i], self._order[i]))
+        return [self.names[i] for i in best]
+
+    def best(self, query):
+        """The best match for `query`, or None."""
+        found = self.search(query, limit=1)
+        return found[0] if found else None
+
+    def unitids(self, name):
+        """The unitids registered under an institution name."""
+        i = bisect_left(self.names, name)
+        return list(self._unitids[i]) if i < len(self.names) and self.names[i] == name else []
+
+    def names_for(self, unitids):
+        """Sorted names of the given unitids (unknown ones are skipped)."""
+        return [self.names[i] for i in sorted({self._position[u] for u in unitids if u in self._position})]
+
+
+# A few states' worth of indexes
+_INDEXES = VersionedCache(maxsize=int(os.environ.get("SCHOOL_INDEX_CACHE_SIZE", 8)))
+
+
+def school_index(data, name_column="university_name"):
+    """
+    The SchoolIndex of a dataset's institutions, built once per data version
+    (state selection included) and shared across reruns and sessions.
+    Frames without a version stamp are indexed on every call.
+    """
+    def build(data):
+        frame = frame_of(data)
+        if isinstance(data, IndexedDataset):
+            # One row per institution is enough
+            frame = frame.drop_duplicates(["unitid", name_column])
+        return SchoolIndex.from_frame(frame, name_column)
+
+    return _INDEXES.get(build, data)
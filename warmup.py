@@ -0,0 +1,209 @@
+"""
+Warm-up of the app's caches for its default views, so the first visitor gets cache hits.
+
+The default selections are fixed: NJIT on the share and institution pages,
+NJIT and Rutgers-Newark on the comparison and graduation pages, the latest
+year everywhere. warm_up loads the pages' datasets through the app's loader
+and builds every figure those views draw, which fills the figure cache and
+the per-version indexes (school search, graduation cube, enrollment shares).
+app.py runs it once per server process and data version (st.cache_resource)
+for the default state and the pages in IPEDS_WARMUP (default: the landing
+Enrollment page; "all", or "off"), so other pages stay lazily loaded, and
+shows the report under Debug timings.
+
+As a build step, this script writes the Parquet caches and state partitions
+and times a cold and a warm pass over the default views:
+
+    python warmup.py
+    python warmup.py --states NJ NY --pages Enrollment Graduation
+"""
+import argparse
+import os
+import time
+
+import data_partitions
+from charts_enrollment import (
+    create_admission_yield_rate_chart,
+    create_full_vs_part_time_trend,
+    create_full_vs_part_time_trend_multiple,
+    create_gender_enrollment_bar_chart,
+    create_njit_vs_others_pie,
+    create_total_enrollment_bar_chart,
+    plot_admission_funnel,
+    plot_njit_share_change,
+)
+from charts_finaid import plot_aid_type_breakdown_percent, plot_net_price_by_income, plot_top20_institutions_by_total_aid
+from charts_graduation import (
+    graduation_funnel_chart,
+    plot_graduation_by_race_treemap,
+    plot_graduation_rate_trend,
+    plot_school_graduation_share_pie,
+    plot_school_graduation_share_pie_by_unitid,
+)
+from data_index import IndexedDataset
+from school_search import school_index
+
+DATASETS = ["admission", "graduation", "sfa"]
+# The dataset each page draws from
+PAGE_DATASETS = {"Enrollment": "admission", "Graduation": "graduation", "Financial Aid": "sfa"}
+WARMUP_PAGES = os.environ.get("IPEDS_WARMUP", "Enrollment")
+DEFAULT_SCHOOL = "New Jersey Institute of Technology"
+COMPARISON_SCHOOLS = ("New Jersey Institute of Technology", "Rutgers University-Newark")
+
+
+def default_schools(names):
+    """The comparison pages' preselected schools among `names`."""
+    return [school for school in names if any(default in school for default in COMPARISON_SCHOOLS)]
+
+
+def _default(names, name):
+    """`name`, or the first option when the state has no such school (as the app's selectboxes do)."""
+    return name if name in names else (names[0] if names else None)
+
+
+def default_views(datasets):
+    """
+    (page, chart, args, kwargs) for every figure the app draws with its default
+    selections from `datasets` ({name: dataset}, any of DATASETS), called
+    exactly as app.py calls them so the figure cache keys match.
+    """
+    views = []
+    if "admission" in datasets:
+        views += _enrollment_views(datasets["admission"])
+    if "graduation" in datasets:
+        views += _graduation_views(datasets["graduation"])
+    if "sfa" in datasets:
+        views += _finaid_views(datasets["sfa"])
+    return views
+
+
+def _enrollment_views(adms):
+    views = []
+    latest = adms.years[-1]
+    school = _default(school_index(adms).names, DEFAULT_SCHOOL)
+    compared = default_schools(school_index(adms).names_for(adms.select(years=[latest])["unitid"].unique()))
+    views += [
+        ("Enrollment/section1", create_njit_vs_others_pie, (adms, [latest]), {"school_name": school}),
+        ("Enrollment/section1", plot_njit_share_change, (adms,), {"njit_name": school}),
+        ("Enrollment/section2", create_full_vs_part_time_trend, (adms, school), {}),
+        ("Enrollment/section2", plot_admission_funnel, (adms, school), {"selected_year": latest}),
+    ]
+    if compared:
+        views += [
+            ("Enrollment/section3", chart, (adms, compared, [latest]), {})
+            for chart in (create_total_enrollment_bar_chart, create_gender_enrollment_bar_chart,
+                          create_admission_yield_rate_chart)
+        ]
+        views.append(("Enrollment/section3", create_full_vs_part_time_trend_multiple, (adms, compared), {}))
+    return views
+
+
+def _graduation_views(grad):
+    views = []
+    latest = grad.years[-1]
+    names = school_index(grad).names_for(grad.select(years=[latest])["unitid"].unique())
+    if names:
+        school = (default_schools(names) or names)[0]
+        unitid = grad.unitid_for(school)
+        views += [
+            ("Graduation", graduation_funnel_chart, (grad,), {"selected_unitid": unitid, "selected_year": latest}),
+            ("Graduation", plot_graduation_rate_trend, (grad,), {"selected_unitid": unitid}),
+            ("Graduation", plot_school_graduation_share_pie, (grad,), {"selected_school": school, "selected_year": latest}),
+            ("Graduation", plot_school_graduation_share_pie_by_unitid, (grad,),
+             {"selected_unitid": unitid, "selected_year": latest}),
+            ("Graduation", plot_graduation_by_race_treemap, (grad,), {"selected_unitid": unitid, "selected_year": latest}),
+        ]
+    return views
+
+
+def _finaid_views(sfa):
+    school = _default(school_index(sfa).names, DEFAULT_SCHOOL)
+    return [
+        ("Financial Aid", plot_top20_institutions_by_total_aid, (sfa,), {}),
+        ("Financial Aid", plot_net_price_by_income, (sfa, school), {}),
+        ("Financial Aid", plot_aid_type_breakdown_percent, (sfa, school), {}),
+    ]
+
+
+def warmup_pages(setting=WARMUP_PAGES):
+    """The pages an IPEDS_WARMUP setting names: comma-separated page names, "all", or "off" (none)."""
+    setting = setting.strip()
+    if setting.lower() == "all":
+        return list(PAGE_DATASETS)
+    if setting.lower() in ("", "off", "0", "none"):
+        return []
+    pages = [page.strip() for page in setting.split(",")]
+    unknown = [page for page in pages if page not in PAGE_DATASETS]
+    if unknown:
+        raise ValueError(f"Unknown warm-up page(s) {unknown}. Expected any of: {', '.join(PAGE_DATASETS)}")
+    return pages
+
+
+def warm_up(load, pages=None):
+    """
+    Load the datasets of `pages` (default: all) with `load(name)` and build their default views' figures.
+    Returns seconds per dataset and per figure, the total, and the views that
+    failed (a failure is reported, never raised: the app must still start).
+    """
+    start = time.perf_counter()
+    report = {"datasets": {}, "figures": {}, "failed": []}
+    datasets = {}
+    for name in [PAGE_DATASETS[page] for page in (pages or PAGE_DATASETS)]:
+        began = time.perf_counter()
+        datasets[name] = load(name)
+        report["datasets"][name] = time.perf_counter() - began
+
+    try:
+        views = default_views(datasets)
+    except Exception as error:  # noqa: BLE001  (e.g. a state with no rows)
+        views = []
+        report["failed"].append(f"default views: {error!r}")
+    for page, chart, args, kwargs in views:
+        label = f"{page}: {chart.__name__}"
+        began = time.perf_counter()
+        try:
+            chart(*args, **kwargs)
+        except Exception as error:  # noqa: BLE001
+            report["failed"].append(f"{label}: {error!r}")
+        report["figures"][label] = time.perf_counter() - began
+    report["total"] = time.perf_counter() - start
+    return report
+
+
+def summary(report):
+    """One line for the server log and the Debug timings panel."""
+    loading = sum(report["datasets"].values())
+    line = (f"Warm-up: {len(report['datasets'])} datasets and {len(report['figures'])} default figures "
+            f"in {report['total'] * 1000:,.0f} ms ({loading * 1000:,.0f} ms loading)")
+    if report["failed"]:
+        line += f", {len(report['failed'])} failed"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--states", nargs="+", default=[data_partitions.DEFAULT_STATE])
+    parser.add_argument("--pages", nargs="+", choices=list(PAGE_DATASETS), default=list(PAGE_DATASETS))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for name in DATASETS:
+        data_partitions.available(name)  # builds the Parquet cache and the partitions when stale
+    print(f"Parquet caches and partitions ready in {(time.perf_counter() - start) * 1000:,.0f} ms")
+
+    for state in args.states:
+        def load(name, state=state):
+            return IndexedDataset(data_partitions.load_partitions(name, states=[state]))
+
+        cold = warm_up(load, args.pages)
+        print(f"{state} cold  {summary(cold)}")
+        for failure in cold["failed"]:
+            print(f"  failed {failure}")
+        warm = warm_up(load, args.pages)
+        print(f"{state} warm  {summary(warm)}")
+        slowest = sorted(cold["figures"].items(), key=lambda item: -item[1])[:5]
+        print("  slowest cold figures: " + ", ".join(f"{label} {seconds * 1000:.0f} ms" for label, seconds in slowest))
+
+
+if __name__ == "__main__":
+    main()